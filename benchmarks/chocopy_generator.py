@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+A seeded generator of valid, well-typed ChocoPy programs for benchmarks.
+
+    python3 benchmarks/chocopy_generator.py --functions 100 --seed 1 > program.choc
+
+Every function takes two integers and a string and returns an integer. It
+defines one local variable of each type, and its body is a random sequence of
+assignments, calls and nested `if`, `while` and `for` statements. Functions
+only call functions defined before them, so the programs pass name analysis
+and type checking.
+"""
+
+import argparse
+import random
+from typing import List
+
+INT_VARS = ["a", "b", "x"]
+STR_VARS = ["s", "u"]
+BOOL_VARS = ["t"]
+
+# Characters of string literals, including escape sequences.
+STRING_CHARS = list("abcdefghijklmnopqrstuvwxyz 0123456789") + [
+    "\\t",
+    "\\n",
+    "\\\\",
+    '\\"',
+]
+
+
+class ProgramGenerator:
+    """
+    Generate ChocoPy programs.
+
+    :param functions: The number of functions.
+    :param nesting: The maximum nesting depth of compound statements.
+    :param expr_depth: The maximum depth of expressions.
+    :param string_length: The length of string literals.
+    :param comment_density: The probability of a comment before a statement.
+    :param seed: The seed of the random number generator.
+    """
+
+    def __init__(
+        self,
+        functions: int = 100,
+        nesting: int = 3,
+        expr_depth: int = 3,
+        string_length: int = 16,
+        comment_density: float = 0.1,
+        seed: int = 0,
+    ):
+        self.functions = functions
+        self.nesting = nesting
+        self.expr_depth = expr_depth
+        self.string_length = string_length
+        self.comment_density = comment_density
+        self.rng = random.Random(seed)
+        # The number of functions generated so far, which can be called.
+        self.num_defined = 0
+
+    def string_literal(self) -> str:
+        chars = [self.rng.choice(STRING_CHARS) for _ in range(self.string_length)]
+        return '"' + "".join(chars) + '"'
+
+    def call(self, depth: int) -> str:
+        f = self.rng.randrange(self.num_defined)
+        args = [self.int_expr(depth - 1), self.int_expr(depth - 1)]
+        return f"func_{f}({', '.join(args)}, {self.str_expr(depth - 1)})"
+
+    def int_expr(self, depth: int) -> str:
+        r = self.rng.random()
+        if depth <= 0 or r < 0.3:
+            if self.rng.random() < 0.5:
+                return str(self.rng.randrange(1000))
+            return self.rng.choice(INT_VARS)
+        if r < 0.6:
+            op = self.rng.choice(["+", "-", "*", "//", "%"])
+            return f"{self.int_expr(depth - 1)} {op} {self.int_expr(depth - 1)}"
+        if r < 0.65:
+            return f"-{self.int_expr(depth - 1)}"
+        if r < 0.75:
+            return f"({self.int_expr(depth - 1)})"
+        if r < 0.8:
+            return f"len({self.str_expr(depth - 1)})"
+        if r < 0.85:
+            return f"l[{self.int_expr(depth - 1)}]"
+        if r < 0.9 and self.num_defined > 0:
+            return self.call(depth)
+        return (
+            f"({self.int_expr(depth - 1)} if {self.bool_expr(depth - 1)} "
+            f"else {self.int_expr(depth - 1)})"
+        )
+
+    def bool_expr(self, depth: int) -> str:
+        r = self.rng.random()
+        if depth <= 0 or r < 0.2:
+            return self.rng.choice(["True", "False"] + BOOL_VARS)
+        if r < 0.5:
+            op = self.rng.choice(["==", "!=", "<", "<=", ">", ">="])
+            return f"{self.int_expr(depth - 1)} {op} {self.int_expr(depth - 1)}"
+        if r < 0.6:
+            op = self.rng.choice(["==", "!="])
+            return f"{self.str_expr(depth - 1)} {op} {self.str_expr(depth - 1)}"
+        if r < 0.7:
+            return f"not {self.bool_expr(depth - 1)}"
+        op = self.rng.choice(["and", "or"])
+        return f"({self.bool_expr(depth - 1)} {op} {self.bool_expr(depth - 1)})"
+
+    def str_expr(self, depth: int) -> str:
+        r = self.rng.random()
+        if depth <= 0 or r < 0.4:
+            if self.rng.random() < 0.5:
+                return self.string_literal()
+            return self.rng.choice(STR_VARS)
+        if r < 0.8:
+            return f"{self.str_expr(depth - 1)} + {self.str_expr(depth - 1)}"
+        return f"{self.str_expr(depth - 1)}[{self.int_expr(depth - 1)}]"
+
+    def comment(self, indent: str) -> List[str]:
+        if self.rng.random() < self.comment_density:
+            words = " ".join(
+                self.rng.choice(["loop", "value", "index", "result", "check"])
+                for _ in range(self.rng.randrange(2, 10))
+            )
+            return [f"{indent}# {words}\n"]
+        return []
+
+    def stmts(self, indent: str, nesting: int) -> List[str]:
+        lines: List[str] = []
+        for _ in range(self.rng.randrange(1, 5)):
+            lines += self.comment(indent)
+            lines += self.stmt(indent, nesting)
+        return lines
+
+    def stmt(self, indent: str, nesting: int) -> List[str]:
+        depth = self.expr_depth
+        inner = indent + "    "
+        r = self.rng.random()
+        if nesting > 0 and r < 0.15:
+            lines = [f"{indent}if {self.bool_expr(depth)}:\n"]
+            lines += self.stmts(inner, nesting - 1)
+            if self.rng.random() < 0.5:
+                lines.append(f"{indent}elif {self.bool_expr(depth)}:\n")
+                lines += self.stmts(inner, nesting - 1)
+            if self.rng.random() < 0.5:
+                lines.append(f"{indent}else:\n")
+                lines += self.stmts(inner, nesting - 1)
+            return lines
+        if nesting > 0 and r < 0.25:
+            lines = [f"{indent}while {self.bool_expr(depth)}:\n"]
+            return lines + self.stmts(inner, nesting - 1)
+        if nesting > 0 and r < 0.3:
+            lines = [f"{indent}for x in l:\n"]
+            return lines + self.stmts(inner, nesting - 1)
+        if nesting > 0 and r < 0.35:
+            lines = [f"{indent}for u in {self.str_expr(depth)}:\n"]
+            return lines + self.stmts(inner, nesting - 1)
+        if r < 0.55:
+            return [f"{indent}x = {self.int_expr(depth)}\n"]
+        if r < 0.65:
+            return [f"{indent}t = {self.bool_expr(depth)}\n"]
+        if r < 0.75:
+            return [f"{indent}u = {self.str_expr(depth)}\n"]
+        if r < 0.8:
+            return [f"{indent}l = [{self.int_expr(depth)}, {self.int_expr(depth)}]\n"]
+        if r < 0.85:
+            return [f"{indent}l[{self.int_expr(depth)}] = {self.int_expr(depth)}\n"]
+        if r < 0.9 and self.num_defined > 0:
+            return [f"{indent}{self.call(depth)}\n"]
+        if r < 0.95:
+            return [f"{indent}print({self.str_expr(depth)})\n"]
+        return [f"{indent}pass\n"]
+
+    def function(self) -> List[str]:
+        lines = self.comment("")
+        lines += [
+            f"def func_{self.num_defined}(a: int, b: int, s: str) -> int:\n",
+            "    x: int = 0\n",
+            "    t: bool = False\n",
+            '    u: str = ""\n',
+            "    l: [int] = None\n",
+        ]
+        lines += self.stmts("    ", self.nesting)
+        lines.append(f"    return {self.int_expr(self.expr_depth)}\n\n")
+        self.num_defined += 1
+        return lines
+
+    def program(self) -> str:
+        lines: List[str] = []
+        for _ in range(self.functions):
+            lines += self.function()
+        for f in range(max(0, self.functions - 10), self.functions):
+            lines.append(f'print(func_{f}({f}, 1, "main"))\n')
+        return "".join(lines)
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Generate a ChocoPy program")
+    parser.add_argument("--functions", type=int, default=100)
+    parser.add_argument("--nesting", type=int, default=3)
+    parser.add_argument("--expr-depth", type=int, default=3)
+    parser.add_argument("--string-length", type=int, default=16)
+    parser.add_argument("--comment-density", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = ProgramGenerator(
+        args.functions,
+        args.nesting,
+        args.expr_depth,
+        args.string_length,
+        args.comment_density,
+        args.seed,
+    )
+    print(generator.program(), end="")
+
+
+if __name__ == "__main__":
+    __main__()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Measure the quality of the code generated by choco-opt for the programs of
+`tests/end-to-end`, by compiling each of them with `-p all -t riscv` and
+running it in riscemu with the input of its RUN line.
+
+    python3 benchmarks/code_quality.py --json report.json \
+        --baseline benchmarks/code_quality_baseline.json
+
+For each program, the report has the number of instructions of each function,
+the total number of instructions and the size of the assembly, and the number
+of instructions, loads, stores and calls executed. The output of each program
+is checked with filecheck against its CHECK lines, as in its RUN line. The
+metrics do not depend on the machine, so that the report can be compared to a
+stored baseline: every metric that grew, and every program that does not
+compile, run, or print the expected output anymore, is a regression, and the
+benchmark fails if there is one.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from typing import Any, Dict, List
+
+from tools.choco_opt import ChocoOptMain
+from tools.choco_opt_batch import compile_file
+from tools.riscv_assembly import LOADS, STORES, is_call, parse_assembly
+from tools.riscv_interpreter import run_in_process
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAMS = os.path.join(ROOT, "tests", "end-to-end")
+
+# The input piped to riscv-interpreter in a RUN line.
+RUN_INPUT = re.compile(r'echo "([^"]*)" \| riscv-interpreter')
+
+EXCEPTION_LINE = re.compile(r"^[\w.]+(Error|Exception)\b")
+
+# The instructions after which a program is considered not to terminate.
+DEFAULT_MAX_INSTRUCTIONS = 10_000_000
+
+# The metrics compared to the baseline, for which more is worse.
+METRICS = [
+    "static_instructions",
+    "assembly_bytes",
+    "instructions",
+    "loads",
+    "stores",
+    "calls",
+]
+
+
+class InstructionLimitExceeded(Exception):
+    pass
+
+
+def error_line(message: str) -> str:
+    """
+    The line of an error message that names the exception of a traceback, or
+    its last line, so that the report does not have the paths of the machine.
+    """
+    lines = message.strip().splitlines()
+    exceptions = [line for line in lines if EXCEPTION_LINE.match(line)]
+    return (exceptions or lines or [""])[-1]
+
+
+def find_programs(directory: str) -> List[str]:
+    programs: List[str] = []
+    for subdirectory, subdirectories, files in os.walk(directory):
+        subdirectories[:] = sorted(d for d in subdirectories if d != "Output")
+        programs.extend(
+            os.path.join(subdirectory, name)
+            for name in sorted(files)
+            if name.endswith(".choc")
+        )
+    return programs
+
+
+def program_input(path: str) -> str:
+    """The standard input of the program in its RUN lines, if any."""
+    with open(path) as f:
+        for line in f:
+            if line.startswith("# RUN:"):
+                match = RUN_INPUT.search(line)
+                if match is not None:
+                    return match.group(1) + "\n"
+    return ""
+
+
+def has_checks(path: str) -> bool:
+    with open(path) as f:
+        return any(line.startswith("# CHECK") for line in f)
+
+
+def check_output(program: str, output: str) -> str:
+    """
+    Check the output of a program against its CHECK lines with filecheck.
+
+    :returns: The error of filecheck, or an empty string if the output matches.
+    """
+    if not has_checks(program):
+        return ""
+    result = subprocess.run(
+        ["filecheck", program], input=output, capture_output=True, text=True
+    )
+    if result.returncode == 0:
+        return ""
+    lines = (result.stderr or result.stdout).splitlines()
+    errors = [line for line in lines if ": error: " in line] or lines
+    if not errors:
+        return f"filecheck exited {result.returncode}"
+    # The CHECK that failed, without the path of the machine.
+    return errors[0].replace(program + ":", "line ", 1)
+
+
+class ExecutionCounters:
+    """The trace of riscv-interpreter counting the executed instructions."""
+
+    def __init__(self, max_instructions: int):
+        self.max_instructions = max_instructions
+        self.instructions = 0
+        self.loads = 0
+        self.stores = 0
+        self.calls = 0
+
+    def __call__(self, cpu: Any, ins: Any):
+        self.instructions += 1
+        if self.instructions > self.max_instructions:
+            raise InstructionLimitExceeded(
+                f"more than {self.max_instructions} instructions executed"
+            )
+        if ins.name in LOADS:
+            self.loads += 1
+        elif ins.name in STORES:
+            self.stores += 1
+        elif is_call(ins.name, ins.args):
+            self.calls += 1
+
+
+def execute(
+    program: str, assembly_file: str, stdin: str, max_instructions: int
+) -> Dict[str, Any]:
+    counters = ExecutionCounters(max_instructions)
+    output = StringIO()
+    saved_stdin = sys.stdin
+    sys.stdin = StringIO(stdin)
+    try:
+        with redirect_stdout(output):
+            code, errors = run_in_process(assembly_file, trace=counters)
+    finally:
+        sys.stdin = saved_stdin
+    status = "ok"
+    if errors:
+        status = "run-error"
+    else:
+        errors = check_output(program, output.getvalue())
+        if errors:
+            status = "wrong-output"
+    return {
+        "status": status,
+        "message": error_line(errors),
+        "exit_code": code,
+        "instructions": counters.instructions,
+        "loads": counters.loads,
+        "stores": counters.stores,
+        "calls": counters.calls,
+    }
+
+
+def measure(
+    choco_main: ChocoOptMain, program: str, directory: str, max_instructions: int
+) -> Dict[str, Any]:
+    stdin = program_input(program)
+    result: Dict[str, Any] = {"stdin": stdin}
+    assembly_file = os.path.join(directory, "program.s")
+    compilation = compile_file(choco_main, program, ".s", assembly_file)
+    if compilation.status != "ok":
+        result["status"] = "compile-" + compilation.status
+        result["message"] = error_line(compilation.message)
+        return result
+
+    with open(assembly_file) as f:
+        text = f.read()
+    assembly = parse_assembly(text)
+    result["functions"] = assembly.functions
+    result["static_instructions"] = assembly.instructions
+    result["assembly_bytes"] = len(text.encode())
+    result.update(execute(program, assembly_file, stdin, max_instructions))
+    return result
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> int:
+    """
+    Print the differences of the report from the baseline.
+
+    :returns: The number of regressions.
+    """
+    regressions = 0
+    programs = report["programs"]
+    for program, before in sorted(baseline["programs"].items()):
+        after = programs.get(program)
+        if after is None:
+            print(f"{program}: not measured anymore")
+            continue
+        if after["status"] != before["status"]:
+            print(f"{program}: {before['status']} -> {after['status']}")
+            if before["status"] == "ok":
+                regressions += 1
+            continue
+        if after["status"] != "ok":
+            continue
+        changes: List[str] = []
+        for metric in METRICS:
+            change = after[metric] - before[metric]
+            if change:
+                changes.append(
+                    f"{metric} {before[metric]} -> {after[metric]} "
+                    f"({100 * change / max(before[metric], 1):+.1f}%)"
+                )
+                if change > 0:
+                    regressions += 1
+        if changes:
+            print(f"{program}: {', '.join(changes)}")
+    for program in sorted(programs.keys() - baseline["programs"].keys()):
+        print(f"{program}: new, {programs[program]['status']}")
+    return regressions
+
+
+def totals(programs: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    ran = [result for result in programs.values() if result["status"] == "ok"]
+    total = {metric: sum(result[metric] for result in ran) for metric in METRICS}
+    return {"programs": len(programs), "ran": len(ran), **total}
+
+
+def __main__():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the code generated by choco-opt"
+    )
+    parser.add_argument(
+        "programs",
+        nargs="*",
+        help="the programs to measure, by default those of tests/end-to-end",
+    )
+    parser.add_argument(
+        "--max-instructions",
+        type=int,
+        default=DEFAULT_MAX_INSTRUCTIONS,
+        help="the instructions after which a program is stopped",
+    )
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare the report to this report")
+    args = parser.parse_args()
+
+    programs = args.programs or find_programs(PROGRAMS)
+    choco_main = ChocoOptMain(args=["-p", "all", "-t", "riscv"])
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for program in programs:
+            name = os.path.relpath(os.path.abspath(program), ROOT)
+            result = measure(choco_main, program, directory, args.max_instructions)
+            results[name] = result
+            if result["status"] == "ok":
+                print(
+                    f"{name}: {result['static_instructions']} instructions, "
+                    f"{result['instructions']} executed"
+                )
+            else:
+                print(f"{name}: {result['status']}")
+
+    report = {"programs": results, "total": totals(results)}
+    total = report["total"]
+    print(
+        f"{total['ran']} of {total['programs']} programs ran: "
+        f"{total['static_instructions']} instructions, "
+        f"{total['instructions']} executed, {total['loads']} loads, "
+        f"{total['stores']} stores, {total['calls']} calls"
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if args.programs:
+            # Only the given programs are compared.
+            baseline["programs"] = {
+                name: result
+                for name, result in baseline["programs"].items()
+                if name in results
+            }
+        regressions = compare(report, baseline)
+        print(f"{regressions} regressions from {args.baseline}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    __main__()
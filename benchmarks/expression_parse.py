@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Measure the parse time of an expression-heavy ChocoPy program.
+
+The program assigns randomly generated expressions, which mix all operators,
+calls, list displays, indices and conditional expressions, and ends with a few
+very deeply nested expressions, which the previous recursive descent parser
+could not parse within the default recursion limit.
+
+    python3 benchmarks/expression_parse.py --statements 2000 --depth 5
+"""
+
+import argparse
+import random
+import time
+from io import StringIO
+from typing import List
+
+from choco.lexer import Lexer, TokenKind
+from choco.parser import Parser
+
+ATOMS = ["a", "1", "True", "None", '"s"', "f()"]
+
+
+class ExpressionGenerator:
+    """Generate random expressions following the precedence levels of `expr`."""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+
+    def repeat(self, depth: int, rule, separators: List[str]) -> str:
+        n = self.rng.randrange(1, 4) if depth > 0 else 1
+        parts = [rule(depth - 1)]
+        for _ in range(n - 1):
+            parts.append(self.rng.choice(separators))
+            parts.append(rule(depth - 1))
+        return " ".join(parts)
+
+    def expr(self, depth: int) -> str:
+        if depth > 0 and self.rng.random() < 0.1:
+            cond, then, other = (self.or_expr(depth - 1) for _ in range(3))
+            return f"{then} if {cond} else {other}"
+        return self.or_expr(depth)
+
+    def or_expr(self, depth: int) -> str:
+        return self.repeat(depth, self.and_expr, ["or"])
+
+    def and_expr(self, depth: int) -> str:
+        return self.repeat(depth, self.not_expr, ["and"])
+
+    def not_expr(self, depth: int) -> str:
+        if self.rng.random() < 0.1:
+            return "not " + self.comp_expr(depth)
+        return self.comp_expr(depth)
+
+    def comp_expr(self, depth: int) -> str:
+        if depth > 0 and self.rng.random() < 0.3:
+            op = self.rng.choice(["==", "!=", "<", "<=", ">", ">=", "is"])
+            return f"{self.arith_expr(depth - 1)} {op} {self.arith_expr(depth - 1)}"
+        return self.arith_expr(depth)
+
+    def arith_expr(self, depth: int) -> str:
+        return self.repeat(depth, self.term, ["+", "-"])
+
+    def term(self, depth: int) -> str:
+        return self.repeat(depth, self.cexpr, ["*", "//", "%"])
+
+    def cexpr(self, depth: int) -> str:
+        r = self.rng.random()
+        if depth <= 0 or r < 0.5:
+            primary = self.rng.choice(ATOMS)
+        elif r < 0.6:
+            primary = "-" + self.cexpr(depth - 1)
+        elif r < 0.75:
+            primary = f"({self.expr(depth - 1)})"
+        elif r < 0.85:
+            primary = f"[{self.expr(depth - 1)}, {self.expr(depth - 1)}]"
+        else:
+            primary = f"g({self.expr(depth - 1)}, {self.expr(depth - 1)})"
+        if depth > 0 and self.rng.random() < 0.1:
+            primary += f"[{self.expr(depth - 1)}]"
+        return primary
+
+
+def generate_program(statements: int, depth: int, nesting: int, seed: int) -> str:
+    generator = ExpressionGenerator(seed)
+    lines = [f"x = {generator.expr(depth)}\n" for _ in range(statements)]
+    lines.append("x = " + "(" * nesting + "1" + ")" * nesting + "\n")
+    lines.append("x = " + "-" * nesting + "1\n")
+    lines.append("x = " + " + ".join(["a"] * nesting) + "\n")
+    return "".join(lines)
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark expression parsing")
+    parser.add_argument("--statements", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--nesting", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    program = generate_program(args.statements, args.depth, args.nesting, args.seed)
+
+    lexer = Lexer(StringIO(program), tokenizer="regex")
+    num_tokens = 0
+    while lexer.consume().kind != TokenKind.EOF:
+        num_tokens += 1
+
+    start = time.perf_counter()
+    Parser(Lexer(StringIO(program), tokenizer="regex")).parse_program()
+    elapsed = time.perf_counter() - start
+
+    print(f"statements: {args.statements + 3}")
+    print(f"tokens: {num_tokens}")
+    print(f"time: {elapsed:.3f} s")
+    print(f"tokens/sec: {num_tokens / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    __main__()
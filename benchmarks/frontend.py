@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Measure the throughput and peak memory of the lexer and the parser on a
+program from `chocopy_generator`, for each scanner and tokenizer engine.
+
+    python3 benchmarks/frontend.py --functions 500 --json results.json
+
+The results are printed, and written as JSON to track regressions.
+"""
+
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from io import StringIO
+from typing import Any, Callable, Dict, List, Tuple
+
+from chocopy_generator import ProgramGenerator
+
+from choco.lexer import Lexer, TokenKind
+from choco.parser import Parser
+
+CONFIGURATIONS = [
+    {"scanner": "char", "tokenizer": "char"},
+    {"scanner": "block", "tokenizer": "char"},
+    {"scanner": "char", "tokenizer": "regex"},
+]
+
+
+def lex(program: str, configuration: Dict[str, str]) -> int:
+    lexer = Lexer(StringIO(program), **configuration)
+    num_tokens = 1
+    while lexer.consume().kind != TokenKind.EOF:
+        num_tokens += 1
+    return num_tokens
+
+
+def parse(program: str, configuration: Dict[str, str]) -> int:
+    module = Parser(Lexer(StringIO(program), **configuration)).parse_program()
+    return sum(1 for _ in module.walk())
+
+
+def best_time(run: Callable[[], int], repeat: int) -> Tuple[int, float]:
+    """Return the result of `run` and its best time of `repeat` runs."""
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def peak_memory(run: Callable[[], int]) -> int:
+    """Return the peak memory allocated by `run`, in bytes."""
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def benchmark(
+    program: str, configuration: Dict[str, str], repeat: int
+) -> Dict[str, Any]:
+    num_tokens, lex_time = best_time(lambda: lex(program, configuration), repeat)
+    num_ops, parse_time = best_time(lambda: parse(program, configuration), repeat)
+    return {
+        **configuration,
+        "tokens": num_tokens,
+        "lex_seconds": lex_time,
+        "tokens_per_sec": num_tokens / lex_time,
+        "lex_peak_bytes": peak_memory(lambda: lex(program, configuration)),
+        "ast_ops": num_ops,
+        "parse_seconds": parse_time,
+        "ast_ops_per_sec": num_ops / parse_time,
+        "parse_peak_bytes": peak_memory(lambda: parse(program, configuration)),
+    }
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark the ChocoPy front end")
+    parser.add_argument("--functions", type=int, default=200)
+    parser.add_argument("--nesting", type=int, default=3)
+    parser.add_argument("--expr-depth", type=int, default=3)
+    parser.add_argument("--string-length", type=int, default=16)
+    parser.add_argument("--comment-density", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    generator_options = {
+        "functions": args.functions,
+        "nesting": args.nesting,
+        "expr_depth": args.expr_depth,
+        "string_length": args.string_length,
+        "comment_density": args.comment_density,
+        "seed": args.seed,
+    }
+    program = ProgramGenerator(**generator_options).program()
+    num_lines = program.count("\n")
+    print(f"input: {len(program)} bytes, {num_lines} lines")
+
+    results: List[Dict[str, Any]] = []
+    for configuration in CONFIGURATIONS:
+        result = benchmark(program, configuration, args.repeat)
+        results.append(result)
+        print(
+            f"{result['scanner']}/{result['tokenizer']}: "
+            f"{result['tokens_per_sec']:.0f} tokens/sec, "
+            f"{result['ast_ops_per_sec']:.0f} AST ops/sec, "
+            f"peak {result['lex_peak_bytes'] / (1 << 20):.1f} MB lexing, "
+            f"{result['parse_peak_bytes'] / (1 << 20):.1f} MB parsing"
+        )
+
+    if args.json:
+        report = {
+            "generator": generator_options,
+            "input_bytes": len(program),
+            "input_lines": num_lines,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    __main__()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Compare a full parse to an incremental re-parse after a one-line edit.
+
+A generated ChocoPy program is parsed once by the incremental parser, one line
+of one function is edited, and the edited program is parsed both from scratch
+and incrementally.
+
+    python3 benchmarks/incremental_parse.py --size-kb 256
+"""
+
+import argparse
+import time
+from io import StringIO
+
+from lexer_throughput import generate_program
+from xdsl.printer import Printer
+
+from choco.incremental_parser import IncrementalParser
+from choco.lexer import Lexer
+from choco.parser import Parser
+
+
+def print_ir(module) -> str:
+    stream = StringIO()
+    Printer(stream=stream).print(module)
+    return stream.getvalue()
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark incremental parsing")
+    parser.add_argument("--size-kb", type=float, default=256.0)
+    parser.add_argument("--tokenizer", default="char")
+    args = parser.parse_args()
+
+    program = generate_program(int(args.size_kb * 1024), 80)
+    edited = program.replace("x: int = 7\n", "x: int = 42\n", 1)
+    assert edited != program
+
+    incremental = IncrementalParser(tokenizer=args.tokenizer)
+    start = time.perf_counter()
+    incremental.parse_program(program)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = Parser(Lexer(StringIO(edited), tokenizer=args.tokenizer)).parse_program()
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    module = incremental.parse_program(edited)
+    warm = time.perf_counter() - start
+
+    assert print_ir(module) == print_ir(expected)
+    print(f"input: {len(program) / 1024:.0f} KB")
+    print(f"items: {incremental.num_reused} reused, {incremental.num_parsed} parsed")
+    print(f"incremental, cold: {cold:.3f} s")
+    print(f"full parse: {full:.3f} s")
+    print(f"incremental, one edit: {warm:.3f} s")
+
+
+if __name__ == "__main__":
+    __main__()
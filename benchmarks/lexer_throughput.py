@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure the tokens/sec of `choco-lexer` for each scanner and tokenizer engine
+on a large generated ChocoPy program.
+
+    python3 benchmarks/lexer_throughput.py --size-mb 4 --line-width 65536
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+CONFIGURATIONS = [
+    ["--scanner", "char"],
+    ["--scanner", "block"],
+    ["--tokenizer", "regex"],
+]
+
+FUNCTION_TEMPLATE = """\
+def func_{i}(a: int, b: [int], s: str) -> int:
+    # Function number {i}, with a comment that the lexer has to skip.
+    x: int = {i}
+    y: bool = True
+    while x > 0 and y:
+        if x % 3 == 0:
+            x = x - a // 2
+        elif s == "value {i}\\tescaped\\n":
+            y = not y
+        else:
+            x = x - 1
+    for x in b:
+        print(x)
+    b = [{elems}]
+    return x + len(b) * -{i}
+
+"""
+
+
+def generate_program(size: int, line_width: int) -> str:
+    """Return a valid ChocoPy program of at least `size` characters.
+
+    Every function contains one list display of about `line_width` characters,
+    as found in generated code with long physical lines.
+    """
+    elems = ", ".join(str(i) for i in range(line_width // 6 + 1))
+    chunks: list[str] = []
+    length = 0
+    i = 0
+    while length < size:
+        chunk = FUNCTION_TEMPLATE.format(i=i, elems=elems)
+        chunks.append(chunk)
+        length += len(chunk)
+        i += 1
+    chunks.append('print(func_0(1, [1, 2, 3], ""))\n')
+    return "".join(chunks)
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark choco-lexer throughput")
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--line-width", type=int, default=65536)
+    args = parser.parse_args()
+
+    program = generate_program(int(args.size_mb * (1 << 20)), args.line_width)
+    with tempfile.NamedTemporaryFile("w", suffix=".choc", delete=False) as f:
+        f.write(program)
+    try:
+        print(f"input: {len(program) / (1 << 20):.1f} MB")
+        for configuration in CONFIGURATIONS:
+            result = subprocess.run(
+                ["choco-lexer", "--benchmark", *configuration, f.name],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            sys.stdout.write(result.stdout)
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    __main__()
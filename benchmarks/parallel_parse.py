@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Measure the parse time of a program with thousands of functions, sequentially
+and with a process pool of an increasing number of workers.
+
+    python3 benchmarks/parallel_parse.py --size-mb 2 --jobs 1 2 4 8
+"""
+
+import argparse
+import os
+import time
+from io import StringIO
+
+from lexer_throughput import generate_program
+
+from choco.lexer import Lexer
+from choco.parallel_parser import parse_program_parallel
+from choco.parser import Parser
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark parallel parsing")
+    parser.add_argument("--size-mb", type=float, default=2.0)
+    parser.add_argument(
+        "--jobs", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1]
+    )
+    args = parser.parse_args()
+
+    program = generate_program(int(args.size_mb * (1 << 20)), 80)
+    print(f"input: {len(program) / (1 << 20):.1f} MB")
+
+    start = time.perf_counter()
+    Parser(Lexer(StringIO(program))).parse_program()
+    print(f"sequential: {time.perf_counter() - start:.2f} s")
+
+    for jobs in sorted(set(args.jobs)):
+        start = time.perf_counter()
+        parse_program_parallel(program, jobs)
+        print(f"{jobs} jobs: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    __main__()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Measure the cost per token of the token lookahead used by the parser.
+
+The tokens of a generated ChocoPy program are produced once and replayed
+through the lexer, so that only the lookahead buffer and `Parser.check` /
+`Parser.match` are measured. The deque-backed lookahead is compared to the
+previous list-backed one, which copied the buffer on every consumed token and
+built a list on every multi-token check.
+
+Allocations are measured with `tracemalloc`: for every token, the memory that
+is allocated while checking and matching it and freed again by the end.
+
+    python3 benchmarks/parser_lookahead.py --size-mb 1
+"""
+
+import argparse
+import io
+import time
+import tracemalloc
+from typing import Callable, Iterator, List, Union
+
+from lexer_throughput import generate_program
+
+from choco.lexer import Lexer, RegexTokenizer, Token, TokenKind, Tokenizer
+from choco.parser import VAR_DEF_START, Parser
+
+
+class ReplayTokenizer(Tokenizer):
+    """Produce tokens from a list, with the deque-backed lookahead."""
+
+    def __init__(self, tokens: List[Token]):
+        super().__init__(None)
+        self.tokens: Iterator[Token] = iter(tokens)
+
+    def consume(self, keep_buffer: bool = False) -> Token:
+        if self.buffer and not keep_buffer:
+            return self.buffer.popleft()
+        return next(self.tokens)
+
+
+class ListReplayTokenizer(ReplayTokenizer):
+    """Produce tokens from a list, with the previous list-backed lookahead."""
+
+    def __init__(self, tokens: List[Token]):
+        super().__init__(tokens)
+        self.buffer = []
+
+    def peek(self, k: int = 1) -> Union[Token, List[Token]]:
+        if not self.buffer:
+            self.buffer = [self.consume()]
+
+        buffer_size = len(self.buffer)
+        if buffer_size < k:
+            for _ in list(range(k - buffer_size)):
+                self.buffer.append(self.consume(keep_buffer=True))
+
+        if k == 1:
+            return self.buffer[0]
+
+        return self.buffer[0:k]
+
+    def consume(self, keep_buffer: bool = False) -> Token:
+        if self.buffer and not keep_buffer:
+            c = self.buffer[0]
+            self.buffer = self.buffer[1:]
+            return c
+        return next(self.tokens)
+
+
+class ReplayLexer(Lexer):
+    def __init__(self, tokenizer: Tokenizer):
+        self.tokenizer = tokenizer
+
+
+class ListParser(Parser):
+    """The previous `check` and `match`, on top of `peek`."""
+
+    def check(self, expected: Union[List[TokenKind], TokenKind]) -> bool:
+        if isinstance(expected, list):
+            tokens = self.lexer.peek(len(expected))
+            assert isinstance(tokens, list), "List of tokens expected"
+            return all([tok.kind == type_ for tok, type_ in zip(tokens, expected)])
+
+        token = self.lexer.peek()
+        assert isinstance(token, Token), "Single token expected"
+        return token.kind == expected
+
+    def match(self, expected: TokenKind) -> Token:
+        if self.check(expected):
+            token = self.lexer.peek()
+            assert isinstance(token, Token), "A single token expected"
+            self.lexer.consume()
+            return token
+
+        self.error(f"token of kind {expected} not found")
+
+
+# Looking up an enum member allocates, so the kinds are looked up once.
+DEF, IDENTIFIER, COLON = TokenKind.DEF, TokenKind.IDENTIFIER, TokenKind.COLON
+
+
+def step_deque(parser: Parser):
+    """Check and match the next token, as `parse_def_seq` does."""
+    parser.check(DEF)
+    parser.check(VAR_DEF_START)
+    parser.match(parser.lexer.lookahead().kind)
+
+
+def step_list(parser: Parser):
+    """Check and match the next token, as `parse_def_seq` did."""
+    parser.check(DEF)
+    parser.check([IDENTIFIER, COLON])
+    parser.match(parser.lexer.peek().kind)
+
+
+def time_per_token(
+    parser: Parser, step: Callable[[Parser], None], num_tokens: int
+) -> float:
+    start = time.perf_counter()
+    for _ in range(num_tokens):
+        step(parser)
+    return (time.perf_counter() - start) / num_tokens
+
+
+def bytes_per_token(
+    parser: Parser, step: Callable[[Parser], None], num_tokens: int
+) -> float:
+    allocated = 0
+    tracemalloc.start()
+    for _ in range(num_tokens):
+        tracemalloc.reset_peak()
+        step(parser)
+        current, peak = tracemalloc.get_traced_memory()
+        allocated += peak - current
+    tracemalloc.stop()
+    return allocated / num_tokens
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark the parser lookahead")
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--line-width", type=int, default=80)
+    args = parser.parse_args()
+
+    program = generate_program(int(args.size_mb * (1 << 20)), args.line_width)
+    lexer = Lexer(io.StringIO(program), tokenizer="regex")
+    assert isinstance(lexer.tokenizer, RegexTokenizer)
+    tokens: List[Token] = []
+    while not tokens or tokens[-1].kind != TokenKind.EOF:
+        tokens.append(lexer.consume())
+    # Stop before EOF, so that the replayed tokens are never exhausted.
+    num_tokens = len(tokens) - 1
+
+    print(f"tokens: {num_tokens}")
+    for name, tokenizer, parser_class, step in [
+        ("list", ListReplayTokenizer, ListParser, step_list),
+        ("deque", ReplayTokenizer, Parser, step_deque),
+    ]:
+        elapsed = time_per_token(
+            parser_class(ReplayLexer(tokenizer(tokens))), step, num_tokens
+        )
+        allocated = bytes_per_token(
+            parser_class(ReplayLexer(tokenizer(tokens))), step, num_tokens
+        )
+        print(
+            f"{name}: {elapsed * 1e9:.0f} ns/token, "
+            f"{allocated:.1f} bytes allocated/token"
+        )
+
+
+if __name__ == "__main__":
+    __main__()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measure the time of each semantic-analysis pass, of the fused
+`semantic-analysis` pass, of a plain traversal of the AST by a `Visitor`, and
+of building the type environment from the AST and from the symbol table of
+`name-analysis`, on a program from `chocopy_generator`.
+
+    python3 benchmarks/semantic_analysis.py --functions 500
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from io import StringIO
+from typing import Callable, List
+
+from chocopy_generator import ProgramGenerator
+from xdsl.context import MLContext
+from xdsl.dialects.builtin import ModuleOp
+
+from choco.ast_visitor import Visitor
+from choco.check_assign_target import CheckAssignTargetPass
+from choco.dialects.choco_ast import ExprName
+from choco.lexer import Lexer
+from choco.name_analysis import NameAnalysis
+from choco.parser import Parser
+from choco.semantic_analysis import SemanticAnalysis
+from choco.symbol_table import get_symbol_table
+from choco.type_checking import TypeChecking, build_env, env_from_symbol_table
+
+
+@dataclass
+class CountNamesVisitor(Visitor):
+    count: int = 0
+
+    def visit_expr_name(self, expr_name: ExprName):
+        self.count += 1
+
+
+def best_time(run: Callable[[], object], repeat: int) -> float:
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark semantic analysis")
+    parser.add_argument("--functions", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    program = ProgramGenerator(functions=args.functions, seed=args.seed).program()
+    module: ModuleOp = Parser(
+        Lexer(StringIO(program), tokenizer="regex")
+    ).parse_program()
+    num_ops = sum(1 for _ in module.walk())
+    print(f"input: {len(program)} bytes, {num_ops} AST ops")
+
+    ctx = MLContext()
+    passes = [CheckAssignTargetPass(), NameAnalysis(), TypeChecking()]
+    total = 0.0
+    traverse = best_time(lambda: CountNamesVisitor().traverse(module), args.repeat)
+    print(f"traversal: {traverse * 1000:.1f} ms, {num_ops / traverse:.0f} ops/sec")
+    for p in passes:
+        elapsed = best_time(lambda: p.apply(ctx, module), args.repeat)
+        total += elapsed
+        print(f"{p.name}: {elapsed * 1000:.1f} ms")
+    print(f"semantic analysis: {total * 1000:.1f} ms")
+    table = get_symbol_table(module)
+    assert table is not None
+    from_ast = best_time(lambda: build_env(module), args.repeat)
+    from_table = best_time(lambda: env_from_symbol_table(table), args.repeat)
+    print(
+        f"environment: {from_ast * 1000:.1f} ms from the AST, "
+        f"{from_table * 1000:.1f} ms from the symbol table"
+    )
+    fused = best_time(lambda: SemanticAnalysis().apply(ctx, module), args.repeat)
+    print(f"{SemanticAnalysis.name}: {fused * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    __main__()
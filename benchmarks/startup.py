@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Measure the startup time of choco-opt, as reported by `python -X importtime`,
+for `choco-opt --help` and for the compilation of a tiny program to RISC-V.
+
+    python3 benchmarks/startup.py --json results.json
+
+Each run starts a new interpreter. The best wall time of `--repeat` runs is
+compared to a budget relative to the best wall time of `python -c pass`, so
+that the budgets hold on machines of any speed, and the benchmark fails if a
+budget is exceeded. It runs in CI to catch imports that slow down every
+choco-opt call.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TINY_PROGRAM = """\
+x: int = 1
+print(x + 2)
+"""
+
+# The wall time budgets, as multiples of the startup of a bare interpreter,
+# about 40% above the usual ratios when choco-opt stopped importing the passes
+# and the frontend at startup, which vary by about 20% between runs.
+HELP_BUDGET = 12.0
+COMPILE_BUDGET = 20.0
+
+
+def parse_import_times(stderr: str) -> Tuple[float, List[Tuple[float, str]]]:
+    """
+    Parse the output of `-X importtime`.
+
+    :returns: The total import time in milliseconds, and the cumulative time
+              and name of each top-level import, slowest first.
+    """
+    imports: List[Tuple[float, str]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit() or name[1:].startswith(" "):
+            # The header, or a nested import.
+            continue
+        imports.append((int(cumulative) / 1000, name.strip()))
+    imports.sort(reverse=True)
+    return sum(t for t, _ in imports), imports
+
+
+def run_python(args: List[str]) -> Tuple[float, float, List[Tuple[float, str]]]:
+    """
+    Run a new interpreter with the given arguments.
+
+    :returns: The wall time and the import time in milliseconds, and the
+              top-level imports.
+    """
+    command = [sys.executable, "-X", "importtime", *args]
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    wall_time = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+    import_time, imports = parse_import_times(result.stderr)
+    return wall_time, import_time, imports
+
+
+def benchmark(name: str, args: List[str], repeat: int) -> Dict[str, Any]:
+    runs = [run_python(args) for _ in range(repeat)]
+    wall_time = min(run[0] for run in runs)
+    import_time, imports = min(((run[1], run[2]) for run in runs), key=lambda r: r[0])
+    return {
+        "name": name,
+        "args": args,
+        "wall_ms": wall_time,
+        "import_ms": import_time,
+        "imports": [{"module": module, "ms": t} for t, module in imports],
+    }
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark the startup of choco-opt")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--help-budget",
+        type=float,
+        default=HELP_BUDGET,
+        help="the wall time budget of `choco-opt --help`, as a multiple of the "
+        "startup of a bare interpreter",
+    )
+    parser.add_argument(
+        "--compile-budget",
+        type=float,
+        default=COMPILE_BUDGET,
+        help="the wall time budget of compiling a tiny program, as a multiple of "
+        "the startup of a bare interpreter",
+    )
+    parser.add_argument("--top", type=int, default=5, help="the imports to show")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        program = os.path.join(directory, "tiny.choc")
+        with open(program, "w") as f:
+            f.write(TINY_PROGRAM)
+        bare = benchmark("bare", ["-c", "pass"], args.repeat)
+        choco_opt = ["-m", "tools.choco_opt"]
+        results = [
+            benchmark("help", [*choco_opt, "--help"], args.repeat),
+            benchmark(
+                "compile",
+                [*choco_opt, program, "-p", "all", "-t", "riscv"],
+                args.repeat,
+            ),
+        ]
+    budgets = {"help": args.help_budget, "compile": args.compile_budget}
+
+    print(f"bare: {bare['wall_ms']:.1f} ms wall, {bare['import_ms']:.1f} ms importing")
+    over_budget = False
+    for result in results:
+        result["relative"] = result["wall_ms"] / bare["wall_ms"]
+        result["budget"] = budgets[result["name"]]
+        result["budget_ms"] = result["budget"] * bare["wall_ms"]
+        status = "ok"
+        if result["relative"] > result["budget"]:
+            status = "OVER BUDGET"
+            over_budget = True
+        print(
+            f"{result['name']}: {result['wall_ms']:.1f} ms wall, "
+            f"{result['import_ms']:.1f} ms importing, {result['relative']:.1f}x "
+            f"bare (budget {result['budget']:.1f}x, {result['budget_ms']:.0f} ms) "
+            f"{status}"
+        )
+        for entry in result["imports"][: args.top]:
+            print(f"  {entry['ms']:8.1f} ms  {entry['module']}")
+
+    if args.json:
+        report = {
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "bare": bare,
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    __main__()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Compare the peak memory of building the type environment of a large generated
+ChocoPy program from the whole AST, and from the top-level items yielded by
+`Parser.iter_program`, each dropped once it is added to the environment.
+
+    python3 benchmarks/streaming_parse.py --size-mb 0.25
+"""
+
+import argparse
+import time
+import tracemalloc
+from io import StringIO
+from typing import Callable
+
+from lexer_throughput import generate_program
+
+from choco.lexer import Lexer
+from choco.parser import Parser
+from choco.type_checking import build_env, builtin_env, extend_env
+
+
+def measure(name: str, run: Callable[[], object]):
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name}: {elapsed:.2f} s, peak memory {peak / (1 << 20):.1f} MB")
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark streaming parsing")
+    parser.add_argument("--size-mb", type=float, default=0.25)
+    parser.add_argument("--tokenizer", default="regex")
+    args = parser.parse_args()
+
+    program = generate_program(int(args.size_mb * (1 << 20)), 80)
+    print(f"input: {len(program) / (1 << 20):.1f} MB")
+
+    def whole():
+        lexer = Lexer(StringIO(program), tokenizer=args.tokenizer)
+        return build_env(Parser(lexer).parse_program())
+
+    def streaming():
+        lexer = Lexer(StringIO(program), tokenizer=args.tokenizer)
+        o = builtin_env()
+        for op in Parser(lexer).iter_program():
+            extend_env(o, op)
+        return o
+
+    assert whole().keys() == streaming().keys()
+    measure("parse_program + build_env", whole)
+    measure("iter_program + extend_env", streaming)
+
+
+if __name__ == "__main__":
+    __main__()
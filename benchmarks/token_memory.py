@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Measure the memory held by the tokens of a large generated ChocoPy program,
+and the time to lex and to parse it.
+
+    python3 benchmarks/token_memory.py --size-mb 2
+"""
+
+import argparse
+import time
+import tracemalloc
+from io import StringIO
+from typing import List
+
+from lexer_throughput import generate_program
+
+from choco.lexer import Lexer, Token, TokenKind
+from choco.parser import Parser
+
+
+def lex(program: str, tokenizer: str) -> List[Token]:
+    lexer = Lexer(StringIO(program), tokenizer=tokenizer)
+    tokens: List[Token] = []
+    while not tokens or tokens[-1].kind != TokenKind.EOF:
+        tokens.append(lexer.consume())
+    return tokens
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark token memory")
+    parser.add_argument("--size-mb", type=float, default=2.0)
+    parser.add_argument("--tokenizer", default="regex")
+    args = parser.parse_args()
+
+    program = generate_program(int(args.size_mb * (1 << 20)), 80)
+    print(f"input: {len(program) / (1 << 20):.1f} MB")
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tokens = lex(program, args.tokenizer)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"tokens: {len(tokens)}")
+    print(f"token memory: {(after - before) / (1 << 20):.1f} MB")
+    print(f"bytes/token: {(after - before) / len(tokens):.1f}")
+    del tokens
+
+    start = time.perf_counter()
+    lex(program, args.tokenizer)
+    print(f"lex time: {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    Parser(Lexer(StringIO(program), tokenizer=args.tokenizer)).parse_program()
+    print(f"parse time: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    __main__()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Measure the time of the type-checking pass on a program with many functions
+that use deeply nested list types.
+
+    python3 benchmarks/type_checking.py --functions 2000 --depth 8
+
+With `--jobs`, the function bodies are checked in a process pool.
+"""
+
+import argparse
+import time
+from io import StringIO
+
+from xdsl.context import MLContext
+
+from choco.lexer import Lexer
+from choco.parser import Parser
+from choco.type_checking import TypeChecking
+
+FUNCTION_TEMPLATE = """\
+def func_{i}(x: {t}, y: {t}, n: int) -> {t}:
+    z: {t} = None
+    e: {e} = None
+    z = x + y
+    z = [x[n], y[n]] + z
+    z = [z[0], None] + [x[n]]
+    e = x[0]{index}
+    while e is None:
+        e = y[n]{index}
+    return z if n > 0 else func_{prev}(z, [y[0], None], n - 1)
+
+"""
+
+
+def generate_program(functions: int, depth: int) -> str:
+    t = "[" * depth + "int" + "]" * depth
+    chunks = [
+        FUNCTION_TEMPLATE.format(
+            i=i,
+            prev=max(i - 1, 0),
+            t=t,
+            e="[int]" if depth > 1 else "int",
+            index="[0]" * (depth - 2),
+        )
+        for i in range(functions)
+    ]
+    chunks.append(f"func_{functions - 1}(None, None, 0)\n")
+    return "".join(chunks)
+
+
+def __main__():
+    parser = argparse.ArgumentParser(description="Benchmark type checking")
+    parser.add_argument("--functions", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=1)
+    args = parser.parse_args()
+
+    program = generate_program(args.functions, args.depth)
+    module = Parser(Lexer(StringIO(program), tokenizer="regex")).parse_program()
+
+    ctx = MLContext()
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        TypeChecking(jobs=args.jobs).apply(ctx, module)
+        times.append(time.perf_counter() - start)
+    print(f"functions: {args.functions}, list depth: {args.depth}, jobs: {args.jobs}")
+    print(f"type-checking: {min(times) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    __main__()
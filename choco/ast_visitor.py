@@ -1,12 +1,13 @@
 import re
-from typing import Any, Callable
+from typing import Any, Callable, ClassVar, Dict, List, Tuple, Type, Union
 
 from choco.dialects.choco_ast import *
 
+CAMEL_TO_SNAKE = re.compile(r"(?<!^)(?=[A-Z])")
+
 
 def camel_to_snake(name: str) -> str:
-    pattern = re.compile(r"(?<!^)(?=[A-Z])")
-    return pattern.sub("_", name).lower()
+    return CAMEL_TO_SNAKE.sub("_", name).lower()
 
 
 def get_method(instance: object, method: str) -> Optional[Callable[..., Any]]:
@@ -20,19 +21,74 @@ def get_method(instance: object, method: str) -> Optional[Callable[..., Any]]:
             return None
 
 
+# The unbound `traverse_*` and `visit_*` methods of a visitor class for an
+# operation class, or None if the visitor does not define them.
+Handlers = Tuple[Optional[Callable[..., Any]], Optional[Callable[..., Any]]]
+
+
 class Visitor:
+    # The handlers of each operation class, filled in the first time an
+    # operation of that class is visited. Each subclass has its own table.
+    dispatch_table: ClassVar[Dict[Type[Operation], Handlers]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch_table = {}
+
+    @classmethod
+    def handlers(cls, op_type: Type[Operation]) -> Handlers:
+        handlers = cls.dispatch_table.get(op_type)
+        if handlers is None:
+            class_name = camel_to_snake(op_type.__name__)
+            handlers = (
+                get_method(cls, f"traverse_{class_name}"),
+                get_method(cls, f"visit_{class_name}"),
+            )
+            cls.dispatch_table[op_type] = handlers
+        return handlers
+
     def traverse(self, operation: Operation):
-        class_name = camel_to_snake(type(operation).__name__)
+        """
+        Visit `operation` and its nested operations in post-order.
 
-        traverse = get_method(self, f"traverse_{class_name}")
-        if traverse:
-            traverse(operation)
-        else:
-            for r in operation.regions:
-                for b in r.blocks:
-                    for op in b.ops:
-                        self.traverse(op)
-
-        visit = get_method(self, f"visit_{class_name}")
-        if visit:
-            visit(operation)
+        An operation is passed to `traverse_<op name>` if the visitor defines
+        it, which is then responsible for traversing the nested operations,
+        and otherwise its nested operations are traversed. It is then passed
+        to `visit_<op name>` if the visitor defines it.
+
+        The traversal uses an explicit stack, so that deeply nested ASTs do
+        not exhaust the recursion limit.
+        """
+        dispatch_table = type(self).dispatch_table
+        # Operations to traverse, and (visit method, operation) pairs of the
+        # operations whose nested operations are being traversed.
+        stack: List[Union[Operation, Tuple[Callable[..., Any], Operation]]] = [
+            operation
+        ]
+        while stack:
+            op = stack.pop()
+            if type(op) is tuple:
+                visit, op = op
+                visit(self, op)
+                continue
+            handlers = dispatch_table.get(type(op))
+            if handlers is None:
+                handlers = self.handlers(type(op))
+            traverse, visit = handlers
+            if traverse is not None:
+                traverse(self, op)
+                if visit is not None:
+                    visit(self, op)
+                continue
+            if visit is not None:
+                stack.append((visit, op))
+            # Push the nested operations in reverse order, so that they are
+            # popped in order.
+            for r in reversed(op.regions):
+                b = r.last_block
+                while b is not None:
+                    nested = b.last_op
+                    while nested is not None:
+                        stack.append(nested)
+                        nested = nested.prev_op
+                    b = b.prev_block
@@ -23,6 +23,7 @@ from choco.dialects.choco_flat import (
     Store,
     Yield,
 )
+from choco.symbol_table import SymbolTable, get_symbol_table
 from choco.type_checking import Type, join, to_attribute
 from util.list_ops import flatten
 
@@ -35,6 +36,32 @@ class SSAValueCtx:
 
     dictionary: Dict[str, SSAValue] = field(default_factory=dict)
     parent_scope: Optional[SSAValueCtx] = None
+    # The symbols resolved by name analysis, if it ran on the program, and the
+    # SSA value of each symbol, shared by all scopes.
+    symbol_table: Optional[SymbolTable] = None
+    symbol_values: Dict[int, SSAValue] = field(default_factory=dict)
+
+    def nested(self, dictionary: Dict[str, SSAValue]) -> SSAValueCtx:
+        """Create a nested scope that shares the symbols of this scope"""
+        return SSAValueCtx(dictionary, self, self.symbol_table, self.symbol_values)
+
+    def lookup(self, op: Operation, identifier: str) -> Optional[SSAValue]:
+        """
+        Return the SSA value of the symbol that op resolves to, or of the given
+        identifier in the current or a parent scope if op was not resolved
+        """
+        if self.symbol_table is not None:
+            symbol = self.symbol_table.resolved.get(op)
+            if symbol is not None and symbol in self.symbol_values:
+                return self.symbol_values[symbol]
+        return self[identifier]
+
+    def define_symbol(self, op: Operation, ssa_value: SSAValue):
+        """Relate the symbol that op defines, if it was resolved, and SSA value"""
+        if self.symbol_table is not None:
+            symbol = self.symbol_table.resolved.get(op)
+            if symbol is not None:
+                self.symbol_values[symbol] = ssa_value
 
     def __getitem__(self, identifier: str) -> Optional[SSAValue]:
         """Check if the given identifier is in the current scope, or a parent scope"""
@@ -61,7 +88,7 @@ class ChocoASTToChocoFlat(ModulePass):
         input_program = op.ops.first
         assert isinstance(input_program, choco_ast.Program)
         assert len(op.ops) == 1
-        res_module = translate_program(input_program)
+        res_module = translate_program(input_program, get_symbol_table(op))
         move_free_ops_into_main(ctx, res_module)
         op.body.detach_block(op.body.block)
         res_module.body.move_blocks(op.body)
@@ -87,9 +114,11 @@ def move_free_ops_into_main(ctx: MLContext, module: ModuleOp):
     module.regions[0].blocks[0].add_ops([main])
 
 
-def translate_program(p: choco_ast.Program) -> ModuleOp:
+def translate_program(
+    p: choco_ast.Program, symbol_table: Optional[SymbolTable] = None
+) -> ModuleOp:
     # create an empty global context
-    global_ctx = SSAValueCtx()
+    global_ctx = SSAValueCtx(symbol_table=symbol_table)
     # first translate all var definitions
     nested_var_defs: List[List[Operation]] = [
         translate_def(global_ctx, op)
@@ -195,9 +224,9 @@ def translate_fun_def(ctx: SSAValueCtx, fun_def: choco_ast.FuncDef) -> Operation
         # store the passed parameter value into the allocated memory location
         store = Store.build(operands=[alloc, arg])
         block.add_ops([alloc, store])
-    c = SSAValueCtx(
-        dictionary=dict(zip(param_names, reversed(allocs))), parent_scope=ctx
-    )
+    c = ctx.nested(dict(zip(param_names, reversed(allocs))))
+    for op, memloc in zip(fun_def.params.blocks[0].ops, reversed(allocs)):
+        c.define_symbol(op, memloc)
     block.add_ops(
         flatten(
             [translate_def_or_stmt(c, op) for op in fun_def.func_body.blocks[0].ops]
@@ -245,6 +274,7 @@ def translate_var_def(ctx: SSAValueCtx, var_def: choco_ast.VarDef) -> List[Opera
 
     # relate variable identifier and SSA value by adding it into the current context
     ctx[var_name.data] = alloc.results[0]
+    ctx.define_symbol(typed_var, alloc.results[0])
 
     return init + [alloc, store]
 
@@ -263,7 +293,7 @@ def try_translate_expr(
         op = translate_literal(op)
         return [op], op.results[0]
     if isinstance(op, choco_ast.ExprName):
-        ssa_value = ctx[op.id.data]  # type: ignore
+        ssa_value = ctx.lookup(op, op.id.data)  # type: ignore
         assert isinstance(ssa_value, SSAValue)
         return [], ssa_value
     if isinstance(op, choco_ast.UnaryExpr):
@@ -621,7 +651,7 @@ def translate_for(ctx: SSAValueCtx, for_stmt: choco_ast.For) -> List[Operation]:
         ops += stmt_ops
     body = Region([Block(ops)])
 
-    iterator = ctx[for_stmt.iter_name.data]  # type: ignore
+    iterator = ctx.lookup(for_stmt, for_stmt.iter_name.data)  # type: ignore
     new_op = choco_flat.For.build(operands=[iterator, target_name], regions=[body])
     return target + [new_op]
 
@@ -4,7 +4,6 @@ from dataclasses import dataclass
 
 from xdsl.context import MLContext
 from xdsl.dialects.builtin import ModuleOp
-from xdsl.passes import ModulePass
 from xdsl.pattern_rewriter import (
     GreedyRewritePatternApplier,
     PatternRewriter,
@@ -16,6 +15,7 @@ from xdsl.pattern_rewriter import (
 from choco.dialects.choco_flat import *
 from choco.dialects.choco_type import *
 from choco.dialects.choco_type import ListType, bool_type, int_type, str_type
+from choco.incremental_verification import RewritingPass
 from riscv.ssa_dialect import *
 
 
@@ -113,7 +113,7 @@ class BinaryExprPattern(RewritePattern):
             rewriter.replace_op(op, [call, complement])
 
 
-class ChocoFlatIntroduceLibraryCalls(ModulePass):
+class ChocoFlatIntroduceLibraryCalls(RewritingPass):
     name = "choco-flat-introduce-library-calls"
 
     def apply(self, ctx: MLContext, op: ModuleOp):
@@ -125,6 +125,7 @@ class ChocoFlatIntroduceLibraryCalls(ModulePass):
                 ]
             ),
             apply_recursively=False,
+            listener=self.listener,
         )
 
         walker.rewrite_module(op)
@@ -3,7 +3,6 @@
 
 from xdsl.context import MLContext
 from xdsl.dialects.builtin import ModuleOp, IntegerAttr
-from xdsl.passes import ModulePass
 from xdsl.pattern_rewriter import (
     GreedyRewritePatternApplier,
     PatternRewriter,
@@ -50,6 +49,8 @@ from choco.dialects.choco_flat import (
     str_type,
 )
 
+from choco.incremental_verification import RewritingPass
+
 # ---- RISC-V SSA Dialect (riscv/ssa_dialect.py) ----
 from riscv.ssa_dialect import (
     RegisterType,
@@ -766,13 +767,18 @@ class ReturnPattern(RewritePattern):
 
 # =========== 主 Pass ===========
 
-class ChocoFlatToRISCVSSA(ModulePass):
+class ChocoFlatToRISCVSSA(RewritingPass):
     """
     Convert the choco_ir (flat) dialect to riscv_ssa dialect
     """
     name = "choco-flat-to-riscv-ssa"
 
     def apply(self, ctx: MLContext, op: ModuleOp) -> None:
+        # Number the labels of each module from zero, also when a process
+        # compiles several modules, as the compile server does
+        for pattern in (IfPattern, AndPattern, OrPattern, IfExprPattern, WhilePattern):
+            pattern.counter = 0
+
         # 1) Main pass
         walker = PatternRewriteWalker(
             GreedyRewritePatternApplier(
@@ -802,6 +808,7 @@ class ChocoFlatToRISCVSSA(ModulePass):
                 ]
             ),
             apply_recursively=True,
+            listener=self.listener,
         )
         walker.rewrite_module(op)
 
@@ -809,5 +816,6 @@ class ChocoFlatToRISCVSSA(ModulePass):
         walker2 = PatternRewriteWalker(
             GreedyRewritePatternApplier([YieldPattern()]),
             apply_recursively=True,
+            listener=self.listener,
         )
         walker2.rewrite_module(op)
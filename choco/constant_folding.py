@@ -4,7 +4,6 @@ from dataclasses import dataclass
 
 from xdsl.context import MLContext
 from xdsl.dialects.builtin import IntegerAttr, ModuleOp
-from xdsl.passes import ModulePass
 from xdsl.pattern_rewriter import (
     GreedyRewritePatternApplier,
     PatternRewriter,
@@ -15,6 +14,7 @@ from xdsl.pattern_rewriter import (
 
 from choco.dialects.choco_flat import *
 from choco.dialects.choco_type import *
+from choco.incremental_verification import RewritingPass
 
 
 @dataclass
@@ -38,7 +38,7 @@ class BinaryExprRewriter(RewritePattern):
         return
 
 
-class ChocoFlatConstantFolding(ModulePass):
+class ChocoFlatConstantFolding(RewritingPass):
     name = "choco-flat-constant-folding"
 
     def apply(self, ctx: MLContext, op: ModuleOp) -> None:
@@ -47,7 +47,8 @@ class ChocoFlatConstantFolding(ModulePass):
                 [
                     BinaryExprRewriter(),
                 ]
-            )
+            ),
+            listener=self.listener,
         )
 
         walker.rewrite_module(op)
@@ -0,0 +1,289 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+from xdsl.ir import Operation
+
+from choco.dialects.choco_ast import *
+
+# Sets of variables or definitions are bit vectors, stored as Python integers:
+# bit i is set iff element i is in the set.
+BitSet = int
+
+# The bits an element of a basic block generates and kills.
+GenKill = Tuple[BitSet, BitSet]
+
+
+@dataclass(eq=False)
+class BasicBlock:
+    """
+    A sequence of elements that are executed in order. An element is one of:
+
+    - an `Assign`, a `Return`, or an expression used as a statement,
+    - the condition of an `If` or a `While`, or the iterable of a `For`,
+    - a `For`, which assigns the next element of the iterable to the loop
+      variable at the start of the loop body. The loop variable is not
+      written when the loop exits.
+    """
+
+    elements: List[Operation] = field(default_factory=list)
+    succs: List["BasicBlock"] = field(default_factory=list)
+    preds: List["BasicBlock"] = field(default_factory=list)
+
+    def add_succ(self, succ: "BasicBlock"):
+        self.succs.append(succ)
+        succ.preds.append(self)
+
+
+@dataclass
+class ControlFlowGraph:
+    """
+    The control flow graph of a sequence of `choco_ast` statements, such as a
+    function body or the statements of a program.
+
+    `exit` is empty, and is the successor of the last block and of the blocks
+    that end with a `Return`.
+    """
+
+    entry: BasicBlock
+    exit: BasicBlock
+    blocks: List[BasicBlock]
+    # The block each statement starts in, including nested statements.
+    block_of: Dict[Operation, BasicBlock]
+
+    def reachable(self) -> Set[BasicBlock]:
+        """The blocks that are reachable from the entry."""
+        reached = {self.entry}
+        worklist = [self.entry]
+        while worklist:
+            for succ in worklist.pop().succs:
+                if succ not in reached:
+                    reached.add(succ)
+                    worklist.append(succ)
+        return reached
+
+
+def bits(s: BitSet) -> Iterator[int]:
+    """The elements of a set, in increasing order."""
+    while s:
+        low = s & -s
+        yield low.bit_length() - 1
+        s ^= low
+
+
+def build_cfg(stmts: Iterable[Operation]) -> ControlFlowGraph:
+    """
+    Build the control flow graph of a sequence of statements.
+
+    Definitions and declarations are not elements of any block. Nested
+    function definitions are not part of the graph.
+    """
+    entry = BasicBlock()
+    exit = BasicBlock()
+    blocks = [entry]
+    block_of: Dict[Operation, BasicBlock] = {}
+
+    def new_block() -> BasicBlock:
+        block = BasicBlock()
+        blocks.append(block)
+        return block
+
+    def build(stmts: Iterable[Operation], current: BasicBlock) -> BasicBlock:
+        for stmt in stmts:
+            block_of[stmt] = current
+            if isinstance(stmt, If):
+                current.elements.append(stmt.cond.op)
+                then_block = new_block()
+                else_block = new_block()
+                current.add_succ(then_block)
+                current.add_succ(else_block)
+                join = new_block()
+                build(stmt.then.ops, then_block).add_succ(join)
+                build(stmt.orelse.ops, else_block).add_succ(join)
+                current = join
+            elif isinstance(stmt, While):
+                header = new_block()
+                current.add_succ(header)
+                header.elements.append(stmt.cond.op)
+                body = new_block()
+                header.add_succ(body)
+                build(stmt.body.ops, body).add_succ(header)
+                current = new_block()
+                header.add_succ(current)
+            elif isinstance(stmt, For):
+                current.elements.append(stmt.iter.op)
+                header = new_block()
+                current.add_succ(header)
+                body = new_block()
+                header.add_succ(body)
+                body.elements.append(stmt)
+                build(stmt.body.ops, body).add_succ(header)
+                current = new_block()
+                header.add_succ(current)
+            elif isinstance(stmt, Return):
+                current.elements.append(stmt)
+                current.add_succ(exit)
+                # The statements that follow are unreachable.
+                current = new_block()
+            elif isinstance(stmt, (VarDef, FuncDef, GlobalDecl, NonLocalDecl, Pass)):
+                pass
+            else:
+                current.elements.append(stmt)
+        return current
+
+    build(stmts, entry).add_succ(exit)
+    blocks.append(exit)
+    return ControlFlowGraph(entry, exit, blocks, block_of)
+
+
+class Dataflow:
+    """
+    A gen/kill bit-vector dataflow problem on a control flow graph, solved by
+    worklist iteration. The meet is the union, as in may analyses.
+
+    :param cfg: The control flow graph.
+    :param forward: Whether facts flow along or against the edges.
+    :param gen_kill: The bits each element generates and kills.
+    :param boundary: The facts at the entry of a forward problem, or at the
+                     exit of a backward one.
+    """
+
+    def __init__(
+        self,
+        cfg: ControlFlowGraph,
+        forward: bool,
+        gen_kill: Callable[[Operation], GenKill],
+        boundary: BitSet = 0,
+    ):
+        self.cfg = cfg
+        self.forward = forward
+        self.gen_kill = gen_kill
+
+        # The gen and kill sets of each block, composed from its elements.
+        block_gen_kill: Dict[BasicBlock, GenKill] = {}
+        for block in cfg.blocks:
+            gen = kill = 0
+            elements = block.elements if forward else reversed(block.elements)
+            for element in elements:
+                g, k = gen_kill(element)
+                gen = g | (gen & ~k)
+                kill |= k
+            block_gen_kill[block] = (gen, kill)
+
+        # The facts before and after each block, in program order.
+        self.before: Dict[BasicBlock, BitSet] = {block: 0 for block in cfg.blocks}
+        self.after: Dict[BasicBlock, BitSet] = {block: 0 for block in cfg.blocks}
+        start = cfg.entry if forward else cfg.exit
+        # Facts flow from the `ins` of a block to its `outs`.
+        ins, outs = (self.before, self.after) if forward else (self.after, self.before)
+        ins[start] = boundary
+
+        order = cfg.blocks if forward else list(reversed(cfg.blocks))
+        worklist = deque(order)
+        queued = set(order)
+        while worklist:
+            block = worklist.popleft()
+            queued.discard(block)
+            if block is not start:
+                sources = block.preds if forward else block.succs
+                value = 0
+                for source in sources:
+                    value |= outs[source]
+                ins[block] = value
+            gen, kill = block_gen_kill[block]
+            out = gen | (ins[block] & ~kill)
+            if out == outs[block]:
+                # Every block is processed at least once, from the initial
+                # worklist, so its successors already saw this value.
+                continue
+            outs[block] = out
+            for target in block.succs if forward else block.preds:
+                if target not in queued:
+                    queued.add(target)
+                    worklist.append(target)
+
+    def elements(self, block: BasicBlock) -> List[Tuple[Operation, BitSet, BitSet]]:
+        """
+        The elements of a block, each with the facts before and after it, in
+        program order.
+        """
+        result: List[Tuple[Operation, BitSet, BitSet]] = []
+        if self.forward:
+            value = self.before[block]
+            for element in block.elements:
+                gen, kill = self.gen_kill(element)
+                new_value = gen | (value & ~kill)
+                result.append((element, value, new_value))
+                value = new_value
+        else:
+            value = self.after[block]
+            for element in reversed(block.elements):
+                gen, kill = self.gen_kill(element)
+                new_value = gen | (value & ~kill)
+                result.append((element, new_value, value))
+                value = new_value
+            result.reverse()
+        return result
+
+
+class LiveVariables(Dataflow):
+    """
+    The variables that may be read before they are written again.
+
+    :param uses_defs: The variables each element reads and writes. An element
+                      reads its variables before it writes its variables.
+    :param live_at_exit: The variables that are live at the exit.
+    """
+
+    def __init__(
+        self,
+        cfg: ControlFlowGraph,
+        uses_defs: Callable[[Operation], GenKill],
+        live_at_exit: BitSet = 0,
+    ):
+        super().__init__(cfg, False, uses_defs, live_at_exit)
+
+
+class ReachingDefinitions(Dataflow):
+    """
+    The definitions that may reach a point without being overwritten.
+
+    A definition is an element together with a variable that it writes. Bit i
+    of the facts is the definition `definitions[i]`. The definitions at the
+    entry, such as the initial values of variables and the parameters of a
+    function, are operations outside of the graph that reach its entry.
+
+    :param defs: The variables each element writes.
+    :param entry_defs: The definitions at the entry.
+    """
+
+    def __init__(
+        self,
+        cfg: ControlFlowGraph,
+        defs: Callable[[Operation], BitSet],
+        entry_defs: Sequence[Tuple[Operation, int]] = (),
+    ):
+        self.definitions: List[Tuple[Operation, int]] = list(entry_defs)
+        # The definitions of each variable, and of each element.
+        var_defs: Dict[int, BitSet] = {}
+        for i, (_, var) in enumerate(self.definitions):
+            var_defs[var] = var_defs.get(var, 0) | 1 << i
+        boundary = (1 << len(self.definitions)) - 1
+        element_defs: Dict[Operation, BitSet] = {}
+        for block in cfg.blocks:
+            for element in block.elements:
+                gen = 0
+                for var in bits(defs(element)):
+                    bit = 1 << len(self.definitions)
+                    self.definitions.append((element, var))
+                    var_defs[var] = var_defs.get(var, 0) | bit
+                    gen |= bit
+                element_defs[element] = gen
+
+        def gen_kill(element: Operation) -> GenKill:
+            kill = 0
+            for var in bits(defs(element)):
+                kill |= var_defs[var]
+            return element_defs[element], kill
+
+        super().__init__(cfg, True, gen_kill, boundary)
@@ -2,7 +2,6 @@ from dataclasses import dataclass
 
 from xdsl.context import MLContext
 from xdsl.dialects.builtin import ModuleOp
-from xdsl.passes import ModulePass
 from xdsl.pattern_rewriter import (
     GreedyRewritePatternApplier,
     PatternRewriter,
@@ -13,6 +12,7 @@ from xdsl.pattern_rewriter import (
 
 from choco.dialects.choco_flat import *
 from choco.dialects.choco_type import *
+from choco.incremental_verification import RewritingPass
 
 
 @dataclass
@@ -39,7 +39,7 @@ class BinaryExprRewriter(RewritePattern):
         return
 
 
-class ChocoFlatDeadCodeElimination(ModulePass):
+class ChocoFlatDeadCodeElimination(RewritingPass):
     name = "choco-flat-dead-code-elimination"
 
     def apply(self, ctx: MLContext, op: ModuleOp) -> None:
@@ -51,5 +51,6 @@ class ChocoFlatDeadCodeElimination(ModulePass):
                 ]
             ),
             walk_reverse=True,
+            listener=self.listener,
         )
         walker.rewrite_module(op)
@@ -0,0 +1,2 @@
+class DeadCodeError(Exception):
+    pass
@@ -3,7 +3,6 @@ from dataclasses import dataclass
 from xdsl.context import MLContext
 from xdsl.dialects.builtin import IntegerAttr, ModuleOp, StringAttr
 from xdsl.ir import Block, Operation, Region, SSAValue
-from xdsl.passes import ModulePass
 from xdsl.pattern_rewriter import (
     GreedyRewritePatternApplier,
     PatternRewriter,
@@ -13,6 +12,7 @@ from xdsl.pattern_rewriter import (
 )
 
 from choco.dialects.choco_flat import *
+from choco.incremental_verification import RewritingPass
 
 
 @dataclass
@@ -137,7 +137,7 @@ class ForLoopRewriter(RewritePattern):
         rewriter.replace_op(for_loop, [idx_mem, zero, idx_store, while_loop])
 
 
-class ForToWhile(ModulePass):
+class ForToWhile(RewritingPass):
     name = "for-to-while"
 
     def apply(self, ctx: MLContext, op: ModuleOp) -> None:
@@ -148,5 +148,6 @@ class ForToWhile(ModulePass):
                 ]
             ),
             apply_recursively=False,
+            listener=self.listener,
         )
         walker.rewrite_module(op)
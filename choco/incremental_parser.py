@@ -0,0 +1,170 @@
+import hashlib
+import re
+from io import StringIO
+from typing import Dict, List, Tuple
+
+from xdsl.dialects.builtin import ModuleOp
+from xdsl.ir import Operation
+
+import choco.dialects.choco_ast as ast
+from choco.lexer import KEYWORDS, Lexer
+from choco.parser import Parser
+
+# A physical line, as split by the lexer.
+LINE_RE = re.compile(r"[^\r\n]*(?:[\r\n]|$)")
+
+# The start of a line that is not indented, blank or a comment.
+TOP_LEVEL_RE = re.compile(r"(?=[^\s#])(?:(?P<name>[^\W\d]\w*)[^\S\r\n]*(?P<colon>:)?)?")
+
+# Keywords that continue the statement started on a previous top-level line.
+CONTINUATION_KEYWORDS = frozenset(["elif", "else"])
+
+
+def split_top_level(text: str) -> Tuple[str, List[Tuple[bool, str]]]:
+    """
+    Split a ChocoPy program into its top-level items.
+
+    An item starts at a line that is not indented, blank or a comment, and
+    extends to the next such line. `elif` and `else` lines continue the
+    statement before them. The blank and comment lines that follow an item
+    are part of its span.
+
+    :param text: The source of the program.
+    :return: The text before the first item, and for each item whether it is
+             a definition and its source span.
+    """
+    prefix_end = 0
+    items: List[Tuple[bool, str]] = []
+    start = -1
+    is_def = False
+    for line in LINE_RE.finditer(text):
+        pos = line.start()
+        match = TOP_LEVEL_RE.match(text, pos)
+        if match is None:
+            continue
+        name = match.group("name")
+        if name in CONTINUATION_KEYWORDS and start >= 0:
+            continue
+        if start >= 0:
+            items.append((is_def, text[start:pos]))
+        else:
+            prefix_end = pos
+        start = pos
+        is_def = name == "def" or (
+            name is not None
+            and name not in KEYWORDS
+            and match.group("colon") is not None
+        )
+        if line.end() == len(text):
+            break
+    if start >= 0:
+        items.append((is_def, text[start:]))
+    else:
+        prefix_end = len(text)
+    return text[:prefix_end], items
+
+
+def is_blank(text: str) -> bool:
+    """Check that the text only contains blank lines and comments."""
+    return all(
+        not line.strip() or line.lstrip().startswith("#")
+        for line in LINE_RE.findall(text)
+    )
+
+
+def fingerprint(span: str) -> bytes:
+    return hashlib.blake2b(span.encode(), digest_size=16).digest()
+
+
+class IncrementalParser:
+    """
+    Parse successive versions of a ChocoPy program, re-parsing only the
+    top-level items whose source changed.
+
+    The program is split into top-level definitions and statements by
+    indentation. Each item is parsed on its own and its AST is cached under
+    the fingerprint of its source span. When a new version of the program is
+    parsed, items with a known fingerprint are moved out of the previous
+    `Program` operation instead of being lexed and parsed again, and all items
+    are spliced into a new `Program` operation.
+
+    The returned module is therefore only valid until the next call to
+    `parse_program`, and must not be modified. Clone it before transforming it.
+
+    If any item fails to parse, or the items cannot form a program, the whole
+    program is parsed again by `Parser`, so that syntax errors are reported
+    exactly as in a full parse.
+    """
+
+    def __init__(self, scanner: str = "char", tokenizer: str = "char"):
+        self.scanner = scanner
+        self.tokenizer = tokenizer
+        # Maps fingerprints of item spans to their defs and statements.
+        self.cache: Dict[bytes, Tuple[List[Operation], List[Operation]]] = {}
+        # The number of items that were reused and parsed by the last parse.
+        self.num_reused = 0
+        self.num_parsed = 0
+
+    def parse_full(self, text: str) -> ModuleOp:
+        lexer = Lexer(StringIO(text), self.scanner, self.tokenizer)
+        return Parser(lexer).parse_program()
+
+    def parse_item(self, span: str) -> Tuple[List[Operation], List[Operation]]:
+        program = self.parse_full(span).ops.first
+        assert isinstance(program, ast.Program)
+        defs = list(program.defs.blocks[0].ops)
+        stmts = list(program.stmts.blocks[0].ops)
+        for op in defs + stmts:
+            op.detach()
+        return defs, stmts
+
+    def parse_program(self, text: str) -> ModuleOp:
+        """
+        Parse a new version of the program.
+
+        :param text: The source of the program.
+        :returns: The AST of the ChocoPy Program.
+        """
+        self.num_reused = 0
+        self.num_parsed = 0
+        prefix, items = split_top_level(text)
+        # Indented code before the first item is an error, that is left to the
+        # full parse.
+        if not is_blank(prefix):
+            return self.parse_full(text)
+
+        cache: Dict[bytes, Tuple[List[Operation], List[Operation]]] = {}
+        defs: List[Operation] = []
+        stmts: List[Operation] = []
+        for is_def, span in items:
+            key = fingerprint(span)
+            if key in cache:
+                # The same item appears twice, but an operation has one parent.
+                item_defs, item_stmts = cache[key]
+                item_defs = [op.clone() for op in item_defs]
+                item_stmts = [op.clone() for op in item_stmts]
+                self.num_reused += 1
+            elif key in self.cache:
+                item_defs, item_stmts = cache[key] = self.cache[key]
+                self.num_reused += 1
+            else:
+                try:
+                    item_defs, item_stmts = cache[key] = self.parse_item(span)
+                except Exception:
+                    return self.parse_full(text)
+                self.num_parsed += 1
+
+            if (
+                len(item_defs) + len(item_stmts) != 1
+                or bool(item_defs) != is_def
+                or (item_defs and stmts)
+            ):
+                return self.parse_full(text)
+            defs.extend(item_defs)
+            stmts.extend(item_stmts)
+
+        for op in defs + stmts:
+            if op.parent is not None:
+                op.detach()
+        self.cache = cache
+        return ModuleOp([ast.Program(defs, stmts)])
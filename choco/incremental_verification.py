@@ -0,0 +1,115 @@
+from abc import ABC
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional, Sequence, TypeVar
+
+from xdsl.dialects.builtin import ModuleOp
+from xdsl.ir import Operation, SSAValue
+from xdsl.passes import ModulePass
+from xdsl.pattern_rewriter import PatternRewriterListener
+
+
+@dataclass
+class ChangeTracker:
+    """
+    Record the operations a pass changes, as reported by its pattern rewriters,
+    so that only those need to be verified after the pass.
+
+    `changed` maps each operation to whether its nested operations changed too.
+    The order of insertion is kept, so that errors are reported in the order of
+    the changes.
+    """
+
+    changed: Dict[Operation, bool] = field(default_factory=dict)
+
+    def listener(self) -> PatternRewriterListener:
+        return PatternRewriterListener(
+            operation_insertion_handler=[self.inserted],
+            operation_removal_handler=[self.removed],
+            operation_modification_handler=[self.modified],
+            operation_replacement_handler=[self.replaced],
+        )
+
+    def inserted(self, op: Operation):
+        # A new operation was built by the pass, and so were its regions.
+        self.changed[op] = True
+        self.neighbours_changed(op)
+
+    def modified(self, op: Operation):
+        self.changed.setdefault(op, False)
+
+    def removed(self, op: Operation):
+        self.neighbours_changed(op)
+
+    def replaced(self, op: Operation, new_results: Sequence[Optional[SSAValue]]):
+        # The users of the results of `op` will use the new results instead.
+        for result in op.results:
+            for use in result.uses:
+                self.changed.setdefault(use.operation, False)
+
+    def neighbours_changed(self, op: Operation):
+        # The operation before `op` may now end its block, and the operation
+        # that contains `op` may have constraints on its regions.
+        if (prev_op := op.prev_op) is not None:
+            self.changed.setdefault(prev_op, False)
+        if (parent := op.parent_op()) is not None:
+            self.changed.setdefault(parent, False)
+
+    def verify(self, module: ModuleOp):
+        """
+        Verify the changed operations that are still part of the module, and
+        the direct users of their results. The nested operations of an inserted
+        operation are verified too, unless one of its ancestors was inserted.
+        """
+        # The operations that were not erased, or were not left out of the module.
+        changed = {
+            op: regions
+            for op, regions in self.changed.items()
+            if op.get_toplevel_object() is module
+        }
+        nested = {op for op, regions in changed.items() if regions}
+
+        def inserted_ancestor(op: Operation) -> bool:
+            parent = op.parent_op()
+            while parent is not None:
+                if parent in nested:
+                    return True
+                parent = parent.parent_op()
+            return False
+
+        for op, regions in changed.items():
+            if regions and inserted_ancestor(op):
+                continue
+            op.verify(verify_nested_ops=regions)
+            for result in op.results:
+                for use in result.uses:
+                    if use.operation not in changed:
+                        use.operation.verify(verify_nested_ops=False)
+        self.changed.clear()
+
+
+RewritingPassT = TypeVar("RewritingPassT", bound="RewritingPass")
+
+
+@dataclass(frozen=True)
+class RewritingPass(ModulePass, ABC):
+    """
+    A pass that changes the IR through pattern rewriters, which report their
+    changes to `listener`.
+
+    The listener ignores the changes, unless the pipeline gives the pass the
+    listener of its `ChangeTracker` with `with_listener`. It is not an argument
+    of the pass, and so is not part of its pass spec.
+    """
+
+    listener: PatternRewriterListener = field(
+        default_factory=PatternRewriterListener, init=False, repr=False, compare=False
+    )
+
+    def with_listener(
+        self: RewritingPassT, listener: PatternRewriterListener
+    ) -> RewritingPassT:
+        """A copy of the pass that reports its changes to `listener`."""
+        copy = replace(self)
+        # The pass is frozen, as its arguments are.
+        object.__setattr__(copy, "listener", listener)
+        return copy
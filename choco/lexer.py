@@ -1,7 +1,27 @@
+import codecs
+import io
+import itertools
+import mmap
+import os
+import re
+import stat
+import sys
+from collections import deque
 from dataclasses import dataclass
 from enum import Enum, auto
 from io import TextIOBase
-from typing import Any, List, Optional, Union
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NoReturn,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
 
 class TokenKind(Enum):
@@ -76,7 +96,7 @@ class TokenKind(Enum):
     STR = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     kind: TokenKind
     value: Any = None
@@ -151,10 +171,114 @@ class Scanner:
         return c
 
 
+class BufferedScanner(Scanner):
+    """A scanner that reads its input in large blocks.
+
+    Instead of reading one character at a time from the stream and growing
+    `line_buffer` by concatenation, the input is kept in a text buffer that is
+    refilled one block at a time (or decoded from a memory map when the stream
+    is backed by a regular file). The scanner position is an integer offset
+    into this buffer and the current line is sliced on demand.
+
+    The `peek`/`consume` contract, as well as the `column` and `line_buffer`
+    attributes the tokenizer relies on, are the same as for `Scanner`.
+    """
+
+    BLOCK_SIZE = 1 << 16
+
+    def __init__(self, stream: TextIOBase, block_size: int = BLOCK_SIZE):
+        self.block_size = block_size
+        self.text: str = ""  # The characters read so far that are still needed.
+        self.pos: int = 0  # Offset of the next character to consume in `text`.
+        self.line_start: int = 0  # Offset in `text` where `line_buffer` starts.
+        self.line_prefix: str = ""  # Text assigned to `line_buffer` by the tokenizer.
+        self.eof: bool = False
+        super().__init__(stream)
+        self.map: Optional[mmap.mmap] = None
+        self.map_offset: int = 0
+        self.decoder: Optional[codecs.IncrementalDecoder] = None
+        self._try_map(stream)
+
+    def _try_map(self, stream: TextIOBase):
+        """Memory-map the stream if it is a regular file that was not read yet."""
+        try:
+            fd = stream.fileno()
+            if stream.tell() != 0 or not stat.S_ISREG(os.fstat(fd).st_mode):
+                return
+            if os.fstat(fd).st_size == 0:
+                return
+            self.map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            return
+        encoding = getattr(stream, "encoding", None) or "utf-8"
+        # Text streams translate line endings to "\n", so do the same here.
+        self.decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(encoding)(), translate=True
+        )
+
+    def _read_block(self) -> str:
+        if self.map is None:
+            return self.stream.read(self.block_size)
+        assert self.decoder is not None
+        chunk = self.map[self.map_offset : self.map_offset + self.block_size]
+        self.map_offset += len(chunk)
+        final = self.map_offset >= len(self.map)
+        block = self.decoder.decode(chunk, final=final)
+        if final:
+            self.map.close()
+            self.map = None
+            self.eof = True
+        return block
+
+    def _fill(self):
+        """Read the next block, keeping only the part of the current line."""
+        while not self.eof and self.pos >= len(self.text):
+            block = self._read_block()
+            if not block and self.map is None:
+                self.eof = True
+            self.text = self.text[self.line_start :] + block
+            self.pos -= self.line_start
+            self.line_start = 0
+
+    @property
+    def line_buffer(self) -> str:
+        return self.line_prefix + self.text[self.line_start : self.pos]
+
+    @line_buffer.setter
+    def line_buffer(self, value: str):
+        self.line_prefix = value
+        self.line_start = self.pos
+
+    def consume(self):
+        """Consume and return the next character from input.
+
+        :return: The next character in the input stream or "" at the end of the stream.
+        """
+        if self.buffer:
+            c = self.buffer
+            self.buffer = None
+            return c
+        try:
+            c = self.text[self.pos]
+            self.pos += 1
+        except IndexError:
+            self._fill()
+            c = self.text[self.pos : self.pos + 1]
+            self.pos += len(c)
+        self.column += 1
+        return c
+
+
+scanners: dict[str, Type[Scanner]] = {
+    "char": Scanner,
+    "block": BufferedScanner,
+}
+
+
 class Tokenizer:
     def __init__(self, scanner: Scanner):
         self.scanner = scanner
-        self.buffer: List[Token] = []  # A buffer of tokens
+        self.buffer: Deque[Token] = deque()  # A FIFO buffer of peeked tokens
         self.line_number = 0
         self.is_new_line = True
         self.is_logical_line = False
@@ -162,30 +286,42 @@ class Tokenizer:
         # Resets after every end-of-line sequence.
         self.indent_stack = [0]
 
+    @property
+    def line_buffer(self) -> str:
+        """The part of the current line read so far, used for error messages."""
+        return self.scanner.line_buffer
+
+    def lookahead(self, i: int = 0) -> Token:
+        """Returns the `i`-th next token, without consuming it.
+
+        The tokens that are looked at are kept in the FIFO buffer, so the
+        lookahead itself does not allocate anything once the buffer holds
+        `i + 1` tokens.
+        :param i: the index of the token, 0 being the next token
+        :return: one token
+        """
+        buffer = self.buffer
+        while len(buffer) <= i:
+            buffer.append(self.consume(keep_buffer=True))
+        return buffer[i]
+
     def peek(self, k: int = 1) -> Union[Token, List[Token]]:
         """Peeks through the next `k` number of tokens.
 
         This functions looks ahead the next `k` number of tokens,
         and returns them as a list.
-        It uses a FIFO buffer to store tokens temporarily.
+        Use `lookahead` to look at a single token without building a list.
         :param k: number of tokens
         :return: one token or a list of tokens
         """
-        if not self.buffer:
-            self.buffer = [self.consume()]
-
-        # Fill the buffer up to `k` tokens, if needed.
-        buffer_size = len(self.buffer)
-        if buffer_size < k:
-            for _ in list(range(k - buffer_size)):
-                self.buffer.append(self.consume(keep_buffer=True))
+        token = self.lookahead(k - 1)
 
         # If you need only one token, return it as an element,
         # not as a list with one element.
         if k == 1:
-            return self.buffer[0]
+            return token
 
-        return self.buffer[0:k]
+        return list(itertools.islice(self.buffer, k))
 
     def consume(self, keep_buffer: bool = False) -> Token:
         """Consumes one token and implements peeking through the next one.
@@ -198,9 +334,7 @@ class Tokenizer:
         :return: one token
         """
         if self.buffer and not keep_buffer:
-            c = self.buffer[0]
-            self.buffer = self.buffer[1:]
-            return c
+            return self.buffer.popleft()
 
         # If we just switched line, flush the buffer.
         if self.is_new_line and not self.is_logical_line:
@@ -418,7 +552,7 @@ class Tokenizer:
                 if name == "return":
                     return Token(TokenKind.RETURN, "return", col)
 
-                return Token(TokenKind.IDENTIFIER, name, col)
+                return Token(TokenKind.IDENTIFIER, sys.intern(name), col)
             # Number: [0-9]+
             elif c.isdigit():
                 value = self.scanner.consume()
@@ -475,10 +609,297 @@ class Tokenizer:
                 raise Exception("Invalid character detected: '" + c + "'")
 
 
+KEYWORDS: Dict[str, TokenKind] = {
+    "class": TokenKind.CLASS,
+    "def": TokenKind.DEF,
+    "global": TokenKind.GLOBAL,
+    "nonlocal": TokenKind.NONLOCAL,
+    "if": TokenKind.IF,
+    "elif": TokenKind.ELIF,
+    "else": TokenKind.ELSE,
+    "while": TokenKind.WHILE,
+    "for": TokenKind.FOR,
+    "in": TokenKind.IN,
+    "None": TokenKind.NONE,
+    "True": TokenKind.TRUE,
+    "False": TokenKind.FALSE,
+    "pass": TokenKind.PASS,
+    "or": TokenKind.OR,
+    "and": TokenKind.AND,
+    "not": TokenKind.NOT,
+    "is": TokenKind.IS,
+    "object": TokenKind.OBJECT,
+    "int": TokenKind.INT,
+    "bool": TokenKind.BOOL,
+    "str": TokenKind.STR,
+    "return": TokenKind.RETURN,
+}
+
+OPERATORS: Dict[str, TokenKind] = {
+    "+": TokenKind.PLUS,
+    "-": TokenKind.MINUS,
+    "*": TokenKind.MUL,
+    "%": TokenKind.MOD,
+    "//": TokenKind.DIV,
+    "=": TokenKind.ASSIGN,
+    "==": TokenKind.EQ,
+    "!=": TokenKind.NE,
+    "<": TokenKind.LT,
+    "<=": TokenKind.LE,
+    ">": TokenKind.GT,
+    ">=": TokenKind.GE,
+    "->": TokenKind.RARROW,
+    "(": TokenKind.LROUNDBRACKET,
+    ")": TokenKind.RROUNDBRACKET,
+    ":": TokenKind.COLON,
+    "[": TokenKind.LSQUAREBRACKET,
+    "]": TokenKind.RSQUAREBRACKET,
+    ",": TokenKind.COMMA,
+}
+
+# Operators that `Tokenizer` recognizes by peeking at the character after them.
+LOOKAHEAD_OPERATORS = frozenset(["-", "=", "<", ">"])
+
+ESCAPES: Dict[str, str] = {"n": "\n", "t": "\t", '"': '"', "\\": "\\"}
+
+TOKEN_RE = re.compile(
+    r"""
+    ([^\S\r\n]*)
+    (?:
+        (?P<newline>[\r\n])
+        |(?P<comment>\#[^\r\n]*)
+        |(?P<name>[^\W\d]\w*)
+        |(?P<integer>\d+)
+        |(?P<string>"(?:[ !\#-\[\]-~]|\\[nt"\\])*")
+        |(?P<op>->|//|==|!=|<=|>=|[-+*%=<>()\[\]:,])
+        |(?P<other>\S)
+    )
+    """,
+    re.VERBOSE,
+)
+LEADING_WS_RE = re.compile(r"[^\S\r\n]*")
+ESCAPE_RE = re.compile(r"\\(.)")
+
+
+def measure_indentation(ws: str) -> Tuple[int, int]:
+    """Return the indentation level of a line starting with the whitespace `ws`,
+    and the column `Tokenizer` reports for the character following it.
+
+    Tabs are replaced from left to right by one to eight spaces, and also
+    advance the scanner column to a multiple of eight.
+    """
+    if "\t" not in ws:
+        return len(ws), len(ws)
+    level = 0
+    column = -1
+    for c in ws:
+        column += 1
+        if c == "\t":
+            level += 8 - level % 8
+            column += 8 - column % 8
+        else:
+            level += 1
+    return level, column + 1
+
+
+class RegexTokenizer(Tokenizer):
+    """A tokenizer that matches tokens with one precompiled alternation regex.
+
+    The whole input is read at once and tokens are produced lazily by a
+    single generator, so long runs of whitespace or blank lines do not
+    recurse. Indentation is handled by a state machine over `indent_stack`
+    at the start of every logical line.
+
+    It produces exactly the same tokens as `Tokenizer`, and `line_number`
+    and `line_buffer` have the same values after each produced token, so
+    that the parser reports syntax errors identically.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.buffer: Deque[Token] = deque()
+        self.line_number = 0
+        self.indent_stack = [0]
+        # `line_buffer` is `line_prefix + text[line_start:read_pos]`, as for
+        # `BufferedScanner`.
+        self.line_prefix = ""
+        self.line_start = 0
+        self.read_pos = 0
+        self.tokens: Iterator[Token] = self._tokenize()
+
+    @property
+    def line_buffer(self) -> str:
+        return self.line_prefix + self.text[self.line_start : self.read_pos]
+
+    def consume(self, keep_buffer: bool = False) -> Token:
+        if self.buffer and not keep_buffer:
+            return self.buffer.popleft()
+        return next(self.tokens)
+
+    def _tokenize(self) -> Iterator[Token]:
+        text = self.text
+        n = len(text)
+        indent_stack = self.indent_stack
+        is_new_line = True
+        is_logical_line = False
+        shift = 0  # The column of a character on the current line minus its offset.
+        # `Tokenizer` peeks past names, integers and some operators. Such a peek
+        # past the end of input advances the column of the end-of-input tokens.
+        eof_reads = 0
+
+        for m in TOKEN_RE.finditer(text):
+            group = m.lastgroup
+            start = m.end(1)
+            end = m.end()
+
+            if is_new_line:
+                if group == "newline":
+                    # Blank line.
+                    self.line_number += 1
+                    continue
+                if group == "comment":
+                    continue
+                # A logical line starts: emit INDENT/DEDENT tokens first.
+                level, column = measure_indentation(m.group(1))
+                shift = column - start
+                self.line_prefix = ""
+                self.line_start = start
+                self.read_pos = start + 1
+                if level > indent_stack[-1]:
+                    indent_stack.append(level)
+                    yield Token(TokenKind.INDENT, None, indent_stack[-2])
+                while level < indent_stack[-1]:
+                    if level not in indent_stack:
+                        print("Indentation error: mismatched blocks.")
+                        exit(1)
+                    indent_stack.pop()
+                    yield Token(TokenKind.DEDENT, None, indent_stack[-1])
+                self.line_prefix = level * " "
+                is_new_line = False
+                is_logical_line = True
+
+            if group == "name":
+                value = sys.intern(m.group(group))
+                kind = KEYWORDS.get(value)
+                if kind is None:
+                    if not (value[0].isalpha() or value[0] == "_"):
+                        self._invalid(start)
+                    kind = TokenKind.IDENTIFIER
+                token = Token(kind, value, start + shift)
+                if end == n:
+                    eof_reads += 1
+                self.read_pos = end + 1 if end < n else n
+            elif group == "op":
+                value = sys.intern(m.group(group))
+                token = Token(OPERATORS[value], value, start + shift)
+                if value in LOOKAHEAD_OPERATORS:
+                    if end == n:
+                        eof_reads += 1
+                    self.read_pos = end + 1 if end < n else n
+                else:
+                    self.read_pos = end
+            elif group == "newline":
+                self.line_number += 1
+                self.read_pos = end
+                yield Token(TokenKind.NEWLINE, None, start + shift)
+                is_new_line = True
+                is_logical_line = False
+                continue
+            elif group == "integer":
+                if end < n and text[end].isnumeric():
+                    self._invalid(start)
+                token = Token(TokenKind.INTEGER, int(m.group(group)), start + shift)
+                if end == n:
+                    eof_reads += 1
+                self.read_pos = end + 1 if end < n else n
+            elif group == "string":
+                value = m.group(group)[1:-1]
+                if "\\" in value:
+                    value = ESCAPE_RE.sub(lambda e: ESCAPES[e.group(1)], value)
+                token = Token(TokenKind.STRING, value, start + shift)
+                self.read_pos = end
+            elif group == "comment":
+                self.line_prefix = ""
+                self.line_start = self.read_pos = end + 1 if end < n else n
+                continue
+            else:
+                self._invalid(start)
+            yield token
+
+        # End of input. As `Tokenizer`, terminate the last logical line and
+        # close all open indentation levels.
+        line_start = max(text.rfind("\n"), text.rfind("\r")) + 1
+        ws = LEADING_WS_RE.match(text, line_start).group()
+        last_column = measure_indentation(ws)[1] + n - 1 - line_start - len(ws)
+        if is_logical_line:
+            self.read_pos = n
+            eof_reads += 1
+            yield Token(TokenKind.NEWLINE, None, last_column + eof_reads)
+        else:
+            self.line_prefix = ""
+            self.line_start = self.read_pos = n
+        while True:
+            eof_reads += 1
+            if indent_stack[-1] > 0:
+                indent_stack.pop()
+                yield Token(TokenKind.DEDENT, None, indent_stack[-1])
+            else:
+                yield Token(TokenKind.EOF, None, last_column + eof_reads)
+
+    def _invalid(self, pos: int) -> NoReturn:
+        """Report the error `Tokenizer` reports for input at `pos` that is not
+        matched by a valid token."""
+        text = self.text
+        c = text[pos]
+        if c.isdigit():
+            end = pos + 1
+            while end < len(text) and text[end].isnumeric():
+                end += 1
+            int(text[pos:end])
+        if c == '"':
+            end = pos + 1
+            c = text[end : end + 1]
+            while c != '"':
+                if 32 <= ord(c) <= 126:
+                    if c == "\\":
+                        end += 1
+                        c = text[end : end + 1]
+                        if c not in ESCAPES:
+                            print('Error: "\\{}" not recognized'.format(c))
+                            exit(1)
+                else:
+                    print("Error: Unknown ASCII number {}".format(ord(c)))
+                    exit(1)
+                end += 1
+                c = text[end : end + 1]
+        if c == "/" or c == "!":
+            raise Exception("Unknown lexeme: {}".format(text[pos : pos + 2]))
+        raise Exception("Invalid character detected: '" + c + "'")
+
+
+tokenizers = ["char", "regex"]
+
+
 class Lexer:
-    def __init__(self, stream: TextIOBase):
-        scanner = Scanner(stream)
-        self.tokenizer = Tokenizer(scanner)
+    def __init__(
+        self, stream: TextIOBase, scanner: str = "char", tokenizer: str = "char"
+    ):
+        if scanner not in scanners:
+            raise ValueError(
+                f"Unknown scanner '{scanner}', expected one of {', '.join(scanners)}"
+            )
+        if tokenizer not in tokenizers:
+            raise ValueError(
+                f"Unknown tokenizer '{tokenizer}', expected one of "
+                f"{', '.join(tokenizers)}"
+            )
+        if tokenizer == "regex":
+            self.tokenizer = RegexTokenizer(stream.read())
+        else:
+            self.tokenizer = Tokenizer(scanners[scanner](stream))
+
+    def lookahead(self, i: int = 0) -> Token:
+        return self.tokenizer.lookahead(i)
 
     def peek(self, k: int = 1) -> Union[Token, List[Token]]:
         return self.tokenizer.peek(k)
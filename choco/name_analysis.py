@@ -10,6 +10,7 @@ from xdsl.passes import ModulePass
 from choco.ast_visitor import Visitor
 from choco.dialects.choco_ast import *
 from choco.semantic_error import SemanticError
+from choco.symbol_table import SymbolKind, SymbolTable, set_symbol_table
 
 
 class NameAnalysis(ModulePass):
@@ -24,6 +25,9 @@ class NameAnalysis(ModulePass):
 
             names: Dict[str, Optional[NameCtx]] = field(default_factory=dict)
             parent_scope: Optional[NameCtx] = None
+            # The symbol each name refers to, or -1 for a global or nonlocal
+            # declaration that is not checked yet.
+            symbols: Dict[str, int] = field(default_factory=dict, compare=False)
 
             def contains_in_scope(self, name: str) -> bool:
                 if name in self.names:
@@ -32,14 +36,25 @@ class NameAnalysis(ModulePass):
                     return False
 
             def contains_in_parent_scope(self, name: str) -> bool:
-                if self.parent_scope:
-                    return self.parent_scope.contains_in_scope(
-                        name
-                    ) or self.parent_scope.contains_in_parent_scope(name)
-                else:
-                    return False
-
-            def add_var(self, name: str):
+                scope = self.parent_scope
+                while scope is not None:
+                    if name in scope.names:
+                        return True
+                    scope = scope.parent_scope
+                return False
+
+            def lookup(self, name: str) -> Optional[int]:
+                """
+                Return the symbol of the innermost scope that defines the name, or None if no scope defines it.
+                """
+                scope: Optional[NameCtx] = self
+                while scope is not None:
+                    if name in scope.names:
+                        return scope.symbols[name]
+                    scope = scope.parent_scope
+                return None
+
+            def add_var(self, name: str, symbol: int):
                 if name in self.names:
                     raise SemanticError(
                         f"[Name Analysis Error]: "
@@ -47,8 +62,9 @@ class NameAnalysis(ModulePass):
                     )
                 else:
                     self.names[name] = None
+                    self.symbols[name] = symbol
 
-            def add_func(self, name: str, nested_ctx: NameCtx):
+            def add_func(self, name: str, nested_ctx: NameCtx, symbol: int):
                 if name in self.names:
                     raise SemanticError(
                         f"[Name Analysis Error]: "
@@ -56,6 +72,7 @@ class NameAnalysis(ModulePass):
                     )
                 else:
                     self.names[name] = nested_ctx
+                    self.symbols[name] = symbol
 
             def get_func_ctx(self, name: str) -> NameCtx:
                 ret = self.names.get(name)
@@ -73,9 +90,13 @@ class NameAnalysis(ModulePass):
 
                 return self.parent_scope.global_scope()
 
+        table = SymbolTable()
+
         @dataclass
         class BuildContextVisitor(Visitor):
             name_ctx: NameCtx
+            # The symbol of the function whose body is visited, or None for the global scope.
+            scope: Optional[int] = None
 
             def visit_var_def(self, var_def: VarDef):
                 """
@@ -83,31 +104,37 @@ class NameAnalysis(ModulePass):
                 """
                 typed_var = var_def.typed_var.blocks[0].ops.first
                 assert isinstance(typed_var, TypedVar)
-                self.name_ctx.add_var(typed_var.var_name.data)  # type: ignore
+                name = typed_var.var_name.data  # type: ignore
+                symbol = table.define(name, SymbolKind.VAR, self.scope, typed_var)
+                self.name_ctx.add_var(name, symbol)
 
             def traverse_func_def(self, func_def: FuncDef):
                 """
                 Add the function name to the current name context and the parameter names to a nested name context.
                 Traverse the function body with the nested name context.
                 """
-                body_visitor = BuildContextVisitor(NameCtx(parent_scope=self.name_ctx))
+                name = func_def.func_name.data  # type: ignore
+                func = table.define(name, SymbolKind.FUNC, self.scope, func_def)
+                body_visitor = BuildContextVisitor(
+                    NameCtx(parent_scope=self.name_ctx), func
+                )
 
                 for op in func_def.params.blocks[0].ops:
                     assert isinstance(op, TypedVar)
-                    body_visitor.name_ctx.add_var(op.var_name.data)  # type: ignore
+                    param = op.var_name.data  # type: ignore
+                    symbol = table.define(param, SymbolKind.PARAM, func, op)
+                    body_visitor.name_ctx.add_var(param, symbol)
 
                 for op in func_def.func_body.blocks[0].ops:
                     if isinstance(op, GlobalDecl):
-                        body_visitor.name_ctx.add_var(op.decl_name.data)  # type: ignore
+                        body_visitor.name_ctx.add_var(op.decl_name.data, -1)  # type: ignore
                     if isinstance(op, NonLocalDecl):
-                        body_visitor.name_ctx.add_var(op.decl_name.data)  # type: ignore
+                        body_visitor.name_ctx.add_var(op.decl_name.data, -1)  # type: ignore
 
                 for op in func_def.func_body.blocks[0].ops:
                     body_visitor.traverse(op)
 
-                self.name_ctx.add_func(
-                    func_def.func_name.data, body_visitor.name_ctx  # type: ignore
-                )
+                self.name_ctx.add_func(name, body_visitor.name_ctx, func)
 
         @dataclass
         class NameAnalysisVisitor(Visitor):
@@ -123,9 +150,10 @@ class NameAnalysis(ModulePass):
                 For each variable name check that it has been declared before
                 """
                 name = expr_name.id.data  # type: ignore
-                if self.name_ctx.contains_in_scope(
-                    name
-                ) or self.name_ctx.contains_in_parent_scope(name):
+                symbol = self.name_ctx.lookup(name)
+                if symbol is not None:
+                    if symbol >= 0:
+                        table.resolved[expr_name] = symbol
                     return
 
                 raise SemanticError(
@@ -138,9 +166,10 @@ class NameAnalysis(ModulePass):
                 For each function call check that the function has been declared before
                 """
                 name = call_expr.func.data  # type: ignore
-                if self.name_ctx.contains_in_scope(
-                    name
-                ) or self.name_ctx.contains_in_parent_scope(name):
+                symbol = self.name_ctx.lookup(name)
+                if symbol is not None:
+                    if symbol >= 0:
+                        table.resolved[call_expr] = symbol
                     return
 
                 raise SemanticError(
@@ -173,6 +202,9 @@ class NameAnalysis(ModulePass):
                         f"[Name Analysis Error]: "
                         f"Identifier `{for_op.iter_name.data}' found that was not previously defined."  # type: ignore
                     )
+                symbol = self.name_ctx.symbols[for_op.iter_name.data]  # type: ignore
+                if symbol >= 0:
+                    table.resolved[for_op] = symbol
                 if for_op.iter.blocks[0].ops.first is None:
                     raise Exception(f"Error: {for_op} has empty block!")
                 self.traverse(for_op.iter.blocks[0].ops.first)
@@ -193,13 +225,23 @@ class NameAnalysis(ModulePass):
                         f"Cannot assign to variable `{name}' that is not explicitly declared in this scope"
                     )
 
+            def declare(self, decl: Operation, symbol: int):
+                """
+                Make the declared name in the current scope refer to the symbol it declares.
+                """
+                self.name_ctx.symbols[decl.decl_name.data] = symbol  # type: ignore
+                if symbol >= 0:
+                    table.resolved[decl] = symbol
+
             def visit_global_decl(self, global_decl: GlobalDecl):
                 """
                 Check that the variable is declared in the global scope.
                 """
-                if self.name_ctx.global_scope().contains_in_scope(
+                global_scope = self.name_ctx.global_scope()
+                if global_scope.contains_in_scope(
                     global_decl.decl_name.data
                 ):  # type: ignore
+                    self.declare(global_decl, global_scope.symbols[global_decl.decl_name.data])  # type: ignore
                     return
 
                 raise SemanticError(
@@ -217,6 +259,10 @@ class NameAnalysis(ModulePass):
                     and self.name_ctx.parent_scope.contains_in_scope(non_local_declare)
                     and self.name_ctx.parent_scope != self.name_ctx.global_scope()
                 ):  # type: ignore
+                    self.declare(
+                        non_local_decl,
+                        self.name_ctx.parent_scope.symbols[non_local_declare],
+                    )
                     return  # type: ignore
 
                 raise SemanticError(
@@ -226,9 +272,10 @@ class NameAnalysis(ModulePass):
 
         # add print, len, and input functions to the global context
         name_ctx = NameCtx()
-        name_ctx.add_func("print", NameCtx())
-        name_ctx.add_func("len", NameCtx())
-        name_ctx.add_func("input", NameCtx())
+        for builtin in ["print", "len", "input"]:
+            symbol = table.define(builtin, SymbolKind.BUILTIN, None)
+            name_ctx.add_func(builtin, NameCtx(), symbol)
 
         BuildContextVisitor(name_ctx).traverse(op)
         NameAnalysisVisitor(name_ctx).traverse(op)
+        set_symbol_table(op, table)
@@ -0,0 +1,173 @@
+import contextlib
+import gc
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from itertools import repeat
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from xdsl.dialects.builtin import ModuleOp
+from xdsl.ir import Attribute, Block, Operation, Region
+
+import choco.dialects.choco_ast as ast
+from choco.incremental_parser import is_blank, split_top_level
+from choco.lexer import Lexer
+from choco.parser import Parser
+
+# An operation as a tree of builtin containers, so that it can be pickled
+# without recursing along the operations of a block:
+# (class, properties, attributes, [[[operations of a block] per block] per region])
+EncodedOp = Tuple[Type[Operation], Dict[str, Attribute], Dict[str, Attribute], Any]
+
+# The number of chunks per worker, to balance the load between workers.
+CHUNKS_PER_JOB = 4
+
+
+@contextlib.contextmanager
+def gc_disabled() -> Iterator[None]:
+    """
+    Disable the cyclic garbage collector while building a large AST. Its
+    operations all stay alive, so collecting only wastes time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def encode(op: Operation, attributes: Dict[Attribute, Attribute]) -> EncodedOp:
+    """
+    Encode an operation and its nested operations.
+
+    :param attributes: Equal attributes are replaced by the first one found
+                       here, so that they are pickled only once.
+    """
+
+    def intern(d: Dict[str, Attribute]) -> Dict[str, Attribute]:
+        return {name: attributes.setdefault(attr, attr) for name, attr in d.items()}
+
+    return (
+        type(op),
+        intern(op.properties),
+        intern(op.attributes),
+        [
+            [[encode(o, attributes) for o in block.ops] for block in r.blocks]
+            for r in op.regions
+        ],
+    )
+
+
+def decode(encoded: EncodedOp) -> Operation:
+    cls, properties, attributes, regions = encoded
+    return cls.create(
+        properties=properties,
+        attributes=attributes,
+        regions=[
+            Region([Block([decode(o) for o in ops]) for ops in blocks])
+            for blocks in regions
+        ],
+    )
+
+
+def parse_chunk(
+    text: str, scanner: str, tokenizer: str
+) -> Optional[Tuple[List[EncodedOp], List[EncodedOp]]]:
+    """
+    Parse a chunk of top-level items in a worker.
+
+    :returns: The encoded defs and statements of the chunk, or None if it does
+              not parse. The error is then reported by parsing the whole
+              program, so anything the lexer prints is discarded.
+    """
+    with gc_disabled():
+        try:
+            with contextlib.redirect_stdout(StringIO()):
+                lexer = Lexer(StringIO(text), scanner, tokenizer)
+                module = Parser(lexer).parse_program()
+        except (Exception, SystemExit):
+            return None
+        program = module.ops.first
+        assert isinstance(program, ast.Program)
+        attributes: Dict[Attribute, Attribute] = {}
+        return (
+            [encode(op, attributes) for op in program.defs.blocks[0].ops],
+            [encode(op, attributes) for op in program.stmts.blocks[0].ops],
+        )
+
+
+def parse_program_parallel(
+    text: str, jobs: int, scanner: str = "char", tokenizer: str = "char"
+) -> ModuleOp:
+    """
+    Parse a ChocoPy program by parsing its top-level items in a process pool.
+
+    The program is split into top-level items by indentation, and contiguous
+    items are grouped into chunks that are parsed by `jobs` processes with the
+    existing `Lexer` and `Parser`. The results are merged into one `Program`.
+
+    If a chunk does not parse, or the chunks do not form a program, the whole
+    program is parsed sequentially, so that syntax errors are reported with
+    the same line numbers and messages as without a process pool.
+
+    The main process decodes every operation the workers send back, which
+    costs about a sixth of a sequential parse, so this is slower than a
+    sequential parse on 1 core and only pays off with at least 4 idle cores.
+
+    :param text: The source of the program.
+    :param jobs: The number of processes.
+    :returns: The AST of the ChocoPy Program.
+    """
+
+    def parse_sequential() -> ModuleOp:
+        return Parser(Lexer(StringIO(text), scanner, tokenizer)).parse_program()
+
+    prefix, items = split_top_level(text)
+    if not is_blank(prefix):
+        return parse_sequential()
+    # All definitions must come before the statements.
+    num_defs = sum(1 for is_def, _ in items if is_def)
+    if any(not is_def for is_def, _ in items[:num_defs]):
+        return parse_sequential()
+
+    # Group contiguous items into chunks of about the same size.
+    chunk_size = len(text) // (jobs * CHUNKS_PER_JOB) + 1
+    chunks: List[Tuple[str, int, int]] = []
+    spans: List[str] = []
+    chunk_defs = 0
+    chunk_length = 0
+    for i, (is_def, span) in enumerate(items):
+        spans.append(span)
+        chunk_defs += is_def
+        chunk_length += len(span)
+        if chunk_length >= chunk_size or i == len(items) - 1:
+            chunks.append(("".join(spans), chunk_defs, len(spans) - chunk_defs))
+            spans = []
+            chunk_defs = 0
+            chunk_length = 0
+    if len(chunks) <= 1:
+        return parse_sequential()
+
+    defs: List[Operation] = []
+    stmts: List[Operation] = []
+    with gc_disabled(), ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(
+            parse_chunk,
+            [chunk for chunk, _, _ in chunks],
+            repeat(scanner),
+            repeat(tokenizer),
+        )
+        for (_, num_defs, num_stmts), result in zip(chunks, results):
+            if (
+                result is None
+                or len(result[0]) != num_defs
+                or len(result[1]) != num_stmts
+            ):
+                pool.shutdown(cancel_futures=True)
+                break
+            defs.extend(decode(op) for op in result[0])
+            stmts.extend(decode(op) for op in result[1])
+        else:
+            return ModuleOp([ast.Program(defs, stmts)])
+    return parse_sequential()
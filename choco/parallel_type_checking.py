@@ -0,0 +1,135 @@
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+from xdsl.ir import Attribute, Operation
+
+import choco.dialects.choco_ast as ast
+from choco.parallel_parser import EncodedOp, decode, encode, gc_disabled
+from choco.type_checking import (
+    FunctionInfo,
+    LocalEnvironment,
+    Type,
+    bottom_type,
+    check_stmt_or_def,
+)
+
+# The number of chunks per worker, to balance the load between workers.
+CHUNKS_PER_JOB = 4
+
+# The global environment of a worker, set when the worker starts.
+worker_env: Mapping[str, Union[Type, FunctionInfo]] = MappingProxyType({})
+
+# The type hints of the operations of a function, in the order of `walk`.
+TypeHints = List[Optional[Attribute]]
+
+
+def init_worker(o: Dict[str, Union[Type, FunctionInfo]]):
+    global worker_env
+    # Checking a function only reads the global environment. Freeze it, so
+    # that the workers cannot diverge from the sequential type checker.
+    worker_env = MappingProxyType(o)
+
+
+def check_chunk(
+    encoded_funcs: List[EncodedOp],
+) -> Tuple[List[TypeHints], Optional[Exception]]:
+    """
+    Type-check a chunk of consecutive function definitions in a worker, in
+    order, until the first one that does not type-check.
+
+    :returns: The type hints of each checked function, and the error of the
+              last one if it does not type-check.
+    """
+    with gc_disabled():
+        funcs = [decode(op) for op in encoded_funcs]
+    attributes: Dict[Attribute, Attribute] = {}
+    hints: List[TypeHints] = []
+    for func in funcs:
+        error: Optional[Exception] = None
+        try:
+            check_stmt_or_def(worker_env, bottom_type, func)  # type: ignore
+        except Exception as e:
+            error = e
+        func_hints: TypeHints = []
+        for op in func.walk():
+            hint = op.properties.get("type_hint")
+            func_hints.append(
+                None if hint is None else attributes.setdefault(hint, hint)
+            )
+        hints.append(func_hints)
+        if error is not None:
+            return hints, error
+    return hints, None
+
+
+def set_type_hints(func: Operation, hints: TypeHints):
+    for op, hint in zip(func.walk(), hints):
+        if hint is not None:
+            op.properties["type_hint"] = hint
+
+
+def check_program_parallel(o: LocalEnvironment, program: ast.Program, jobs: int):
+    """
+    Type-check a program, checking its function bodies in a process pool.
+
+    The bodies of top-level functions are checked independently of each other
+    against a frozen copy of the global environment, in chunks of consecutive
+    functions by `jobs` processes. The other top-level definitions and the
+    statements are checked meanwhile in this process. The type hints found by
+    the workers are then added to the AST.
+
+    The error that is raised is the first one in source order, which is the
+    one raised by checking the program sequentially.
+
+    :param o: The global environment, as built by `build_env`.
+    :param program: The program to type-check.
+    :param jobs: The number of processes.
+    """
+    items: List[Operation] = list(program.defs.ops) + list(program.stmts.ops)
+    funcs = [i for i, op in enumerate(items) if isinstance(op, ast.FuncDef)]
+    if len(funcs) <= 1:
+        for op in items:
+            check_stmt_or_def(o, bottom_type, op)
+        return
+
+    chunk_size = len(funcs) // (jobs * CHUNKS_PER_JOB) + 1
+    chunks = [funcs[i : i + chunk_size] for i in range(0, len(funcs), chunk_size)]
+    attributes: Dict[Attribute, Attribute] = {}
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=init_worker, initargs=(dict(o),)
+    ) as pool:
+        futures = [
+            pool.submit(check_chunk, [encode(items[i], attributes) for i in chunk])
+            for chunk in chunks
+        ]
+
+        # The first error in source order, and its position.
+        error: Optional[Exception] = None
+        error_pos = len(items)
+        for i, op in enumerate(items):
+            if isinstance(op, ast.FuncDef):
+                continue
+            try:
+                check_stmt_or_def(o, bottom_type, op)
+            except Exception as e:
+                error = e
+                error_pos = i
+                break
+
+        for chunk, future in zip(chunks, futures):
+            if chunk[0] > error_pos:
+                # Every function from here on comes after the error.
+                pool.shutdown(cancel_futures=True)
+                break
+            hints, chunk_error = future.result()
+            for i, func_hints in zip(chunk, hints):
+                set_type_hints(items[i], func_hints)
+            if chunk_error is not None:
+                pos = chunk[len(hints) - 1]
+                if pos < error_pos:
+                    error = chunk_error
+                    error_pos = pos
+    if error is not None:
+        raise error
@@ -1,4 +1,4 @@
-from typing import List, NoReturn, Union
+from typing import Any, Iterator, List, NoReturn, Sequence, Tuple, Union
 
 from xdsl.dialects.builtin import ModuleOp
 from xdsl.ir import Operation
@@ -6,6 +6,66 @@ from xdsl.ir import Operation
 import choco.dialects.choco_ast as ast
 from choco.lexer import Lexer, Token, TokenKind
 
+# The lookahead that starts a variable definition, `ID :`.
+VAR_DEF_START = (TokenKind.IDENTIFIER, TokenKind.COLON)
+
+EXPR_FIRST_SET = frozenset(
+    [
+        TokenKind.IDENTIFIER,
+        TokenKind.TRUE,
+        TokenKind.FALSE,
+        TokenKind.LROUNDBRACKET,
+        TokenKind.NONE,
+        TokenKind.STRING,
+        TokenKind.INTEGER,
+        TokenKind.MINUS,
+        TokenKind.NOT,
+        TokenKind.LSQUAREBRACKET,
+    ]
+)
+
+# Binding powers of the operators in expressions, from the loosest to the
+# tightest. Frames for constructs that contain whole expressions bind with 0.
+OR_BINDING_POWER = 1
+AND_BINDING_POWER = 2
+NOT_BINDING_POWER = 3
+COMP_BINDING_POWER = 4
+ARITH_BINDING_POWER = 5
+TERM_BINDING_POWER = 6
+NEG_BINDING_POWER = 7
+
+PREFIX_OPERATORS = {
+    TokenKind.NOT: (NOT_BINDING_POWER, "not"),
+    TokenKind.MINUS: (NEG_BINDING_POWER, "-"),
+}
+
+# The operator of a binary expression is the token value, unless given here.
+BINARY_OPERATORS = {
+    TokenKind.OR: (OR_BINDING_POWER, "or"),
+    TokenKind.AND: (AND_BINDING_POWER, "and"),
+    TokenKind.EQ: (COMP_BINDING_POWER, None),
+    TokenKind.NE: (COMP_BINDING_POWER, None),
+    TokenKind.LT: (COMP_BINDING_POWER, None),
+    TokenKind.LE: (COMP_BINDING_POWER, None),
+    TokenKind.GT: (COMP_BINDING_POWER, None),
+    TokenKind.GE: (COMP_BINDING_POWER, None),
+    TokenKind.IS: (COMP_BINDING_POWER, None),
+    TokenKind.PLUS: (ARITH_BINDING_POWER, None),
+    TokenKind.MINUS: (ARITH_BINDING_POWER, None),
+    TokenKind.MUL: (TERM_BINDING_POWER, None),
+    TokenKind.DIV: (TERM_BINDING_POWER, None),
+    TokenKind.MOD: (TERM_BINDING_POWER, None),
+}
+
+# The frames of `Parser.parse_expr`.
+EXPR_FRAME = "expr"
+PAREN_FRAME = "paren"
+INDEX_FRAME = "index"
+LIST_FRAME = "list"
+CALL_FRAME = "call"
+IF_COND_FRAME = "if_cond"
+IF_ELSE_FRAME = "if_else"
+
 
 class SyntaxError(Exception):
     def __init__(self, row: int, column: int, message: str, line: str):
@@ -40,27 +100,33 @@ class Parser:
         """
         self.lexer = lexer
 
-    def check(self, expected: Union[List[TokenKind], TokenKind]) -> bool:
+    def check(self, expected: Union[Sequence[TokenKind], TokenKind]) -> bool:
         """
-                Check that the next token is of a given kind. If a list of n TokenKinds
-                is given, check that the next n TokenKinds match the next expected
-                ones.
+                Check that the next token is of a given kind. If a sequence of n
+                TokenKinds is given, check that the next n TokenKinds match the next
+                expected ones.
 
-                :param expected: The kind of the token we expect or a list of expected
-                                 token kinds if we look ahead more than one token at
-                                 a time.
+                :param expected: The kind of the token we expect or a sequence of
+                                 expected token kinds if we look ahead more than one
+                                 token at a time.
                 :returns: True if the next token has the expected token kind, False
         ￼                 otherwise.
         """
 
-        if isinstance(expected, list):
-            tokens = self.lexer.peek(len(expected))
-            assert isinstance(tokens, list), "List of tokens expected"
-            return all([tok.kind == type_ for tok, type_ in zip(tokens, expected)])
+        lexer = self.lexer
+        # `isinstance` on an enum class allocates when it fails, `type` does not.
+        if type(expected) is TokenKind:
+            return lexer.lookahead().kind == expected
 
-        token = self.lexer.peek()
-        assert isinstance(token, Token), "Single token expected"
-        return token.kind == expected
+        # Fill the lookahead buffer with all the tokens first, as the line
+        # number reported on errors depends on how far the lexer has read.
+        i = len(expected) - 1
+        lexer.lookahead(i)
+        while i >= 0:
+            if lexer.lookahead(i).kind != expected[i]:
+                return False
+            i -= 1
+        return True
 
     def match(self, expected: TokenKind) -> Token:
         """
@@ -76,17 +142,15 @@ class Parser:
                   kind, otherwise a parsing error is reported.
         """
 
-        if self.check(expected):
-            token = self.lexer.peek()
-            assert isinstance(token, Token), "A single token expected"
+        token = self.lexer.lookahead()
+        if token.kind == expected:
             self.lexer.consume()
             return token
 
         self.error(f"token of kind {expected} not found")
 
     def error(self, message: str) -> NoReturn:
-        token = self.lexer.peek()
-        assert isinstance(token, Token), "A single token expected"
+        token = self.lexer.lookahead()
         line_num = self.lexer.tokenizer.line_number
 
         # If NEWLINE was the wrong token found, we need to rewind the line number by 1.
@@ -98,10 +162,9 @@ class Parser:
         # Consume all tokens until the end of the line
         while token.kind != TokenKind.NEWLINE and token.kind != TokenKind.EOF:
             self.lexer.consume()
-            token = self.lexer.peek()
-            assert isinstance(token, Token), "A single token expected"
+            token = self.lexer.lookahead()
 
-        line = self.lexer.tokenizer.scanner.line_buffer
+        line = self.lexer.tokenizer.line_buffer
         line = line.replace("\n", "")
         raise SyntaxError(line_num, column, message, line)
 
@@ -127,6 +190,31 @@ class Parser:
 
         return ModuleOp([ast.Program(defs, stmts)])
 
+    def iter_program(self) -> Iterator[Operation]:
+        """
+        Parse a ChocoPy program one top-level item at a time.
+
+        program ::= def_seq stmt_seq EOF
+
+        Each definition and statement is yielded as soon as it is parsed, so
+        that it can be processed, and dropped, before the rest of the program
+        is parsed. The definitions are yielded before the statements, and
+        syntax errors are reported exactly as by `parse_program`.
+
+        :returns: An iterator over the top-level operations of the program.
+        """
+        if self.check(TokenKind.INDENT):
+            self.error("Unexpected indentation")
+
+        yield from self.iter_def_seq()
+
+        if self.check(TokenKind.INDENT):
+            self.error("Unexpected indentation")
+
+        yield from self.iter_stmt_seq()
+
+        self.match(TokenKind.EOF)
+
     def parse_def_seq(self) -> List[Operation]:
         """
         Parse a sequence of function and variable definitions.
@@ -135,27 +223,27 @@ class Parser:
 
         :returns: A list of function and variable definitions.
         """
+        return list(self.iter_def_seq())
 
-        defs: List[Operation] = []
-
+    def iter_def_seq(self) -> Iterator[Operation]:
+        """
+        Parse a sequence of function and variable definitions, yielding each
+        definition as soon as it is parsed.
+        """
         while (
             self.check(TokenKind.CLASS)
             or self.check(TokenKind.DEF)
-            or self.check([TokenKind.IDENTIFIER, TokenKind.COLON])
+            or self.check(VAR_DEF_START)
         ):
             if self.check(TokenKind.CLASS):
                 assert False, "Classes not yet supported"
             if self.check(TokenKind.DEF):
-                func_def = self.parse_function()
-                defs.append(func_def)
+                yield self.parse_function()
                 continue
             if self.check(TokenKind.IDENTIFIER):
-                var_def = self.parse_var_def()
-                defs.append(var_def)
+                yield self.parse_var_def()
                 continue
 
-        return defs
-
     def parse_function(self) -> Operation:
         """
         Parse a function definition.
@@ -211,11 +299,11 @@ class Parser:
 
         defs_and_decls: List[Operation] = []
         while (
-            self.check([TokenKind.IDENTIFIER, TokenKind.COLON])
+            self.check(VAR_DEF_START)
             or self.check(TokenKind.GLOBAL)
             or self.check(TokenKind.NONLOCAL)
         ):
-            if self.check([TokenKind.IDENTIFIER, TokenKind.COLON]):
+            if self.check(VAR_DEF_START):
                 var_def = self.parse_var_def()
                 defs_and_decls.append(var_def)
             elif self.check(TokenKind.GLOBAL):
@@ -342,19 +430,7 @@ class Parser:
         Check if the next token is in the first set of an expression.
 
         """
-        return (
-            self.check(TokenKind.IDENTIFIER)
-            or self.check(TokenKind.TRUE)
-            or self.check(TokenKind.FALSE)
-            or self.check(TokenKind.LROUNDBRACKET)
-            or self.check(TokenKind.NONE)
-            or self.check(TokenKind.IDENTIFIER)
-            or self.check(TokenKind.STRING)
-            or self.check(TokenKind.INTEGER)
-            or self.check(TokenKind.MINUS)
-            or self.check(TokenKind.NOT)
-            or self.check(TokenKind.LSQUAREBRACKET)
-        )
+        return self.lexer.lookahead().kind in EXPR_FIRST_SET
 
     def is_stmt_first_set(self) -> bool:
         """
@@ -377,21 +453,22 @@ class Parser:
 
         :return: list of Operations
         """
-        stmt_seq: List[Operation] = []
+        return list(self.iter_stmt_seq())
 
+    def iter_stmt_seq(self) -> Iterator[Operation]:
+        """Parse a sequence of statements, yielding each statement as soon as
+        it is parsed.
+        """
         if self.check(TokenKind.ASSIGN):
             self.error("No left-hand side in assign statement")
 
         while self.is_stmt_first_set():
-            stmt_op = self.parse_stmt()
-            stmt_seq.append(stmt_op)
+            yield self.parse_stmt()
             if self.check(TokenKind.INDENT):
                 self.error("Unexpected indentation")
             if self.check(TokenKind.ASSIGN):
                 self.error("No left-hand side in assign statement")
 
-        return stmt_seq
-
     def parse_stmt(self) -> Operation:
         """Parse a statement.
 
@@ -592,341 +669,153 @@ class Parser:
 
     def parse_expr(self) -> Operation:
         """
-        Parse conditional expressions paired with the `if/else` operators, if such operators exists.
-        Otherwise, parse only one logical expression.
-
-        expr := or_expr `if` expr `else` expr
-              | or_expr
-
-        Conditional expressions are right-associative.
-        :return: Operation
-        """
-        lhs = self.parse_or_expr()
-
-        if self.check(TokenKind.IF):
-            self.match(TokenKind.IF)
-
-            cond = self.parse_expr()
-
-            self.match(TokenKind.ELSE)
-            rhs = self.parse_expr()
-
-            lhs = ast.IfExpr(cond, lhs, rhs)
-
-        return lhs
-
-    def parse_or_expr(self) -> Operation:
-        """
-        Parse logical expressions paired with the `or` operator, if such an operator exists.
-        Otherwise, parse only one logical expression.
-
-        expr := and_expr ('or' and_expr)*
-
-        `or` expressions are left-associative.
-        :return: Operation
-        """
-        lhs = self.parse_and_expr()
-
-        while self.check(TokenKind.OR):
-            self.match(TokenKind.OR)
-
-            rhs = self.parse_and_expr()
-            lhs = ast.BinaryExpr("or", lhs, rhs)
-
-        return lhs
-
-    def parse_and_expr(self) -> Operation:
-        """
-        Parse logical expressions paired with the `and` operator, if such an operator exists.
-        Otherwise, parse only one logical expression.
-
-        and_expr:= not_expr ('and' not_expr)*
-
-        `and` expressions are left-associative.
-        :return: Operation
-        """
-        lhs = self.parse_not_expr()
-
-        while self.check(TokenKind.AND):
-            self.match(TokenKind.AND)
-
-            rhs = self.parse_not_expr()
-            lhs = ast.BinaryExpr("and", lhs, rhs)
-
-        return lhs
-
-    def parse_not_expr(self) -> Operation:
-        """
-        Parse a logical expression, with optionally a `not` operator.
-
-        not_expr:= 'not' not_expr | arith_expr
-        :return: Operation
-        """
-        if self.check(TokenKind.NOT):
-            self.match(TokenKind.NOT)
-            not_expr = self.parse_not_expr()
-            lhs = ast.UnaryExpr("not", not_expr)
-        else:
-            lhs = self.parse_comp_expr()
-        return lhs
-
-    def parse_comp_expr(self) -> Operation:
-        """
-        Parse a comparison expression.
-
-        comp_expr := arith_expr (comp_op arith_expr)?
-          comp_op := `==`
-                   | `!=`
-                   | `<`
-                   | `<=`
-                   | `>`
-                   | `>=`
-                   | `is`
-
-        :return: Operation
-        """
-        lhs = self.parse_arith_expr()
-
-        if (
-            self.check(TokenKind.EQ)
-            or self.check(TokenKind.NE)
-            or self.check(TokenKind.LT)
-            or self.check(TokenKind.LE)
-            or self.check(TokenKind.GT)
-            or self.check(TokenKind.GE)
-            or self.check(TokenKind.IS)
-        ):
-            if self.check(TokenKind.EQ):
-                op_kind = TokenKind.EQ
-            elif self.check(TokenKind.NE):
-                op_kind = TokenKind.NE
-            elif self.check(TokenKind.LT):
-                op_kind = TokenKind.LT
-            elif self.check(TokenKind.LE):
-                op_kind = TokenKind.LE
-            elif self.check(TokenKind.GT):
-                op_kind = TokenKind.GT
-            elif self.check(TokenKind.GE):
-                op_kind = TokenKind.GE
-            else:
-                op_kind = TokenKind.IS
-
-            op = self.match(op_kind)
-            rhs = self.parse_arith_expr()
-            lhs = ast.BinaryExpr(op.value, lhs, rhs)
-
-            if (
-                self.check(TokenKind.EQ)
-                or self.check(TokenKind.NE)
-                or self.check(TokenKind.LT)
-                or self.check(TokenKind.LE)
-                or self.check(TokenKind.GT)
-                or self.check(TokenKind.GE)
-                or self.check(TokenKind.IS)
-            ):
-                self.error("Comparison operators are not associative")
-
-        return lhs
-
-    def parse_arith_expr(self) -> Operation:
-        """
-        Parse an arithmetic expression from input.
-
-        arith_expr := term ((`+` | `-`) cexpr)*
-
-        Arithmetic expressions are left-associative.
-        :return: Operation
-        """
-        lhs = self.parse_term()
-
-        while self.check(TokenKind.PLUS) or self.check(TokenKind.MINUS):
-            if self.check(TokenKind.PLUS):
-                op_kind = TokenKind.PLUS
-            else:
-                op_kind = TokenKind.MINUS
-
-            op = self.match(op_kind)
-            rhs = self.parse_term()
-            lhs = ast.BinaryExpr(op.value, lhs, rhs)
-
-        return lhs
-
-    def parse_term(self):
-        """
-        Parse a term from input.
-
-        term := cexpr ((`*` | `\\` | `%`) cexpr)*
-
-        Terms are left-associative.
-        :return: Operation
-        """
-        lhs = self.parse_cexpr()
-
-        while (
-            self.check(TokenKind.MUL)
-            or self.check(TokenKind.DIV)
-            or self.check(TokenKind.MOD)
-        ):
-            if self.check(TokenKind.MUL):
-                op_kind = TokenKind.MUL
-            elif self.check(TokenKind.DIV):
-                op_kind = TokenKind.DIV
-            else:
-                op_kind = TokenKind.MOD
-
-            op = self.match(op_kind)
-            rhs = self.parse_cexpr()
-            lhs = ast.BinaryExpr(op.value, lhs, rhs)
-
-        return lhs
-
-    def parse_cexpr(self) -> Operation:
-        """Parse a cexpr from input.
-
-        The rule:
-
-        cexpr := ID
-               | ID `(` arglist `)`
-               | `(` expr `)`
-               | literal
-               | cexpr `[` expr `]`
-
-        is converted to:
-
-               cexpr := primary bracket_expr
+        Parse an expression.
+
+                expr := or_expr `if` expr `else` expr
+                      | or_expr
+             or_expr := and_expr (`or` and_expr)*
+            and_expr := not_expr (`and` not_expr)*
+            not_expr := `not` not_expr
+                      | comp_expr
+           comp_expr := arith_expr (comp_op arith_expr)?
+          arith_expr := term ((`+` | `-`) term)*
+                term := cexpr ((`*` | `//` | `%`) cexpr)*
+               cexpr := primary (`[` expr `]`)*
              primary := ID
                       | ID `(` arglist `)`
+                      | `[` arglist `]`
                       | `(` expr `)`
+                      | `-` cexpr
                       | literal
-        bracket_expr := `[` expr `]` bracket_expr
-                      | epsilon
-
-        Parse a primary expression.
-        Then, parse optionally a bracket expression and combine it with the primary expression in an index expression.
-        For example a[i1][i2] is parsed and returned as: index_expr(index_expr(a, i1), i2)).
-        :return: Operation
-        """
-        primary = self.parse_primary()
-
-        bracket_expr = self.parse_bracket_expr()
-
-        cexpr = primary
-        for index in bracket_expr:
-            index_expr = ast.IndexExpr(cexpr, index)
-            cexpr = index_expr
-
-        return cexpr
-
-    def parse_primary(self):
-        """
-        Parse a primary expression.
-
-        primary := ID
-                 | ID `(` arglist `)`
-                 | `[` arglist `]`
-                 | `(` expr `)`
-                 | `-` cexpr
-                 | literal
+             arglist := (expr (`,` expr)*)?
+
+        Instead of descending through one method per precedence level, the
+        expression is parsed by operator precedence in a single loop over an
+        explicit stack, so that a leaf costs no extra Python frames and deeply
+        nested expressions do not overflow the Python stack.
+
+        The stack holds a (binding power, operator, left operand) entry for
+        every pending operator, and a frame of binding power 0 for every
+        construct that contains whole expressions: the expression itself,
+        parentheses, list displays, call arguments, indices and conditional
+        expressions. An operator first reduces the pending operators that
+        bind at least as tightly. Conditional expressions are right-associative,
+        comparisons are not associative, and all other binary operators are
+        left-associative.
 
         :return: Operation
         """
-        # ID | ID `(` arglist `)`
-        if self.check(TokenKind.IDENTIFIER):
-            identifier_name = self.match(TokenKind.IDENTIFIER).value
-            # ID `(` arglist `)`
-            if self.check(TokenKind.LROUNDBRACKET):
-                self.match(TokenKind.LROUNDBRACKET)
-                arglist = self.parse_arglist()
+        lexer = self.lexer
+        stack: List[Tuple[int, Any, Any]] = [(0, EXPR_FRAME, None)]
+
+        while True:
+            # Parse the prefix operators and the primary expression of an operand.
+            token = lexer.lookahead()
+            kind = token.kind
+            prefix = PREFIX_OPERATORS.get(kind)
+            if prefix is not None:
+                binding_power, op = prefix
+                # `not` is only allowed where a not_expr is expected.
+                if stack[-1][0] > binding_power:
+                    self.error("Expected expression")
+                lexer.consume()
+                stack.append((binding_power, op, None))
+                continue
 
+            if kind is TokenKind.IDENTIFIER:
+                lexer.consume()
+                if lexer.lookahead().kind is not TokenKind.LROUNDBRACKET:
+                    operand = ast.ExprName(token.value)
+                else:
+                    lexer.consume()
+                    if self.is_expr_first_set():
+                        stack.append((0, CALL_FRAME, (token.value, [])))
+                        continue
+                    operand = self._close_arglist(CALL_FRAME, (token.value, []))
+            elif kind is TokenKind.LSQUAREBRACKET:
+                lexer.consume()
                 if self.is_expr_first_set():
-                    self.error("expression found, but comma expected")
-
-                self.match(TokenKind.RROUNDBRACKET)
-
-                return ast.CallExpr(identifier_name, arglist)
-            # ID
+                    stack.append((0, LIST_FRAME, []))
+                    continue
+                operand = self._close_arglist(LIST_FRAME, [])
+            elif kind is TokenKind.LROUNDBRACKET:
+                lexer.consume()
+                stack.append((0, PAREN_FRAME, None))
+                continue
             else:
-                return ast.ExprName(identifier_name)
-
-        # `[' arglist `]`
-        if self.check(TokenKind.LSQUAREBRACKET):
-            self.match(TokenKind.LSQUAREBRACKET)
-            arglist = self.parse_arglist()
-
-            if self.is_expr_first_set():
-                self.error("expression found, but comma expected")
-
-            self.match(TokenKind.RSQUAREBRACKET)
-
-            return ast.ListExpr(arglist)
-
-        # `(` expr `)`
-        if self.check(TokenKind.LROUNDBRACKET):
-            self.match(TokenKind.LROUNDBRACKET)
-            cexpr = self.parse_expr()
-            self.match(TokenKind.RROUNDBRACKET)
-            return cexpr
-
-        # `-` cexpr
-        if self.check(TokenKind.MINUS):
-            self.match(TokenKind.MINUS)
-            cexpr = self.parse_cexpr()
-            return ast.UnaryExpr("-", cexpr)
-
-        # literal
-        return self.parse_literal()
-
-    def parse_arglist(self) -> List[Operation]:
-        """
-        Parse an (empty) list of function call arguments.
-
-        arglist := expr argrep
-                   | epsilon
-        :return: The list of arguments as Operations
-        """
-
-        # expr argrep
+                operand = self.parse_literal()
+
+            # Parse the indices, binary operators and closing tokens that follow
+            # the operand, until the next operand starts.
+            while True:
+                token = lexer.lookahead()
+                kind = token.kind
+
+                if kind is TokenKind.LSQUAREBRACKET:
+                    lexer.consume()
+                    stack.append((0, INDEX_FRAME, operand))
+                    break
+
+                binary = BINARY_OPERATORS.get(kind)
+                if binary is not None:
+                    binding_power, op = binary
+                    while stack[-1][0] > binding_power:
+                        operand = self._reduce(stack.pop(), operand)
+                    if stack[-1][0] == binding_power:
+                        if binding_power == COMP_BINDING_POWER:
+                            self.error("Comparison operators are not associative")
+                        operand = self._reduce(stack.pop(), operand)
+                    lexer.consume()
+                    stack.append((binding_power, op or token.value, operand))
+                    break
+
+                # The end of an expression, reduce all its pending operators.
+                while stack[-1][0] > 0:
+                    operand = self._reduce(stack.pop(), operand)
+
+                if kind is TokenKind.IF:
+                    lexer.consume()
+                    stack.append((0, IF_COND_FRAME, operand))
+                    break
+
+                _, frame, value = stack.pop()
+                if frame is EXPR_FRAME:
+                    return operand
+                if frame is PAREN_FRAME:
+                    self.match(TokenKind.RROUNDBRACKET)
+                elif frame is INDEX_FRAME:
+                    self.match(TokenKind.RSQUAREBRACKET)
+                    operand = ast.IndexExpr(value, operand)
+                elif frame is LIST_FRAME or frame is CALL_FRAME:
+                    args = value if frame is LIST_FRAME else value[1]
+                    args.append(operand)
+                    if kind is TokenKind.COMMA:
+                        lexer.consume()
+                        stack.append((0, frame, value))
+                        break
+                    operand = self._close_arglist(frame, value)
+                elif frame is IF_COND_FRAME:
+                    self.match(TokenKind.ELSE)
+                    stack.append((0, IF_ELSE_FRAME, (value, operand)))
+                    break
+                else:
+                    then, cond = value
+                    operand = ast.IfExpr(cond, then, operand)
+
+    def _reduce(self, entry: Tuple[int, Any, Any], rhs: Operation) -> Operation:
+        """Build the operation of a pending operator with its right operand."""
+        _, op, lhs = entry
+        if lhs is None:
+            return ast.UnaryExpr(op, rhs)
+        return ast.BinaryExpr(op, lhs, rhs)
+
+    def _close_arglist(self, frame: str, value: Any) -> Operation:
+        """Match the closing bracket of a list display or of call arguments."""
         if self.is_expr_first_set():
-            expr = self.parse_expr()
-            expr_list_tail = self.parse_argrep()
-            return [expr] + expr_list_tail
-
-        # epsilon
-        return []
-
-    def parse_argrep(self) -> List[Operation]:
-        """
-        Parse the tail of a list of expression.
-
-        argrep := `,` expr argrep
-                  | epsilon
-        :return: A (empty) list of expressions
-        """
-
-        # `,` expr argrep
-        if self.check(TokenKind.COMMA):
-            self.match(TokenKind.COMMA)
-            expr = self.parse_expr()
-            argrep = self.parse_argrep()
-            return [expr] + argrep
-
-        # epsilon
-        return []
-
-    def parse_bracket_expr(self) -> List[Operation]:
-        """
-        Parse a bracket expression, if it exists.
-
-        bracket_expr := `[` expr `]` bracket_expr
-                      | epsilon
-
-        For example, a[i1][i2] is parsed sequentially and a list with the parsed indices [i1, i2] is returned.
-        :return: a list of the indices of the bracket expression as Operations, if they exist, otherwise an empty list.
-        """
-        bracket_expr: List[Operation] = []
-        while self.check(TokenKind.LSQUAREBRACKET):
-            self.match(TokenKind.LSQUAREBRACKET)
-            index = self.parse_expr()
+            self.error("expression found, but comma expected")
+        if frame is LIST_FRAME:
             self.match(TokenKind.RSQUAREBRACKET)
-            bracket_expr.append(index)
-        return bracket_expr
+            return ast.ListExpr(value)
+        self.match(TokenKind.RROUNDBRACKET)
+        func, args = value
+        return ast.CallExpr(func, args)
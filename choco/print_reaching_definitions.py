@@ -0,0 +1,137 @@
+from typing import Dict, Iterator, List, Tuple
+
+from xdsl.context import MLContext
+from xdsl.dialects.builtin import IntegerAttr, ModuleOp, StringAttr
+from xdsl.passes import ModulePass
+
+from choco.dataflow import BitSet, ReachingDefinitions, bits
+from choco.dialects.choco_ast import *
+from choco.warn_dead_code import Body, DeadCodeChecker, Key
+
+
+def render(op: Operation) -> str:
+    """A short source rendering of an element of a basic block."""
+    if isinstance(op, Literal):
+        value = op.value
+        if isinstance(value, StringAttr):
+            return f'"{value.data}"'
+        if isinstance(value, IntegerAttr):
+            return str(value.value.data)
+        if isinstance(value, BoolAttr):
+            return str(value.data)
+        return "None"
+    if isinstance(op, ExprName):
+        return op.id.data  # type: ignore
+    if isinstance(op, UnaryExpr):
+        return f"({op.op.data} {render(op.value.op)})"  # type: ignore
+    if isinstance(op, BinaryExpr):
+        lhs, rhs = render(op.lhs.op), render(op.rhs.op)
+        return f"({lhs} {op.op.data} {rhs})"  # type: ignore
+    if isinstance(op, IfExpr):
+        cond, then = render(op.cond.op), render(op.then.op)
+        return f"({then} if {cond} else {render(op.or_else.op)})"
+    if isinstance(op, ListExpr):
+        return f"[{', '.join(render(elem) for elem in op.elems.ops)}]"
+    if isinstance(op, CallExpr):
+        args = ", ".join(render(arg) for arg in op.args.ops)
+        return f"{op.func.data}({args})"  # type: ignore
+    if isinstance(op, IndexExpr):
+        return f"{render(op.value.op)}[{render(op.index.op)}]"
+    if isinstance(op, Assign):
+        return f"{render(op.target.op)} = {render(op.value.op)}"
+    if isinstance(op, Return):
+        value = op.value.ops.first
+        return "return" if value is None else f"return {render(value)}"
+    if isinstance(op, For):
+        return f"for {op.iter_name.data} in {render(op.iter.op)}"  # type: ignore
+    if isinstance(op, TypeName):
+        return op.type_name.data  # type: ignore
+    if isinstance(op, ListType):
+        return f"[{render(op.elem_type.op)}]"
+    if isinstance(op, TypedVar):
+        return f"{op.var_name.data}: {render(op.type.op)}"  # type: ignore
+    if isinstance(op, VarDef):
+        return f"{render(op.typed_var.op)} = {render(op.literal.op)}"
+    return op.name
+
+
+def elements(body: Body) -> Iterator[Operation]:
+    """The elements of the basic blocks of a body, in program order."""
+    for stmt in body.cfg.block_of:
+        if isinstance(stmt, (If, While)):
+            yield stmt.cond.op
+        elif isinstance(stmt, For):
+            yield stmt.iter.op
+            yield stmt
+        elif stmt in body.uses:
+            yield stmt
+
+
+def print_reaching_definitions(checker: DeadCodeChecker, body: Body):
+    owner = body.scope.owner
+    name = owner.func_name.data if isinstance(owner, FuncDef) else "program"  # type: ignore
+    print(f"// reaching definitions in {name}")
+
+    # Number the variables defined in the scope and written in the body. The
+    # parameters and the initial values of the variables of the scope are
+    # defined at the entry of the body.
+    variables: Dict[Key, int] = {}
+    entry_defs: List[Tuple[Operation, int]] = []
+    for typed_var, key in checker.params + checker.var_defs:
+        if key[0] is owner:
+            variables[key] = len(variables)
+            var_def = typed_var.parent_op()
+            definition = var_def if isinstance(var_def, VarDef) else typed_var
+            entry_defs.append((definition, variables[key]))
+    for uses in body.uses.values():
+        for _, key in uses.writes:
+            variables.setdefault(key, len(variables))
+
+    def defs(element: Operation) -> BitSet:
+        s = 0
+        for _, key in body.uses[element].writes:
+            s |= 1 << variables[key]
+        return s
+
+    reaching = ReachingDefinitions(body.cfg, defs, entry_defs)
+    before: Dict[Operation, BitSet] = {}
+    for block in body.cfg.reachable():
+        for element, facts, _ in reaching.elements(block):
+            before[element] = facts
+
+    for element in elements(body):
+        if element not in before:
+            continue
+        reads: List[str] = []
+        for key in sorted(body.uses[element].reads, key=lambda key: key[1]):
+            var = variables.get(key)
+            if var is None:
+                continue
+            sources = [
+                render(op)
+                for op, v in (reaching.definitions[i] for i in bits(before[element]))
+                if v == var
+            ]
+            if sources:
+                reads.append(f"{key[1]}: {'; '.join(sources)}")
+        line = render(element)
+        if reads:
+            line += f"  // {', '.join(reads)}"
+        print(line)
+
+
+class PrintReachingDefinitions(ModulePass):
+    """
+    Print, for each element of the control flow graphs of the program and of
+    its functions, the assignments that reach each variable it reads.
+    """
+
+    name = "print-reaching-definitions"
+
+    def apply(self, ctx: MLContext, op: ModuleOp) -> None:
+        program = op.ops.first
+        assert isinstance(program, Program)
+
+        checker = DeadCodeChecker(program)
+        for body in checker.bodies:
+            print_reaching_definitions(checker, body)
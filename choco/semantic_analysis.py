@@ -0,0 +1,307 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from xdsl.context import MLContext
+from xdsl.dialects.builtin import ModuleOp
+from xdsl.passes import ModulePass
+
+from choco.ast_visitor import Visitor
+from choco.check_assign_target import CheckAssignTargetPass
+from choco.dialects.choco_ast import *
+from choco.name_analysis import NameAnalysis
+from choco.semantic_cache import (
+    SemanticCache,
+    fingerprint,
+    get_type_hints,
+    preorder,
+    set_type_hints,
+)
+from choco.semantic_error import SemanticError
+from choco.symbol_table import SymbolKind, SymbolTable, set_symbol_table
+from choco.type_checking import (
+    FunctionInfo,
+    FunctionType,
+    LocalEnvironment,
+    Type,
+    TypeChecking,
+    bottom_type,
+    builtin_env,
+    check_stmt_or_def,
+    none_type,
+)
+from choco.warn_dead_code import WarnDeadCode
+
+
+@dataclass
+class Scope:
+    """
+    The names defined in the program or in a function, shared by the name and
+    type checks. Function names map to the scope of their body.
+
+    `func` is the symbol of the function of the scope, or None for the global
+    scope, and `symbols` maps each name to its symbol in the symbol table, or
+    to -1 for a global or nonlocal declaration that is not checked yet.
+    """
+
+    names: Dict[str, Optional["Scope"]] = field(default_factory=dict)
+    parent: Optional["Scope"] = None
+    func: Optional[int] = None
+    symbols: Dict[str, int] = field(default_factory=dict)
+
+    def define(self, name: str, symbol: int, body: Optional["Scope"] = None):
+        if name in self.names:
+            raise SemanticError(
+                f"[Name Analysis Error]: "
+                f"Identifier {name} already defined in the current context"
+            )
+        self.names[name] = body
+        self.symbols[name] = symbol
+
+    def lookup(self, name: str) -> Optional[int]:
+        """The symbol of the name in the innermost scope that defines it."""
+        scope: Optional[Scope] = self
+        while scope is not None:
+            if name in scope.names:
+                return scope.symbols[name]
+            scope = scope.parent
+        return None
+
+
+def declare_var_def(
+    var_def: VarDef, scope: Scope, o: LocalEnvironment, table: SymbolTable
+):
+    typed_var = var_def.typed_var.op
+    assert isinstance(typed_var, TypedVar)
+    name = typed_var.var_name.data  # type: ignore
+    scope.define(name, table.define(name, SymbolKind.VAR, scope.func, typed_var))
+    o[name] = Type.from_op(typed_var.type.op)
+
+
+def declare_func_def(
+    func_def: FuncDef, scope: Scope, o: LocalEnvironment, table: SymbolTable
+):
+    """
+    Add a function to the scope of its parent, to the type environment and to
+    the symbol table, together with the scope of its body.
+
+    As in `build_env`, nested functions are added to the global environment.
+    """
+    name: str = func_def.func_name.data  # type: ignore
+    func = table.define(name, SymbolKind.FUNC, scope.func, func_def)
+    body = Scope(parent=scope, func=func)
+    xs: List[str] = []
+    ts: List[Type] = []
+    for op in func_def.params.ops:
+        assert isinstance(op, TypedVar)
+        param: str = op.var_name.data  # type: ignore
+        body.define(param, table.define(param, SymbolKind.PARAM, func, op))
+        xs.append(param)
+        ts.append(Type.from_op(op.type.op))
+    t = (
+        Type.from_op(func_def.return_type.op)
+        if len(func_def.return_type.ops) == 1
+        else none_type
+    )
+    for op in func_def.func_body.ops:
+        if isinstance(op, GlobalDecl) or isinstance(op, NonLocalDecl):
+            body.define(op.decl_name.data, -1)  # type: ignore
+
+    vs: LocalEnvironment = {}
+    for op in func_def.func_body.ops:
+        if isinstance(op, VarDef):
+            declare_var_def(op, body, vs, table)
+        elif isinstance(op, FuncDef):
+            declare_func_def(op, body, o, table)
+
+    scope.define(name, func, body)
+    o[name] = FunctionInfo(
+        FunctionType(ts, t), xs, [(v, vt) for v, vt in vs.items()]  # type: ignore
+    )
+
+
+@dataclass
+class CheckVisitor(Visitor):
+    """
+    Check the assignment targets and the uses of names in one traversal, and
+    resolve the names in the symbol table as `name-analysis` does.
+    """
+
+    scope: Scope
+    global_scope: Scope
+    table: SymbolTable
+
+    def resolve(self, op: Operation, symbol: int):
+        if symbol >= 0:
+            self.table.resolved[op] = symbol
+
+    def visit_assign(self, assign: Assign):
+        target_op = assign.target.op
+        if isinstance(target_op, ExprName):
+            name = target_op.id.data  # type: ignore
+            if name in self.scope.names:
+                return
+            raise SemanticError(
+                f"[Name Analysis Error]: Cannot assign to variable `{name}' "
+                f"that is not explicitly declared in this scope"
+            )
+        if isinstance(target_op, IndexExpr):
+            return
+        raise SemanticError(
+            f"Found {type(target_op).__name__} as the left-hand side of an "
+            f"assignment. Expected to find variable name or index expression only."
+        )
+
+    def visit_expr_name(self, expr_name: ExprName):
+        name = expr_name.id.data  # type: ignore
+        symbol = self.scope.lookup(name)
+        if symbol is None:
+            raise SemanticError(
+                f"[Name Analysis Error]: "
+                f"Identifier `{name}' found that was not previously defined."
+            )
+        self.resolve(expr_name, symbol)
+
+    def visit_call_expr(self, call_expr: CallExpr):
+        name = call_expr.func.data  # type: ignore
+        symbol = self.scope.lookup(name)
+        if symbol is None:
+            raise SemanticError(
+                f"[Name Analysis Error]: "
+                f"Identifier `{name}' found that was not previously defined."
+            )
+        self.resolve(call_expr, symbol)
+
+    def traverse_func_def(self, func_def: FuncDef):
+        scope = self.scope
+        body = scope.names.get(func_def.func_name.data)  # type: ignore
+        assert body is not None
+        self.scope = body
+        for op in func_def.func_body.ops:
+            self.traverse(op)
+        self.scope = scope
+
+    def traverse_for(self, for_op: For):
+        name = for_op.iter_name.data  # type: ignore
+        if name not in self.scope.names:
+            raise SemanticError(
+                f"[Name Analysis Error]: "
+                f"Identifier `{name}' found that was not previously defined."
+            )
+        self.resolve(for_op, self.scope.symbols[name])
+        self.traverse(for_op.iter.op)
+        for op in for_op.body.ops:
+            self.traverse(op)
+
+    def declare(self, decl: Operation, name: str, scope: Scope):
+        """Make the declared name refer to its symbol in the given scope."""
+        symbol = scope.symbols[name]
+        self.scope.symbols[name] = symbol
+        self.resolve(decl, symbol)
+
+    def visit_global_decl(self, global_decl: GlobalDecl):
+        name = global_decl.decl_name.data  # type: ignore
+        if name not in self.global_scope.names:
+            raise SemanticError(
+                f"[Name Analysis Error]: "
+                f"Identifier `{name}' not declared in global scope."
+            )
+        self.declare(global_decl, name, self.global_scope)
+
+    def visit_non_local_decl(self, non_local_decl: NonLocalDecl):
+        name = non_local_decl.decl_name.data  # type: ignore
+        parent = self.scope.parent
+        if parent is None or parent is self.global_scope or name not in parent.names:
+            raise SemanticError(
+                f"[Name Analysis Error]: "
+                f"Identifier `{name}' not declared in valid parent scope."
+            )
+        self.declare(non_local_decl, name, parent)
+
+
+def analyze(module: ModuleOp, cache: Optional[SemanticCache] = None) -> SymbolTable:
+    """
+    Run the checks of `check-assign-target`, `name-analysis` and
+    `type-checking` on a module.
+
+    The definitions are collected once into the shared scopes, the type
+    environment and the symbol table, and each top-level definition and
+    statement is then checked for its names and its types.
+
+    :param cache: The results of previous analyses. Top-level functions found
+                  in the cache get their cached type hints instead of being
+                  checked, and the functions that are checked are added to it.
+    :returns: The symbol table of the program. The names used in the cached
+              functions are not resolved, and are looked up by name.
+    """
+    program = module.ops.first
+    assert isinstance(program, Program)
+
+    table = SymbolTable()
+    global_scope = Scope()
+    for builtin in ["print", "len", "input"]:
+        symbol = table.define(builtin, SymbolKind.BUILTIN, None)
+        global_scope.define(builtin, symbol, Scope())
+    o = builtin_env()
+    for op in program.defs.ops:
+        if isinstance(op, VarDef):
+            declare_var_def(op, global_scope, o, table)
+        elif isinstance(op, FuncDef):
+            declare_func_def(op, global_scope, o, table)
+
+    visitor = CheckVisitor(global_scope, global_scope, table)
+    for op in program.defs.ops:
+        if cache is not None and isinstance(op, FuncDef):
+            ops = preorder(op)
+            key = fingerprint(ops, o)
+            hints = cache.lookup(key)
+            if hints is not None and set_type_hints(ops, hints):
+                continue
+            visitor.traverse(op)
+            check_stmt_or_def(o, bottom_type, op)
+            cache.add(key, get_type_hints(ops))
+            continue
+        visitor.traverse(op)
+        check_stmt_or_def(o, bottom_type, op)
+    for op in program.stmts.ops:
+        visitor.traverse(op)
+        check_stmt_or_def(o, bottom_type, op)
+    return table
+
+
+@dataclass(frozen=True)
+class SemanticAnalysis(ModulePass):
+    """
+    The semantic analysis of `check-assign-target`, `name-analysis`,
+    `type-checking` and optionally `warn-dead-code` as a single pass.
+
+    The first three are checked together, item by item, and leave the symbol
+    table of `name-analysis` to the passes that follow. `warn-dead-code`
+    needs the whole program, and still walks it separately afterwards.
+
+    If `cache` is the path of a semantic cache, the unchanged top-level
+    functions are not checked again, and the cache is updated if the program
+    passes the analysis. The dead code warnings are not cached: whether a
+    function, a variable or a store is used depends on the whole program, so
+    `warn-dead-code` always checks all of it.
+    """
+
+    name = "semantic-analysis"
+
+    warn_dead_code: bool = False
+    cache: str = ""
+
+    def apply(self, ctx: MLContext, op: ModuleOp) -> None:
+        cache = SemanticCache.load(self.cache) if self.cache else None
+        try:
+            set_symbol_table(op, analyze(op, cache))
+            if cache is not None:
+                cache.save()
+        except SemanticError:
+            # The checks above are interleaved, so the first error they find
+            # is not necessarily the one the separate passes report first.
+            # Run the separate passes to report the same error.
+            CheckAssignTargetPass().apply(ctx, op)
+            NameAnalysis().apply(ctx, op)
+            TypeChecking().apply(ctx, op)
+        if self.warn_dead_code:
+            WarnDeadCode().apply(ctx, op)
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from xdsl.dialects.builtin import IntegerAttr, StringAttr
+from xdsl.ir import Attribute, Operation
+
+import choco.dialects.choco_type as choco_type
+from choco.type_checking import FunctionInfo, LocalEnvironment, Type, to_attribute
+
+# Bump when the fingerprints or the cached results change, so that caches
+# written by an older version are ignored.
+CACHE_VERSION = 2
+
+# The properties that hold the names used by an operation: the `id` of an
+# `ExprName`, the `func` of a `CallExpr`, the `iter_name` of a `For`, and the
+# `decl_name` of a `GlobalDecl` or `NonLocalDecl`.
+NAME_PROPERTIES = frozenset(["id", "func", "iter_name", "decl_name"])
+
+# The type hints of the operations of a function: the index of each
+# annotated operation in `preorder`, and its type hint.
+TypeHints = List[Tuple[int, Attribute]]
+
+
+def cache_path(source: str, directory: str) -> str:
+    """
+    The path of the semantic cache of a source file, in the directory of the
+    semantic caches, named after the absolute path of the source.
+
+    The caches are not stored next to the sources, so that compiling does not
+    write to source trees, which may be read-only or under version control,
+    and so that a cache in a shared source tree is not read by other users.
+    """
+    source = os.path.abspath(source)
+    name = hashlib.sha256(source.encode()).hexdigest()
+    return os.path.join(directory, name + ".json")
+
+
+def encode_hint(hint: Attribute) -> Any:
+    """
+    The JSON value of a type hint: the name of a named type, or the list of
+    the element type of a list type.
+    """
+    if isinstance(hint, choco_type.NamedType):
+        return hint.type_name.data  # type: ignore
+    if isinstance(hint, choco_type.ListType):
+        return [encode_hint(hint.elem_type)]  # type: ignore
+    raise ValueError(f"cannot cache the type hint {hint}")
+
+
+def decode_hint(value: Any) -> Attribute:
+    if isinstance(value, str):
+        return choco_type.NamedType([StringAttr(value)])
+    if isinstance(value, list) and len(value) == 1:
+        return choco_type.ListType([decode_hint(value[0])])
+    raise ValueError(f"invalid type hint {value!r}")
+
+
+def decode_hints(value: Any) -> TypeHints:
+    if not isinstance(value, list):
+        raise ValueError(f"invalid type hints {value!r}")
+    hints: TypeHints = []
+    for item in value:
+        if not (
+            isinstance(item, list)
+            and len(item) == 2
+            and isinstance(item[0], int)
+            and item[0] >= 0
+        ):
+            raise ValueError(f"invalid type hint {item!r}")
+        hints.append((item[0], decode_hint(item[1])))
+    return hints
+
+
+def preorder(op: Operation) -> List[Operation]:
+    """The operation and its nested operations, in the order of `walk`."""
+    ops: List[Operation] = []
+    stack = [op]
+    while stack:
+        op = stack.pop()
+        ops.append(op)
+        for r in reversed(op.regions):
+            b = r.last_block
+            while b is not None:
+                nested = b.last_op
+                while nested is not None:
+                    stack.append(nested)
+                    nested = nested.prev_op
+                b = b.prev_block
+    return ops
+
+
+def attribute_key(attr: Attribute) -> str:
+    if isinstance(attr, IntegerAttr):
+        return f"IntegerAttr {attr.value.data}"
+    # StringAttr and BoolAttr
+    data = getattr(attr, "data", None)
+    if data is not None:
+        return f"{type(attr).__name__} {data!r}"
+    return repr(attr)
+
+
+def type_key(t: Type) -> str:
+    # Not `repr`, which includes the address of the `object` type.
+    return repr(to_attribute(t))
+
+
+def fingerprint(ops: List[Operation], o: LocalEnvironment) -> str:
+    """
+    Fingerprint a top-level function together with the part of the global
+    environment it depends on.
+
+    The fingerprint covers the operations of the function, and for each name
+    it uses, the global type of the name, or the signature of the function of
+    that name. Changing a callee's body or local variables therefore does not
+    change the fingerprints of its callers, while changing its signature does.
+
+    :param ops: The operations of the function, as returned by `preorder`.
+    """
+    parts: List[str] = []
+    names: Set[str] = set()
+    for op in ops:
+        parts.append(op.name)
+        for name, attr in op.properties.items():
+            if name != "type_hint":
+                parts.append(f"{name}={attribute_key(attr)}")
+                if name in NAME_PROPERTIES:
+                    names.add(attr.data)  # type: ignore
+        for r in op.regions:
+            parts.append(",".join(str(len(b.ops)) for b in r.blocks))
+    for name in sorted(names):
+        info = o.get(name)
+        if info is None:
+            parts.append(f"{name}:")
+        elif isinstance(info, FunctionInfo):
+            inputs = ",".join(type_key(t) for t in info.func_type.inputs)
+            parts.append(f"{name}:({inputs})->{type_key(info.func_type.output)}")
+        else:
+            parts.append(f"{name}:{type_key(info)}")
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def get_type_hints(ops: List[Operation]) -> TypeHints:
+    return [
+        (i, op.properties["type_hint"])
+        for i, op in enumerate(ops)
+        if "type_hint" in op.properties
+    ]
+
+
+def set_type_hints(ops: List[Operation], hints: TypeHints) -> bool:
+    """
+    Set the cached type hints of the operations of a function.
+
+    :returns: False if the hints do not fit the operations, in which case no
+              hint is set.
+    """
+    if any(i >= len(ops) for i, _ in hints):
+        return False
+    for i, hint in hints:
+        ops[i].properties["type_hint"] = hint
+    return True
+
+
+@dataclass
+class SemanticCache:
+    """
+    The results of semantic analysis of the top-level functions of a program,
+    keyed by their fingerprints.
+
+    A function is only cached once it passed semantic analysis, so a cached
+    function does not need to be checked again. Only the functions looked up
+    or added since the cache was loaded are saved, so that the cache does not
+    grow with old versions of a program.
+
+    The cache is stored as JSON, which is only read as data: a cache file
+    crafted by someone else can at worst give wrong type hints.
+    """
+
+    path: str
+    entries: Dict[str, TypeHints] = field(default_factory=dict)
+    used: Dict[str, TypeHints] = field(default_factory=dict)
+
+    @staticmethod
+    def load(path: str) -> "SemanticCache":
+        """Load a cache, or create an empty one if it is missing or invalid."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") != CACHE_VERSION:
+                return SemanticCache(path)
+            entries = {
+                str(key): decode_hints(hints) for key, hints in data["entries"].items()
+            }
+        except (
+            OSError,
+            ValueError,
+            KeyError,
+            AttributeError,
+            TypeError,
+            RecursionError,
+        ):
+            return SemanticCache(path)
+        return SemanticCache(path, entries)
+
+    def lookup(self, key: str) -> Optional[TypeHints]:
+        hints = self.entries.get(key)
+        if hints is not None:
+            self.used[key] = hints
+        return hints
+
+    def add(self, key: str, hints: TypeHints):
+        try:
+            for _, hint in hints:
+                encode_hint(hint)
+        except ValueError:
+            return
+        self.used[key] = hints
+
+    def save(self):
+        """
+        Write the cache atomically, so that concurrent compilations of the
+        same source never read a partially written cache.
+        """
+        if self.used.keys() == self.entries.keys():
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        except OSError:
+            # The cache only saves time, so skip it if it cannot be written.
+            return
+        try:
+            entries = {
+                key: [[i, encode_hint(hint)] for i, hint in hints]
+                for key, hints in self.used.items()
+            }
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": CACHE_VERSION, "entries": entries}, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -0,0 +1,85 @@
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from typing import Dict, List, Optional
+from weakref import WeakKeyDictionary
+
+from xdsl.dialects.builtin import ModuleOp
+from xdsl.ir import Operation
+
+
+class SymbolKind(Enum):
+    BUILTIN = auto()
+    VAR = auto()
+    PARAM = auto()
+    FUNC = auto()
+
+
+@dataclass
+class Symbol:
+    """
+    A function, variable or parameter defined in a program.
+
+    :param name: The name of the symbol.
+    :param kind: What the symbol is.
+    :param scope: The id of the function whose body defines the symbol, or
+                  None for global symbols.
+    :param op: The `FuncDef` of a function, or the `TypedVar` of a variable or
+               a parameter. None for builtin functions.
+    """
+
+    name: str
+    kind: SymbolKind
+    scope: Optional[int]
+    op: Optional[Operation] = None
+
+
+@dataclass
+class SymbolTable:
+    """
+    The symbols of a program, resolved by name analysis.
+
+    Symbols are identified by their index in `symbols`. Name analysis maps each
+    operation that defines or uses a name to the id of its symbol: `FuncDef`
+    and `TypedVar` to the symbol they define, `ExprName`, `CallExpr` and `For`
+    to the symbol they use, and `GlobalDecl` and `NonLocalDecl` to the symbol
+    they declare.
+    """
+
+    symbols: List[Symbol] = field(default_factory=list)
+    resolved: Dict[Operation, int] = field(default_factory=dict)
+
+    def define(
+        self,
+        name: str,
+        kind: SymbolKind,
+        scope: Optional[int],
+        op: Optional[Operation] = None,
+    ) -> int:
+        self.symbols.append(Symbol(name, kind, scope, op))
+        symbol = len(self.symbols) - 1
+        if op is not None:
+            self.resolved[op] = symbol
+        return symbol
+
+
+# The symbol table of each program that passed name analysis, kept outside of
+# the IR so that the printed AST does not change. Keyed by the `Program`
+# operation, so that a table is dropped together with its AST.
+symbol_tables: "WeakKeyDictionary[Operation, SymbolTable]" = WeakKeyDictionary()
+
+
+def set_symbol_table(module: ModuleOp, table: SymbolTable):
+    program = module.ops.first
+    assert program is not None
+    symbol_tables[program] = table
+
+
+def get_symbol_table(module: ModuleOp) -> Optional[SymbolTable]:
+    """
+    Return the symbol table of the program in `module`, or None if name
+    analysis was not run on it in this process.
+    """
+    program = module.ops.first
+    if program is None:
+        return None
+    return symbol_tables.get(program)
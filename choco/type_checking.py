@@ -1,9 +1,8 @@
-from __future__ import annotations
-
 from abc import ABC
+from collections import ChainMap
 from dataclasses import dataclass
-from functools import reduce
-from typing import Dict, List, Optional, Tuple, Union
+from functools import cache, reduce
+from typing import ClassVar, Dict, List, MutableMapping, Optional, Tuple, Union
 
 from xdsl.context import MLContext
 from xdsl.dialects.builtin import ModuleOp
@@ -13,6 +12,7 @@ from xdsl.passes import ModulePass
 from choco.ast_visitor import Visitor
 from choco.dialects import choco_ast, choco_type
 from choco.semantic_error import SemanticError
+from choco.symbol_table import SymbolKind, SymbolTable, get_symbol_table
 
 
 class Type(ABC):
@@ -39,6 +39,7 @@ class Type(ABC):
         raise Exception(f"Found {op}, expected TypeName or ListType")
 
     @staticmethod
+    @cache
     def from_attribute(attr: Attribute) -> "Type":
         if isinstance(attr, choco_type.NamedType):
             name: str = attr.type_name.data  # type: ignore
@@ -61,22 +62,58 @@ class Type(ABC):
         raise Exception(f"Found {attr}, expected TypeName or ListType")
 
 
-@dataclass
+# Basic and list types are hash-consed: constructing a type that was already
+# constructed returns the same instance, so that types can be compared by
+# identity, and the results of the relations on types can be memoized.
+
+
+@dataclass(eq=False)
 class BasicType(Type):
     name: str
 
+    instances: ClassVar[Dict[str, "BasicType"]] = {}
 
-@dataclass
+    def __new__(cls, name: str) -> "BasicType":
+        t = cls.instances.get(name)
+        if t is None:
+            t = super().__new__(cls)
+            cls.instances[name] = t
+        return t
+
+    def __getnewargs__(self) -> Tuple[str]:
+        return (self.name,)
+
+
+@dataclass(eq=False)
 class ListType(Type):
     elem_type: Type
 
+    instances: ClassVar[Dict[Type, "ListType"]] = {}
+
+    def __new__(cls, elem_type: Type) -> "ListType":
+        t = cls.instances.get(elem_type)
+        if t is None:
+            t = super().__new__(cls)
+            cls.instances[elem_type] = t
+        return t
+
+    def __getnewargs__(self) -> Tuple[Type]:
+        return (self.elem_type,)
+
+
+# The bottom and object types are singletons, that are unpickled as the
+# instances of this module, as the parallel type checker sends them to its
+# workers.
+
 
 class BottomType(Type):  # "⊥"
-    pass
+    def __reduce__(self) -> str:
+        return "bottom_type"
 
 
 class ObjectType(Type):  # "object"
-    pass
+    def __reduce__(self) -> str:
+        return "object_type"
 
 
 @dataclass
@@ -94,6 +131,7 @@ bottom_type = BottomType()
 object_type = ObjectType()
 
 
+@cache
 def to_attribute(t: Type) -> Attribute:
     if t == int_type:
         return choco_type.int_type
@@ -114,6 +152,7 @@ def to_attribute(t: Type) -> Attribute:
         raise Exception(f"Can't translate {t} into an attribute")
 
 
+@cache
 def join(t1: Type, t2: Type) -> Type:
     if is_assignment_compatible(t1, t2):
         return t2
@@ -123,6 +162,7 @@ def join(t1: Type, t2: Type) -> Type:
         return object_type
 
 
+@cache
 def is_subtype(t1: Type, t2: Type) -> bool:
     if t1 == t2:
         return True
@@ -140,6 +180,7 @@ def is_subtype(t1: Type, t2: Type) -> bool:
         return False
 
 
+@cache
 def is_assignment_compatible(t1: Type, t2: Type) -> bool:
     if is_subtype(t1, t2) and t1 != bottom_type:
         return True
@@ -192,18 +233,37 @@ class FunctionInfo:
             raise Exception(f"Expected same number of input types and parameter names")
 
 
-LocalEnvironment = Dict[str, Union[Type, FunctionInfo]]
+# A dict for the global environment, and a ChainMap with a scope on top of
+# its parent environment for a function.
+LocalEnvironment = MutableMapping[str, Union[Type, FunctionInfo]]
 
 
+@dataclass(frozen=True)
 class TypeChecking(ModulePass):
+    """
+    Type-check a program.
+
+    With `jobs` greater than one, the bodies of the functions are checked in
+    a process pool of that size.
+    """
+
     name = "type-checking"
 
+    jobs: int = 1
+
     def apply(self, ctx: MLContext, op: ModuleOp) -> None:
-        o = build_env(op)
+        table = get_symbol_table(op)
+        o = build_env(op) if table is None else env_from_symbol_table(table)
         r = bottom_type
 
         program = op.ops.first
         assert isinstance(program, choco_ast.Program)
+        if self.jobs > 1:
+            # Imported here, as the parallel type checker uses this module.
+            from choco.parallel_type_checking import check_program_parallel
+
+            check_program_parallel(o, program, self.jobs)
+            return
         defs = list(program.defs.ops)
         if len(defs) >= 1:
             check_stmt_or_def_list(o, r, defs)
@@ -213,55 +273,123 @@ class TypeChecking(ModulePass):
 
 
 # Build local environments
-def build_env(module: ModuleOp) -> LocalEnvironment:
-    o: LocalEnvironment = {
+def builtin_env() -> LocalEnvironment:
+    return {
         "len": FunctionInfo(FunctionType([object_type], int_type), ["arg"], []),
         "print": FunctionInfo(FunctionType([object_type], none_type), ["arg"], []),
         "input": FunctionInfo(FunctionType([], str_type), [], []),
     }
 
-    @dataclass
-    class BuildEnvVisitor(Visitor):
-        o: LocalEnvironment
-
-        def visit_typed_var(self, typed_var: choco_ast.TypedVar):
-            name, type = typed_var.var_name.data, Type.from_op(  # type: ignore
-                typed_var.type.op
-            )
-            self.o.update({name: type})
-
-        def traverse_func_def(self, func_def: choco_ast.FuncDef):
-            f: str = func_def.func_name.data  # type: ignore
-            # collect function parameter names and types
-            xs: List[str] = []
-            ts: List[Type] = []
-            for op in func_def.params.ops:
-                assert isinstance(op, choco_ast.TypedVar)
-                name, type = op.var_name.data, Type.from_op(op.type.op)  # type: ignore
-                xs.append(name)
+
+@dataclass
+class BuildEnvVisitor(Visitor):
+    o: LocalEnvironment
+    # The environment that all function definitions are added to, including
+    # nested ones.
+    global_o: LocalEnvironment
+
+    def visit_typed_var(self, typed_var: choco_ast.TypedVar):
+        name, type = typed_var.var_name.data, Type.from_op(  # type: ignore
+            typed_var.type.op
+        )
+        self.o.update({name: type})
+
+    def traverse_func_def(self, func_def: choco_ast.FuncDef):
+        f: str = func_def.func_name.data  # type: ignore
+        # collect function parameter names and types
+        xs: List[str] = []
+        ts: List[Type] = []
+        for op in func_def.params.ops:
+            assert isinstance(op, choco_ast.TypedVar)
+            name, type = op.var_name.data, Type.from_op(op.type.op)  # type: ignore
+            xs.append(name)
+            ts.append(type)
+        # collect return type
+        t = (
+            Type.from_op(func_def.return_type.op)
+            if (len(func_def.return_type.ops) == 1)
+            else none_type
+        )
+        # collect nested variable definitions
+        body_visitor = BuildEnvVisitor({}, self.global_o)
+        for op in func_def.func_body.ops:
+            body_visitor.traverse(op)
+        vs: List[Tuple[str, Type]] = []
+        for var_name, var_type in body_visitor.o.items():
+            assert isinstance(var_type, Type)
+            vs.append((var_name, var_type))
+
+        self.global_o.update({f: FunctionInfo(FunctionType(ts, t), xs, vs)})
+
+
+def build_env(module: ModuleOp) -> LocalEnvironment:
+    o = builtin_env()
+    BuildEnvVisitor(o, o).traverse(module)
+    return o
+
+
+def env_from_symbol_table(table: SymbolTable) -> LocalEnvironment:
+    """
+    Build the environment of `build_env` from the symbols resolved by name
+    analysis, without traversing the AST.
+    """
+    # The symbols defined in the global scope and in each function, in order.
+    defined: Dict[Optional[int], List[int]] = {}
+    for i, symbol in enumerate(table.symbols):
+        if symbol.kind != SymbolKind.BUILTIN:
+            defined.setdefault(symbol.scope, []).append(i)
+
+    o = builtin_env()
+
+    def add_func(func: int):
+        xs: List[str] = []
+        ts: List[Type] = []
+        vs: List[Tuple[str, Type]] = []
+        for i in defined.get(func, []):
+            symbol = table.symbols[i]
+            if symbol.kind == SymbolKind.FUNC:
+                # As in `build_env`, nested functions are added to the global
+                # environment, before the function that defines them.
+                add_func(i)
+                continue
+            assert isinstance(symbol.op, choco_ast.TypedVar)
+            type = Type.from_op(symbol.op.type.op)
+            if symbol.kind == SymbolKind.PARAM:
+                xs.append(symbol.name)
                 ts.append(type)
-            # collect return type
-            t = (
-                Type.from_op(func_def.return_type.op)
-                if (len(func_def.return_type.ops) == 1)
-                else none_type
-            )
-            # collect nested variable definitions
-            body_visitor = BuildEnvVisitor({})
-            for op in func_def.func_body.ops:
-                body_visitor.traverse(op)
-            vs: List[Tuple[str, Type]] = []
-            for var_name, var_type in body_visitor.o.items():
-                assert isinstance(var_type, Type)
-                vs.append((var_name, var_type))
-
-            o.update({f: FunctionInfo(FunctionType(ts, t), xs, vs)})
-
-    BuildEnvVisitor(o).traverse(module)
+            else:
+                vs.append((symbol.name, type))
+        func_def = table.symbols[func].op
+        assert isinstance(func_def, choco_ast.FuncDef)
+        t = (
+            Type.from_op(func_def.return_type.op)
+            if (len(func_def.return_type.ops) == 1)
+            else none_type
+        )
+        o[table.symbols[func].name] = FunctionInfo(FunctionType(ts, t), xs, vs)
 
+    for i in defined.get(None, []):
+        symbol = table.symbols[i]
+        if symbol.kind == SymbolKind.FUNC:
+            add_func(i)
+        else:
+            assert isinstance(symbol.op, choco_ast.TypedVar)
+            o[symbol.name] = Type.from_op(symbol.op.type.op)
     return o
 
 
+def extend_env(o: LocalEnvironment, op: Operation) -> None:
+    """
+    Add the definitions of one top-level operation to an environment, so that
+    the environment can be built while the program is parsed, from the items
+    yielded by `Parser.iter_program`.
+
+    :param o: An environment created by `builtin_env`.
+    :param op: A top-level definition or statement.
+    """
+    BuildEnvVisitor(o, o).traverse(op)
+
+
 # Dispatch to typing rules to decide which rule to invoke
 
 
@@ -845,7 +973,7 @@ def func_def_rule(o: LocalEnvironment, r: Type, f: str, b: List[Operation]):
     xs = info.params
     vs = info.nested_defs
 
-    o = o.copy()
+    o = ChainMap({}, o)
     for xi, ti in zip(xs, ts):
         o.update({xi: ti})
     for vi, ti in vs:
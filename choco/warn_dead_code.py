@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from io import StringIO
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from xdsl.context import MLContext
 from xdsl.dialects.builtin import ModuleOp
@@ -9,13 +10,18 @@ from xdsl.passes import ModulePass
 from xdsl.printer import Printer
 
 from choco.ast_visitor import Visitor
+from choco.dataflow import (
+    BasicBlock,
+    BitSet,
+    ControlFlowGraph,
+    GenKill,
+    LiveVariables,
+    build_cfg,
+)
+from choco.dead_code_error import DeadCodeError
 from choco.dialects.choco_ast import *
 
 
-class DeadCodeError(Exception):
-    pass
-
-
 @dataclass
 class UnreachableStatementsError(DeadCodeError):
     """Raised when some statements are unreachable."""
@@ -90,12 +96,302 @@ class UnusedExpressionError(DeadCodeError):
         return stream.getvalue()
 
 
+# A variable or function: the `Program` or `FuncDef` that defines it, or None
+# for builtin functions, and its name.
+Key = Tuple[Optional[Operation], str]
+
+
+@dataclass
+class Scope:
+    """
+    The names visible in the program or in a function body, and the variables
+    or functions they refer to.
+    """
+
+    owner: Operation
+    parent: Optional[Scope] = None
+    names: Dict[str, Key] = field(default_factory=dict)
+
+    def resolve(self, name: str) -> Key:
+        scope: Optional[Scope] = self
+        while scope is not None:
+            key = scope.names.get(name)
+            if key is not None:
+                return key
+            scope = scope.parent
+        return (None, name)
+
+
+@dataclass
+class UsesVisitor(Visitor):
+    """
+    Collect the variables an element of a basic block reads and writes, and
+    the functions it calls. The targets of assignments are written, and the
+    lists and indices of index targets are read.
+    """
+
+    scope: Scope
+    reads: Set[Key] = field(default_factory=set)
+    calls: Set[Key] = field(default_factory=set)
+    # The variables written, each with the `Assign` or `For` that writes it.
+    writes: List[Tuple[Operation, Key]] = field(default_factory=list)
+    # Whether a part of an expression can never be evaluated.
+    unreachable: bool = False
+
+    def visit_expr_name(self, expr_name: ExprName):
+        self.reads.add(self.scope.resolve(expr_name.id.data))  # type: ignore
+
+    def visit_call_expr(self, call_expr: CallExpr):
+        self.calls.add(self.scope.resolve(call_expr.func.data))  # type: ignore
+
+    def visit_binary_expr(self, binary_expr: BinaryExpr):
+        # The right-hand side of `False and e` and of `True or e`
+        op = binary_expr.op.data  # type: ignore
+        if op == "and" or op == "or":
+            lhs = binary_expr.lhs.op
+            if (
+                isinstance(lhs, Literal)
+                and isinstance(lhs.value, BoolAttr)
+                and lhs.value.data == (op == "or")
+            ):
+                self.unreachable = True
+
+    def visit_if_expr(self, if_expr: IfExpr):
+        cond = if_expr.cond.op
+        if isinstance(cond, Literal) and isinstance(cond.value, BoolAttr):
+            self.unreachable = True
+
+    def traverse_assign(self, assign: Assign):
+        target = assign.target.op
+        if isinstance(target, ExprName):
+            self.writes.append((assign, self.scope.resolve(target.id.data)))  # type: ignore
+        else:
+            self.traverse(target)
+        self.traverse(assign.value.op)
+
+    def traverse_for(self, for_op: For):
+        # A `For` element only writes the loop variable.
+        self.writes.append((for_op, self.scope.resolve(for_op.iter_name.data)))  # type: ignore
+
+    def traverse_func_def(self, func_def: FuncDef):
+        pass
+
+
+@dataclass
+class Body:
+    """
+    The statements of the program or of a function, with their control flow
+    graph and the variables and functions each element uses.
+    """
+
+    scope: Scope
+    cfg: ControlFlowGraph
+    uses: Dict[Operation, UsesVisitor] = field(default_factory=dict)
+
+    @staticmethod
+    def build(scope: Scope, stmts: Iterable[Operation]) -> Body:
+        body = Body(scope, build_cfg(stmts))
+        for block in body.cfg.blocks:
+            for element in block.elements:
+                visitor = UsesVisitor(scope)
+                visitor.traverse(element)
+                body.uses[element] = visitor
+        return body
+
+
+class DeadCodeChecker:
+    """
+    Find the dead code in a program.
+
+    The program and each function body have their own control flow graph.
+    Unused stores are found by a live-variable analysis on these graphs. A
+    call reads the global and nonlocal variables its function, or any
+    function it calls, reads.
+    """
+
+    def __init__(self, program: Program):
+        self.program = program
+        global_scope = Scope(program)
+        self.bodies: List[Body] = []
+        # The parameters and variables defined in the program, in order.
+        self.params: List[Tuple[TypedVar, Key]] = []
+        self.var_defs: List[Tuple[TypedVar, Key]] = []
+        self.functions: Dict[Key, FuncDef] = {}
+
+        self.declare(global_scope, program.defs.ops)
+        for op in program.defs.ops:
+            if isinstance(op, FuncDef):
+                self.add_function(global_scope, op)
+        self.bodies.append(Body.build(global_scope, program.stmts.ops))
+
+    def declare(self, scope: Scope, defs: Iterable[Operation]):
+        for op in defs:
+            if isinstance(op, VarDef):
+                typed_var = op.typed_var.op
+                assert isinstance(typed_var, TypedVar)
+                key = (scope.owner, typed_var.var_name.data)  # type: ignore
+                scope.names[key[1]] = key
+                self.var_defs.append((typed_var, key))
+            elif isinstance(op, FuncDef):
+                key = (scope.owner, op.func_name.data)  # type: ignore
+                scope.names[key[1]] = key
+                self.functions[key] = op
+            elif isinstance(op, GlobalDecl):
+                name = op.decl_name.data  # type: ignore
+                scope.names[name] = (self.program, name)
+            elif isinstance(op, NonLocalDecl):
+                name = op.decl_name.data  # type: ignore
+                assert scope.parent is not None
+                scope.names[name] = scope.parent.resolve(name)
+
+    def add_function(self, parent: Scope, func_def: FuncDef):
+        scope = Scope(func_def, parent)
+        for op in func_def.params.ops:
+            assert isinstance(op, TypedVar)
+            key = (func_def, op.var_name.data)  # type: ignore
+            scope.names[key[1]] = key
+            self.params.append((op, key))
+        self.declare(scope, func_def.func_body.ops)
+        for op in func_def.func_body.ops:
+            if isinstance(op, FuncDef):
+                self.add_function(scope, op)
+        self.bodies.append(Body.build(scope, func_def.func_body.ops))
+
+    def nonlocal_reads(self) -> Dict[Key, Set[Key]]:
+        """
+        The variables of other scopes that each function reads, directly or
+        through the functions it calls.
+        """
+        reads: Dict[Key, Set[Key]] = {}
+        callees: Dict[Key, Set[Key]] = {}
+        callers: Dict[Key, Set[Key]] = {key: set() for key in self.functions}
+        for body in self.bodies:
+            owner = body.scope.owner
+            if not isinstance(owner, FuncDef):
+                continue
+            key = body.scope.parent.resolve(owner.func_name.data)  # type: ignore
+            reads[key] = set()
+            callees[key] = set()
+            for uses in body.uses.values():
+                reads[key].update(k for k in uses.reads if k[0] is not owner)
+                callees[key].update(k for k in uses.calls if k in self.functions)
+            for callee in callees[key]:
+                callers[callee].add(key)
+
+        worklist = list(self.functions)
+        while worklist:
+            key = worklist.pop()
+            owner = self.functions[key]
+            size = len(reads[key])
+            for callee in callees[key]:
+                reads[key].update(k for k in reads[callee] if k[0] is not owner)
+            if len(reads[key]) != size:
+                worklist.extend(callers[key])
+        return reads
+
+    def check(self):
+        """Raise a `DeadCodeError` for the first kind of dead code found."""
+        reachable = [body.cfg.reachable() for body in self.bodies]
+        for body, reached in zip(self.bodies, reachable):
+            for block in body.cfg.block_of.values():
+                if block not in reached:
+                    raise UnreachableStatementsError()
+
+        for body in self.bodies:
+            if any(uses.unreachable for uses in body.uses.values()):
+                raise UnreachableExpressionError()
+
+        for body in self.bodies:
+            for stmt in body.cfg.block_of:
+                if not isinstance(stmt, STATEMENTS) and not isinstance(stmt, CallExpr):
+                    raise UnusedExpressionError(stmt)
+
+        reads: Set[Key] = set()
+        calls: Set[Key] = set()
+        for body in self.bodies:
+            for uses in body.uses.values():
+                reads |= uses.reads
+                calls |= uses.calls
+        for key, func_def in self.functions.items():
+            if key not in calls:
+                raise UnusedFunctionError(func_def.func_name.data)  # type: ignore
+        for _, key in self.params:
+            if key not in reads:
+                raise UnusedArgumentError(key[1])
+        for _, key in self.var_defs:
+            if key not in reads:
+                raise UnusedVariableError(key[1])
+
+        nonlocal_reads = self.nonlocal_reads()
+        for body, reached in zip(self.bodies, reachable):
+            self.check_stores(body, reached, nonlocal_reads)
+
+    def check_stores(
+        self, body: Body, reached: Set[BasicBlock], nonlocal_reads: Dict[Key, Set[Key]]
+    ):
+        """Raise an `UnusedStoreError` for the first store that is never read."""
+        # Number the variables written in the body.
+        variables: Dict[Key, int] = {}
+        for uses in body.uses.values():
+            for _, key in uses.writes:
+                variables.setdefault(key, len(variables))
+
+        def bit_set(keys: Iterable[Key]) -> BitSet:
+            s = 0
+            for key in keys:
+                var = variables.get(key)
+                if var is not None:
+                    s |= 1 << var
+            return s
+
+        uses_defs: Dict[Operation, GenKill] = {}
+        for element, uses in body.uses.items():
+            read = set(uses.reads)
+            for callee in uses.calls:
+                read |= nonlocal_reads.get(callee, set())
+            uses_defs[element] = (bit_set(read), bit_set(k for _, k in uses.writes))
+
+        # The variables of other scopes may be read after a function returns.
+        owner = body.scope.owner
+        live_at_exit = bit_set(key for key in variables if key[0] is not owner)
+        if not isinstance(owner, FuncDef):
+            live_at_exit = 0
+        live = LiveVariables(body.cfg, uses_defs.__getitem__, live_at_exit)
+
+        unused: Set[Operation] = set()
+        for block in body.cfg.blocks:
+            if block not in reached:
+                continue
+            for element, _, after in live.elements(block):
+                for op, key in body.uses[element].writes:
+                    if isinstance(op, Assign) and not after & (1 << variables[key]):
+                        unused.add(op)
+        if unused:
+            first = next(op for op in body.cfg.block_of if op in unused)
+            raise UnusedStoreError(first)
+
+
+# The operations that are statements. Any other operation in a statement
+# list is an expression.
+STATEMENTS = (
+    Assign,
+    If,
+    While,
+    For,
+    Pass,
+    Return,
+    GlobalDecl,
+    NonLocalDecl,
+    VarDef,
+    FuncDef,
+)
+
+
 def warn_dead_code(_: MLContext, module: ModuleOp):
     program = module.ops.first
     assert isinstance(program, Program)
 
-    # TODO: check for dead code in `program`, and raise the corresponding exception
-    # if some dead code was found.
+    DeadCodeChecker(program).check()
 
 
 class WarnDeadCode(ModulePass):
@@ -7,7 +7,6 @@ from dataclasses import dataclass
 from xdsl.context import MLContext
 from xdsl.dialects.builtin import ModuleOp
 from xdsl.ir import Operation
-from xdsl.passes import ModulePass
 from xdsl.pattern_rewriter import (
     GreedyRewritePatternApplier,
     PatternRewriter,
@@ -15,6 +14,7 @@ from xdsl.pattern_rewriter import (
     RewritePattern,
 )
 
+from choco.incremental_verification import RewritingPass
 import riscv.dialect as riscv
 import riscv.ssa_dialect as riscvssa
 
@@ -32,16 +32,19 @@ class FunctionPattern(RewritePattern):
         rewriter.erase_op(op)
 
 
-class RISCVFunctionLowering(ModulePass):
+class RISCVFunctionLowering(RewritingPass):
     name = "riscv-function-lowering"
 
     def apply(self, ctx: MLContext, mod: ModuleOp):
+        listener = self.listener
         walker = PatternRewriteWalker(
             GreedyRewritePatternApplier([FunctionPattern()]),
             apply_recursively=True,
             walk_reverse=True,
+            listener=listener,
         )
         walker.rewrite_module(mod)
         jump = riscv.JALOp(riscv.RegisterAttr.from_name("ra"), "_main")
         top_block = mod.regions[0].blocks[0]
         top_block.insert_op_before(jump, top_block.first_op)
+        listener.handle_operation_insertion(jump)
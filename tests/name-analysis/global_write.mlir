@@ -1,4 +1,5 @@
 // RUN: choco-opt -p name-analysis "%s" | filecheck "%s"
+// RUN: choco-opt -p semantic-analysis "%s" | filecheck "%s"
 
 //
 // x: int = 0
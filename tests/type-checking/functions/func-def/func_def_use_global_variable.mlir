@@ -1,4 +1,5 @@
 // RUN: choco-opt -p check-assign-target,name-analysis,type-checking "%s" | filecheck "%s"
+// RUN: choco-opt -p semantic-analysis "%s" | filecheck "%s"
 
 //
 // x: int = 0
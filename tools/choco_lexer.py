@@ -1,16 +1,50 @@
 #!/usr/bin/env python3
 
 import argparse
+import time
 
-from choco.lexer import Lexer, TokenKind
+from choco.lexer import Lexer, TokenKind, scanners, tokenizers
 
 
 def __main__():
     parser = argparse.ArgumentParser(description="A ChocoPy lexer")
     parser.add_argument("file", type=argparse.FileType("r"))
+    parser.add_argument(
+        "--scanner",
+        choices=list(scanners),
+        default="char",
+        help="how the input is read: one character at a time, or in large blocks",
+    )
+    parser.add_argument(
+        "--tokenizer",
+        choices=tokenizers,
+        default="char",
+        help="the tokenizer engine: character-by-character, or a compiled regex "
+        "over the whole input (ignores --scanner)",
+    )
+    parser.add_argument(
+        "--benchmark",
+        default=False,
+        action="store_true",
+        help="lex the whole input without printing tokens and report tokens/sec",
+    )
     args = parser.parse_args()
 
-    lexer = Lexer(args.file)
+    lexer = Lexer(args.file, scanner=args.scanner, tokenizer=args.tokenizer)
+
+    if args.benchmark:
+        num_tokens = 0
+        start = time.perf_counter()
+        while lexer.consume().kind != TokenKind.EOF:
+            num_tokens += 1
+        elapsed = time.perf_counter() - start
+        print(f"scanner: {args.scanner}")
+        print(f"tokenizer: {args.tokenizer}")
+        print(f"tokens: {num_tokens}")
+        print(f"time: {elapsed:.3f} s")
+        print(f"tokens/sec: {num_tokens / elapsed:.0f}")
+        return
+
     while True:
         token = lexer.consume()
         print(token)
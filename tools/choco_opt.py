@@ -1,23 +1,47 @@
 #!/usr/bin/env python3
 
+import argparse
+import os
 import sys
-from io import IOBase
-from typing import IO, TYPE_CHECKING, Callable, Mapping, Type
+from contextlib import redirect_stdout
+from io import IOBase, StringIO
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Type,
+)
 
 if TYPE_CHECKING:
     from xdsl.dialects.builtin import ModuleOp
-from xdsl.passes import ModulePass, ModulePassT, PipelinePass
-from xdsl.printer import Printer
-from xdsl.utils.parse_pipeline import PipelinePassSpec
-from xdsl.xdsl_opt_main import xDSLOptMain
+    from xdsl.ir import Dialect
+    from xdsl.passes import ModulePass, ModulePassT
+    from xdsl.utils.parse_pipeline import PassArgElementType, PipelinePassSpec
 
+# The driver defines the arguments of xDSL, so it is the only module of xDSL
+# imported before the arguments are parsed. It imports the core of xDSL.
+from xdsl.xdsl_opt_main import xDSLOptMain
 
-from choco.warn_dead_code import DeadCodeError, WarnDeadCode
-from choco.lexer import Lexer as ChocoLexer
-from choco.parser import Parser as ChocoParser
-from choco.parser import SyntaxError
+# Only the modules needed to parse the arguments are imported here. The
+# passes, the ChocoPy frontend and the RISC-V printer are imported when they
+# are used, as Python startup dominates the time of small compilations. The
+# choices of --scanner and --tokenizer are spelled out for the same reason,
+# and the lexer rejects the ones it does not know.
+from choco.dead_code_error import DeadCodeError
 from choco.semantic_error import SemanticError
-from riscv.printer import print_program
+from tools.choco_opt_client import default_socket_path
+
+if TYPE_CHECKING:
+    from choco.incremental_parser import IncrementalParser
+    from tools.choco_opt_cache import CompilationCache
+
+# The number of input files whose incremental parser a compile server keeps.
+MAX_INCREMENTAL_PARSERS = 64
 
 
 def get_builtin():
@@ -74,6 +98,18 @@ def get_warn_dead_code():
     return WarnDeadCode
 
 
+def get_print_reaching_definitions():
+    from choco.print_reaching_definitions import PrintReachingDefinitions
+
+    return PrintReachingDefinitions
+
+
+def get_semantic_analysis():
+    from choco.semantic_analysis import SemanticAnalysis
+
+    return SemanticAnalysis
+
+
 def get_choco_ast_to_choco_flat():
     from choco.choco_ast_to_choco_flat import ChocoASTToChocoFlat
 
@@ -123,12 +159,22 @@ def get_riscv_function_lowering():
 
 
 class ChocoOptMain(xDSLOptMain):
-    passes_native: dict[str, Callable[[], type[ModulePass]]] = {
+    dialects_native: dict[str, Callable[[], "Dialect"]] = {
+        "builtin": get_builtin,
+        "riscv": get_riscv,
+        "riscv_ssa": get_riscv_ssa,
+        "choco_ast": get_choco_ast,
+        "choco_ir": get_choco_flat,
+    }
+
+    passes_native: "dict[str, Callable[[], type[ModulePass]]]" = {
         # Semantic Analysis
         "check-assign-target": get_check_assign_target,
         "name-analysis": get_name_analysis,
         "type-checking": get_type_checking,
         "warn-dead-code": get_warn_dead_code,
+        "print-reaching-definitions": get_print_reaching_definitions,
+        "semantic-analysis": get_semantic_analysis,
         # IR Generation
         "choco-ast-to-choco-flat": get_choco_ast_to_choco_flat,
         # IR Optimization
@@ -142,27 +188,226 @@ class ChocoOptMain(xDSLOptMain):
         "riscv-function-lowering": get_riscv_function_lowering,
     }
 
+    # The passes that are not part of the pipelines of `-p all` and of the `-p`
+    # shortcuts: semantic-analysis is an alternative to the separate semantic
+    # passes, and print-reaching-definitions only prints an analysis.
+    pipeline_excluded_passes = frozenset(
+        ["semantic-analysis", "print-reaching-definitions"]
+    )
+
+    # The passes that only change the IR through pattern rewriters that report
+    # their changes, or that do not change it at all. Only the operations they
+    # change are verified after them, unless --full-verify is given.
+    incrementally_verified_passes = frozenset(
+        [
+            "check-assign-target",
+            "name-analysis",
+            "warn-dead-code",
+            "print-reaching-definitions",
+            "choco-flat-introduce-library-calls",
+            "choco-flat-constant-folding",
+            "choco-flat-dead-code-elimination",
+            "for-to-while",
+            "choco-flat-to-riscv-ssa",
+            "riscv-function-lowering",
+        ]
+    )
+
+    # The arguments that do not change the output of a compilation, and so are
+    # not part of the key of the compilation cache. The pipeline set up from
+    # `passes` is part of the key instead.
+    cache_independent_arguments = frozenset(
+        [
+            "input_file",
+            "output_file",
+            "passes",
+            "scanner",
+            "tokenizer",
+            "parse_jobs",
+            "type_check_jobs",
+            "semantic_cache",
+            "full_verify",
+            "serve",
+            "serve_jobs",
+            "batch",
+            "batch_jobs",
+            "batch_suffix",
+            "cache",
+            "cache_size",
+            "cache_stats",
+            "pass_statistics",
+            "pass_statistics_format",
+            "pass_statistics_file",
+        ]
+    )
+
+    def __init__(
+        self,
+        args: Optional[Sequence[str]] = None,
+        incremental_parsers: "Optional[Dict[str, IncrementalParser]]" = None,
+    ):
+        """
+        :param incremental_parsers: The incremental parsers of the input files,
+                                    by absolute path, which the compile server
+                                    keeps between compilations. The input file
+                                    is parsed again by its parser, reusing the
+                                    unchanged top-level items.
+        """
+        self.incremental_parsers = incremental_parsers
+        super().__init__(args=args)
+
     def register_all_passes(self):
         for name, pass_ in self.passes_native.items():
             self.register_pass(name, pass_)
 
+    def register_all_arguments(self, arg_parser: argparse.ArgumentParser):
+        super().register_all_arguments(arg_parser)
+        arg_parser.add_argument(
+            "--scanner",
+            choices=["char", "block"],
+            default="char",
+            help="how the ChocoPy lexer reads its input",
+        )
+        arg_parser.add_argument(
+            "--tokenizer",
+            choices=["char", "regex"],
+            default="char",
+            help="the tokenizer engine of the ChocoPy lexer",
+        )
+        arg_parser.add_argument(
+            "--parse-jobs",
+            type=int,
+            default=1,
+            help="parse the top-level definitions in parallel with this many "
+            "processes (default: 1, off). The main process rebuilds every "
+            "operation the workers parse, so this is slower than a sequential "
+            "parse on 1 core, barely faster on 2, and about twice as fast on 4 "
+            "idle cores",
+        )
+        arg_parser.add_argument(
+            "--type-check-jobs",
+            type=int,
+            default=1,
+            help="type-check the function bodies in parallel with this many "
+            "processes",
+        )
+        arg_parser.add_argument(
+            "--semantic-cache",
+            action="store_true",
+            help="reuse the semantic analysis of unchanged functions, cached "
+            "per input file in the user cache directory; the functions that "
+            "changed are type-checked sequentially, so this cannot be combined "
+            "with --type-check-jobs",
+        )
+        arg_parser.add_argument(
+            "--full-verify",
+            action="store_true",
+            help="verify the whole module after every pass, instead of only the "
+            "operations the pass changed",
+        )
+        arg_parser.add_argument(
+            "--serve",
+            nargs="?",
+            const=default_socket_path(),
+            metavar="SOCKET",
+            help="run a compile server on this Unix socket, for choco-opt-client",
+        )
+        arg_parser.add_argument(
+            "--serve-jobs",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="the number of compilations the server runs concurrently",
+        )
+        arg_parser.add_argument(
+            "--batch",
+            nargs="+",
+            metavar="INPUT",
+            help="compile each of these files, or of the files listed one per "
+            "line in a manifest given as @MANIFEST, next to the file",
+        )
+        arg_parser.add_argument(
+            "--batch-jobs",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="the number of files compiled concurrently in batch mode",
+        )
+        arg_parser.add_argument(
+            "--batch-suffix",
+            help="the suffix that replaces the extension of each input file to "
+            "name its output file in batch mode, by default .s for the riscv "
+            "target and the name of the target otherwise",
+        )
+        arg_parser.add_argument(
+            "--cache",
+            nargs="?",
+            const="",
+            metavar="DIR",
+            help="reuse the output of earlier compilations of the same source with "
+            "the same options, cached in this directory, by default "
+            "~/.cache/choco-opt",
+        )
+        arg_parser.add_argument(
+            "--cache-size",
+            type=int,
+            help="the size of the compilation cache in MB, above which the least "
+            "recently used outputs are evicted, by default 256",
+        )
+        arg_parser.add_argument(
+            "--cache-stats",
+            action="store_true",
+            help="print the statistics of the compilation cache and exit",
+        )
+        arg_parser.add_argument(
+            "--pass-statistics",
+            action="store_true",
+            help="print the time, the memory and the operations of each pass to "
+            "stderr",
+        )
+        arg_parser.add_argument(
+            "--pass-statistics-format",
+            choices=["table", "json"],
+            default="table",
+            help="the format of the pass statistics",
+        )
+        arg_parser.add_argument(
+            "--pass-statistics-file",
+            help="write the pass statistics to this file instead of stderr",
+        )
+
     def _output_risc(self, prog: "ModuleOp", output: IOBase):
+        from riscv.printer import print_program
+
         print_program(prog.ops, "riscv", stream=output)  # type: ignore
 
     def register_all_targets(self):
         super().register_all_targets()
-        self.available_targets["riscv"] = lambda prog, output: print_program(
-            prog.ops, "riscv", stream=output  # type: ignore
-        )
+        self.available_targets["riscv"] = self._output_risc
 
     def pipeline_entry(
-        self, k: str, entries: Mapping[str, Callable[[], Type[ModulePassT]]]
+        self, k: str, entries: "Mapping[str, Callable[[], Type[ModulePassT]]]"
     ):
         """Helper function that returns a pass"""
         if k in entries.keys():
             return entries[k]().name
 
     def setup_pipeline(self):
+        if self.args.semantic_cache and self.args.type_check_jobs > 1:  # type: ignore
+            # semantic-analysis replaces type-checking, and has no jobs.
+            sys.exit(
+                "choco-opt: --semantic-cache cannot be used with --type-check-jobs"
+            )
+        self.setup_choco_pipeline()
+        if self.args.pass_statistics:  # type: ignore
+            from tools.choco_opt_statistics import MeasuredPipelinePass
+
+            self.pipeline = MeasuredPipelinePass(
+                self.pipeline.passes, self.pipeline.callback
+            )
+
+    def setup_choco_pipeline(self):
+        from xdsl.passes import PipelinePass
+        from xdsl.utils.parse_pipeline import PipelinePassSpec
+
         entries = {
             "type": get_type_checking,
             "warn": get_warn_dead_code,
@@ -174,7 +419,11 @@ class ChocoOptMain(xDSLOptMain):
 
         if self.args.passes != "all":
             if self.args.passes in entries:
-                pipeline = list(self.available_passes.keys())
+                pipeline = [
+                    p
+                    for p in self.available_passes
+                    if p not in self.pipeline_excluded_passes
+                ]
                 entry = self.pipeline_entry(self.args.passes, entries)
                 if entry is None:
                     raise Exception(
@@ -188,58 +437,234 @@ class ChocoOptMain(xDSLOptMain):
                     for p in pipeline[: pipeline.index(entry) + 1]
                 ]
             else:
-                super().setup_pipeline()
-                return
+                from xdsl.utils.parse_pipeline import parse_pipeline
+
+                pipeline = list(parse_pipeline(self.args.passes))
 
         else:
             pipeline = [
                 PipelinePassSpec(p, dict())
                 for p in self.available_passes
-                if p != "warn-dead-code"
+                if p != "warn-dead-code" and p not in self.pipeline_excluded_passes
             ]
 
         def callback(
-            previous_pass: ModulePass, module: "ModuleOp", next_pass: ModulePass
+            previous_pass: "ModulePass", module: "ModuleOp", next_pass: "ModulePass"
         ) -> None:
             if not self.args.disable_verify:
-                module.verify()
+                if (
+                    self.args.full_verify  # type: ignore
+                    or previous_pass.name not in self.incrementally_verified_passes
+                ):
+                    module.verify()
+                else:
+                    change_tracker.verify(module)
+            change_tracker.changed.clear()
             if self.args.print_between_passes:
+                from xdsl.printer import Printer
+
                 print(f"IR after {previous_pass.name}:")
                 printer = Printer(stream=sys.stdout)
                 printer.print_op(module)
                 print("\n\n\n")
 
-        self.pipeline = PipelinePass(
-            tuple(self.available_passes[p.name]().from_pass_spec(p) for p in pipeline),
-            callback,
-        )
+        if self.args.type_check_jobs > 1:  # type: ignore
+            if all(p.name != "type-checking" for p in pipeline):
+                sys.exit("choco-opt: --type-check-jobs needs the type-checking pass")
+            jobs = self.args.type_check_jobs  # type: ignore
+            pipeline = [
+                (
+                    PipelinePassSpec(p.name, {**p.args, "jobs": [jobs]})
+                    if p.name == "type-checking"
+                    else p
+                )
+                for p in pipeline
+            ]
+
+        if self.args.semantic_cache and self.args.input_file:  # type: ignore
+            from choco.semantic_cache import cache_path
+            from tools.choco_opt_cache import default_cache_dir
+
+            directory = os.path.join(default_cache_dir(), "semantic")
+            cached = self.with_semantic_cache(
+                pipeline, cache_path(self.args.input_file, directory)  # type: ignore
+            )
+            if cached is pipeline:
+                sys.exit(
+                    "choco-opt: --semantic-cache needs a pipeline that starts with "
+                    "check-assign-target,name-analysis,type-checking"
+                )
+            pipeline = cached
+
+        from choco.incremental_verification import ChangeTracker, RewritingPass
+
+        # The passes report their changes to the tracker of this pipeline.
+        change_tracker = ChangeTracker()
+        listener = change_tracker.listener()
+        passes: List["ModulePass"] = []
+        for pass_type, spec in PipelinePass.build_pipeline_tuples(
+            self.available_passes, pipeline
+        ):
+            module_pass = pass_type.from_pass_spec(spec)
+            if isinstance(module_pass, RewritingPass):
+                module_pass = module_pass.with_listener(listener)
+            passes.append(module_pass)
+        self.pipeline = PipelinePass(tuple(passes), callback)
+
+    def apply_passes(self, prog: "ModuleOp") -> bool:
+        applied = super().apply_passes(prog)
+        if self.args.pass_statistics:  # type: ignore
+            self.report_pass_statistics()
+        return applied
+
+    def report_pass_statistics(self):
+        from tools.choco_opt_statistics import formats
+
+        print_statistics = formats[self.args.pass_statistics_format]  # type: ignore
+        statistics = self.pipeline.statistics  # type: ignore
+        if self.args.pass_statistics_file is None:  # type: ignore
+            print_statistics(statistics, sys.stderr)
+        else:
+            with open(self.args.pass_statistics_file, "w") as f:  # type: ignore
+                print_statistics(statistics, f)
+
+    def open_compilation_cache(self) -> "CompilationCache":
+        from tools.choco_opt_cache import CompilationCache, default_cache_dir
+
+        cache = CompilationCache(self.args.cache or default_cache_dir())  # type: ignore
+        if self.args.cache_size is not None:  # type: ignore
+            cache.max_size = self.args.cache_size << 20  # type: ignore
+        return cache
+
+    def compilation_cache(self) -> Optional["CompilationCache"]:
+        """
+        The compilation cache, unless it is disabled or the output of the
+        compilation would interleave with other output.
+        """
+        if (
+            self.args.cache is None  # type: ignore
+            or self.args.split_input_file
+            or self.args.print_between_passes
+            or self.args.pass_statistics  # type: ignore
+        ):
+            return None
+        return self.open_compilation_cache()
+
+    def cache_key(self, source: str, file_extension: str) -> str:
+        """The key of the output of compiling `source` in the compilation cache."""
+        from tools.choco_opt_cache import cache_key
+
+        pipeline = [str(p.pipeline_pass_spec()) for p in self.pipeline.passes]
+        options = {
+            name: value
+            for name, value in vars(self.args).items()
+            if name not in self.cache_independent_arguments
+        }
+        return cache_key(source, file_extension, pipeline, self.args.target, options)
+
+    def with_semantic_cache(
+        self, pipeline: List["PipelinePassSpec"], path: str
+    ) -> List["PipelinePassSpec"]:
+        """
+        Replace the separate semantic passes at the start of a pipeline by
+        semantic-analysis with the cache at the given path
+        """
+        from xdsl.utils.parse_pipeline import PipelinePassSpec
+
+        semantic = ["check-assign-target", "name-analysis", "type-checking"]
+        if [p.name for p in pipeline[: len(semantic)]] != semantic:
+            return pipeline
+        rest = pipeline[len(semantic) :]
+        args: Dict[str, List["PassArgElementType"]] = {"cache": [path]}
+        if rest and rest[0].name == "warn-dead-code":
+            args["warn_dead_code"] = [True]
+            rest = rest[1:]
+        return [PipelinePassSpec("semantic-analysis", args)] + rest
 
     def register_all_dialects(self):
         """Register all dialects that can be used."""
-        self.ctx.register_dialect("builtin", get_builtin)
-        self.ctx.register_dialect("riscv", get_riscv)
-        self.ctx.register_dialect("riscv_ssa", get_riscv_ssa)
-        self.ctx.register_dialect("choco_ast", get_choco_ast)
-        self.ctx.register_dialect("choco_ir", get_choco_flat)
+        for name, dialect in self.dialects_native.items():
+            self.ctx.register_dialect(name, dialect)
 
     def register_all_frontends(self):
         super().register_all_frontends()
 
         def parse_choco(f: IO[str]):
-            lexer = ChocoLexer(f)  # type: ignore
+            from choco.lexer import Lexer as ChocoLexer
+            from choco.parser import Parser as ChocoParser
+
+            if self.args.parse_jobs > 1:  # type: ignore
+                from choco.parallel_parser import parse_program_parallel
+
+                return parse_program_parallel(
+                    f.read(),
+                    self.args.parse_jobs,  # type: ignore
+                    scanner=self.args.scanner,  # type: ignore
+                    tokenizer=self.args.tokenizer,  # type: ignore
+                )
+            if (
+                self.incremental_parsers is not None
+                and self.args.input_file
+                and not self.args.split_input_file
+            ):
+                return self.parse_incrementally(f)
+            lexer = ChocoLexer(
+                f, scanner=self.args.scanner, tokenizer=self.args.tokenizer  # type: ignore
+            )
             parser = ChocoParser(lexer)
             program = parser.parse_program()
             return program
 
         self.available_frontends["choc"] = parse_choco
 
-
-def __main__():
-    choco_main = ChocoOptMain()
-
+    def parse_incrementally(self, f: IO[str]) -> "ModuleOp":
+        """Parse the input file with its incremental parser."""
+        from choco.incremental_parser import IncrementalParser
+
+        parsers = self.incremental_parsers
+        assert parsers is not None
+        path = os.path.abspath(self.args.input_file)
+        # The most recently used parsers are last.
+        parser = parsers.pop(path, None)
+        if parser is None or (parser.scanner, parser.tokenizer) != (
+            self.args.scanner,  # type: ignore
+            self.args.tokenizer,  # type: ignore
+        ):
+            parser = IncrementalParser(
+                self.args.scanner, self.args.tokenizer  # type: ignore
+            )
+        parsers[path] = parser
+        while len(parsers) > MAX_INCREMENTAL_PARSERS:
+            del parsers[next(iter(parsers))]
+        # The passes modify the module, and the parser reuses its operations.
+        return parser.parse_program(f.read()).clone()
+
+
+def preload():
+    """
+    Import everything a compilation may need, so that processes forked
+    afterwards compile without importing anything.
+    """
+    for get_dialect in ChocoOptMain.dialects_native.values():
+        get_dialect()
+    for get_pass in ChocoOptMain.passes_native.values():
+        get_pass()
+    import choco.incremental_parser
+    import choco.lexer
+    import choco.parallel_parser
+    import choco.parser
+    import riscv.printer
+
+
+def compile_input(choco_main: ChocoOptMain):
+    """Compile the input file of `choco_main` to its output file."""
+    cache = choco_main.compilation_cache()
+    if cache is not None:
+        compile_input_cached(choco_main, cache)
+        return
+    chunks, file_extension = choco_main.prepare_input()
+    output_stream = choco_main.prepare_output()
     try:
-        chunks, file_extension = choco_main.prepare_input()
-        output_stream = choco_main.prepare_output()
         for i, (chunk, offset) in enumerate(chunks):
             try:
                 if i > 0:
@@ -251,14 +676,93 @@ def __main__():
                 output_stream.flush()
             finally:
                 chunk.close()
-    except SyntaxError as e:
-        print(e.get_message())
-        exit(0)
-    except SemanticError as e:
-        print("Semantic error: %s" % str(e))
-        exit(0)
-    except DeadCodeError as e:
-        print(f"[Warning] Dead code found: {e}")
+    finally:
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+
+def compile_input_cached(choco_main: ChocoOptMain, cache: "CompilationCache"):
+    """
+    Compile the input file of `choco_main` to its output file, or emit the
+    output cached for the same source and options.
+    """
+    f, file_extension = choco_main.get_input_stream()
+    with f:
+        source = f.read()
+    if choco_main.args.frontend:
+        file_extension = choco_main.args.frontend
+    if file_extension not in choco_main.available_frontends:
+        raise Exception(f"Unrecognized file extension '{file_extension}'")
+
+    key = choco_main.cache_key(source, file_extension)
+    output_stream = choco_main.prepare_output()
+    try:
+        output = cache.lookup(key)
+        if output is None:
+            # Only the outputs of compilations that succeeded without printing
+            # anything are cached, as the printed messages would be lost.
+            printed = StringIO()
+            succeeded = False
+            try:
+                with redirect_stdout(printed):
+                    module = choco_main.parse_chunk(StringIO(source), file_extension)
+                    if module is not None and choco_main.apply_passes(module):
+                        output = choco_main.output_resulting_program(module)
+                        succeeded = True
+            finally:
+                sys.stdout.write(printed.getvalue())
+            if not succeeded:
+                return
+            if not printed.getvalue():
+                cache.store(key, output)
+        output_stream.write(output)
+        output_stream.flush()
+    finally:
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+
+def compilation_error_message(e: Exception) -> Optional[str]:
+    """The message printed for `e`, if it is an error in the input program."""
+    # Imported once the arguments are parsed, so that `--help` does not load the
+    # parser.
+    from choco.parser import SyntaxError
+
+    if isinstance(e, SyntaxError):
+        return e.get_message()
+    if isinstance(e, SemanticError):
+        return "Semantic error: %s" % str(e)
+    if isinstance(e, DeadCodeError):
+        return f"[Warning] Dead code found: {e}"
+    return None
+
+
+def __main__(
+    args: Optional[Sequence[str]] = None,
+    incremental_parsers: "Optional[Dict[str, IncrementalParser]]" = None,
+):
+    choco_main = ChocoOptMain(args, incremental_parsers)
+    if choco_main.args.serve is not None:  # type: ignore
+        from tools.choco_opt_server import serve
+
+        serve(choco_main.args.serve, choco_main.args.serve_jobs)  # type: ignore
+        return
+    if choco_main.args.cache_stats:  # type: ignore
+        from tools.choco_opt_cache import print_statistics
+
+        print_statistics(choco_main.open_compilation_cache())
+        return
+    if choco_main.args.batch is not None:  # type: ignore
+        from tools.choco_opt_batch import run_batch
+
+        sys.exit(run_batch(choco_main, sys.argv[1:] if args is None else list(args)))
+    try:
+        compile_input(choco_main)
+    except Exception as e:
+        message = compilation_error_message(e)
+        if message is None:
+            raise
+        print(message)
         exit(0)
 
 
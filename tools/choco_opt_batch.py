@@ -0,0 +1,194 @@
+"""
+The batch mode of choco-opt, `choco-opt --batch INPUT...`, which compiles many
+files with the same options.
+
+Each input file is compiled as `choco-opt INPUT -o OUTPUT` would compile it,
+where OUTPUT is the input file with its extension replaced by the suffix of the
+target, so that the outputs are the same as those of serial compilations. The
+files are compiled in a pool of processes, each of which initializes choco-opt
+once and reuses it for all the files it compiles.
+
+An input given as @MANIFEST is a file that lists the input files, one per line.
+Blank lines and lines starting with # are skipped, and relative paths are
+resolved from the directory of the manifest.
+"""
+
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from io import StringIO
+from typing import Iterator, List, Optional, Sequence
+
+from tools.choco_opt import (
+    ChocoOptMain,
+    compilation_error_message,
+    compile_input,
+    preload,
+)
+
+# The suffixes of the output files of the targets that are not named after
+# their file extension.
+target_suffixes = {"riscv": ".s"}
+
+
+@dataclass
+class FileStatus:
+    """The result of the compilation of one input file."""
+
+    input_file: str
+    output_file: str
+    # "ok", "error" if the input is not a valid program, or "crash".
+    status: str
+    # What the compilation printed, such as the error message.
+    message: str
+
+
+def read_manifest(path: str) -> List[str]:
+    directory = os.path.dirname(path)
+    with open(path) as f:
+        lines = [line.strip() for line in f]
+    return [
+        os.path.join(directory, line)
+        for line in lines
+        if line and not line.startswith("#")
+    ]
+
+
+def batch_inputs(inputs: Sequence[str]) -> List[str]:
+    """The input files, with the manifests expanded and duplicates removed."""
+    files: List[str] = []
+    for input in inputs:
+        if input.startswith("@"):
+            files.extend(read_manifest(input[1:]))
+        else:
+            files.append(input)
+    # Each file is compiled once, as concurrent compilations of the same file
+    # would write to the same output file.
+    return list(dict.fromkeys(files))
+
+
+def output_path(input_file: str, suffix: str) -> str:
+    return os.path.splitext(input_file)[0] + suffix
+
+
+def compile_file(
+    choco_main: ChocoOptMain,
+    input_file: str,
+    suffix: str,
+    output_file: Optional[str] = None,
+) -> FileStatus:
+    """
+    Compile `input_file` to `output_file`, which is by default the input file
+    with its extension replaced by `suffix`.
+    """
+    if output_file is None:
+        output_file = output_path(input_file, suffix)
+    if os.path.abspath(output_file) == os.path.abspath(input_file):
+        return FileStatus(
+            input_file,
+            output_file,
+            "error",
+            "the output file would overwrite the input file\n",
+        )
+
+    choco_main.args.input_file = input_file
+    choco_main.args.output_file = output_file
+    # The pipeline depends on the input file when the semantic cache is used,
+    # and is set up again so that no state is kept between the files.
+    choco_main.setup_pipeline()
+
+    output = StringIO()
+    status = "ok"
+    with redirect_stdout(output), redirect_stderr(output):
+        try:
+            compile_input(choco_main)
+        except Exception as e:
+            message = compilation_error_message(e)
+            if message is None:
+                traceback.print_exc()
+                status = "crash"
+            else:
+                print(message)
+                status = "error"
+    return FileStatus(input_file, output_file, status, output.getvalue())
+
+
+# The choco-opt of a worker process, initialized by `init_worker`.
+worker_main: Optional[ChocoOptMain] = None
+
+
+def init_worker(argv: List[str]):
+    global worker_main
+    worker_main = ChocoOptMain(args=argv)
+
+
+def compile_in_worker(input_file: str, suffix: str) -> FileStatus:
+    assert worker_main is not None
+    return compile_file(worker_main, input_file, suffix)
+
+
+def compile_files(
+    choco_main: ChocoOptMain,
+    argv: List[str],
+    files: List[str],
+    suffix: str,
+    jobs: int,
+) -> Iterator[FileStatus]:
+    """Compile the files with `jobs` processes, yielding each result in order."""
+    if jobs <= 1 or len(files) <= 1:
+        for input_file in files:
+            yield compile_file(choco_main, input_file, suffix)
+        return
+
+    # The workers are forked after the imports, so that they do not import
+    # anything themselves.
+    preload()
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(files)),
+        initializer=init_worker,
+        initargs=(argv,),
+    ) as executor:
+        yield from executor.map(compile_in_worker, files, [suffix] * len(files))
+
+
+def print_status(result: FileStatus):
+    if result.status == "ok":
+        print(f"ok     {result.input_file} -> {result.output_file}")
+    else:
+        print(f"{result.status:<6} {result.input_file}")
+    for line in result.message.splitlines():
+        print(f"  {line}")
+
+
+def run_batch(choco_main: ChocoOptMain, argv: List[str]) -> int:
+    """
+    Compile the input files of `choco-opt --batch`, and print the status of
+    each file and a summary.
+
+    :param argv: The arguments of choco-opt, used to set up the workers.
+    :returns: The exit code, which is 1 if a file could not be compiled.
+    """
+    args = choco_main.args
+    if args.input_file is not None:
+        sys.exit("choco-opt: the input files of --batch are given after it")
+    if args.output_file is not None:
+        sys.exit("choco-opt: the output files of --batch are named after the inputs")
+    suffix = args.batch_suffix  # type: ignore
+    if suffix is None:
+        suffix = target_suffixes.get(args.target, "." + args.target)
+
+    files = batch_inputs(args.batch)  # type: ignore
+    failed = 0
+    for result in compile_files(
+        choco_main, argv, files, suffix, args.batch_jobs  # type: ignore
+    ):
+        print_status(result)
+        sys.stdout.flush()
+        if result.status != "ok":
+            failed += 1
+
+    print(f"{len(files)} files: {len(files) - failed} ok, {failed} failed")
+    return 1 if failed else 0
@@ -0,0 +1,258 @@
+"""
+The compilation cache of `choco-opt --cache`.
+
+The output of each compilation is stored in a file named after the hash of
+everything the output depends on: the source, the pass pipeline, the target,
+the options that change the output, and the version of the compiler, which is
+a hash of its sources. A compilation whose key is in the cache emits the
+stored output without parsing the source or running any pass.
+
+Entries are written atomically, so that concurrent compilations never read a
+partially written entry. When the cache grows larger than its maximum size,
+the least recently used entries are evicted. The number of hits, misses and
+evictions is kept in the cache, and shown by `choco-opt --cache-stats`.
+
+Only the standard library is imported, so that the cache does not slow down
+the startup of choco-opt.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Bump when the keys or the entries change, so that caches written by an older
+# version are not used.
+CACHE_VERSION = 1
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The sources of the compiler, whose changes change the output of choco-opt.
+COMPILER_PACKAGES = ["choco", "riscv", "util"]
+COMPILER_MODULES = [os.path.join("tools", "choco_opt.py")]
+
+DEFAULT_MAX_SIZE_MB = 256
+
+STATISTICS = ["hits", "misses", "evictions"]
+
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "choco-opt")
+
+
+def compiler_sources() -> List[str]:
+    """The paths of the sources of the compiler, relative to the repository."""
+    paths = list(COMPILER_MODULES)
+    for package in COMPILER_PACKAGES:
+        for directory, subdirectories, files in os.walk(os.path.join(ROOT, package)):
+            subdirectories[:] = sorted(d for d in subdirectories if d != "__pycache__")
+            paths.extend(
+                os.path.relpath(os.path.join(directory, name), ROOT)
+                for name in sorted(files)
+                if name.endswith(".py")
+            )
+    return paths
+
+
+# The version of the compiler, computed once per process.
+_compiler_version: Optional[str] = None
+
+
+def compiler_version() -> str:
+    """A hash of the sources of the compiler and of the version of xDSL."""
+    global _compiler_version
+    if _compiler_version is None:
+        import xdsl
+
+        digest = hashlib.sha256(str(xdsl.__version__).encode())
+        for path in compiler_sources():
+            digest.update(b"\0" + path.encode() + b"\0")
+            with open(os.path.join(ROOT, path), "rb") as f:
+                digest.update(f.read())
+        _compiler_version = digest.hexdigest()
+    return _compiler_version
+
+
+def cache_key(
+    source: str,
+    frontend: str,
+    pipeline: List[str],
+    target: str,
+    options: Dict[str, Any],
+) -> str:
+    """
+    The key of the output of compiling `source`, parsed by the frontend of the
+    given file extension, with the given pipeline, target and options.
+    """
+    description = [
+        CACHE_VERSION,
+        compiler_version(),
+        frontend,
+        pipeline,
+        target,
+        options,
+        source,
+    ]
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class CompilationCache:
+    """The outputs of earlier compilations, in the directory `directory`."""
+
+    directory: str
+    # The size of the entries above which the least recently used are evicted,
+    # in bytes.
+    max_size: int = DEFAULT_MAX_SIZE_MB << 20
+
+    @property
+    def entries_directory(self) -> str:
+        return os.path.join(self.directory, "entries")
+
+    @property
+    def statistics_path(self) -> str:
+        return os.path.join(self.directory, "stats.json")
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.entries_directory, key[:2], key[2:])
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the lock of the statistics and of the eviction of entries."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """The output stored for `key`, if any, which is marked as recently used."""
+        path = self.entry_path(key)
+        try:
+            with open(path, encoding="utf-8", newline="") as f:
+                output = f.read()
+        except OSError:
+            self.record(misses=1)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Evicted meanwhile, which does not change what was read.
+            pass
+        self.record(hits=1)
+        return output
+
+    def store(self, key: str, output: str):
+        """
+        Write the entry of `key` atomically, and evict the least recently used
+        entries if the cache is now too large.
+        """
+        path = self.entry_path(key)
+        data = output.encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        except OSError:
+            # The cache only saves time, so skip it if it cannot be written.
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.record(size=len(data))
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """The modification time, size and path of each entry."""
+        entries: List[Tuple[float, int, str]] = []
+        try:
+            subdirectories = list(os.scandir(self.entries_directory))
+        except FileNotFoundError:
+            return entries
+        for subdirectory in subdirectories:
+            for entry in os.scandir(subdirectory.path):
+                if entry.name.startswith("."):
+                    # Being written.
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def load_statistics(self) -> Dict[str, int]:
+        try:
+            with open(self.statistics_path) as f:
+                statistics = json.load(f)
+        except (OSError, ValueError):
+            statistics = {}
+        return {name: int(statistics.get(name, 0)) for name in STATISTICS + ["size"]}
+
+    def record(self, size: int = 0, **counts: int):
+        """
+        Add to the statistics of the cache, and to the estimated size of its
+        entries, which are evicted once the estimate exceeds the maximum size.
+        """
+        try:
+            with self.locked():
+                statistics = self.load_statistics()
+                for name, count in counts.items():
+                    statistics[name] += count
+                statistics["size"] += size
+                if statistics["size"] > self.max_size:
+                    evicted, statistics["size"] = self.evict()
+                    statistics["evictions"] += evicted
+                fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".stats-")
+                with os.fdopen(fd, "w") as f:
+                    json.dump(statistics, f)
+                os.replace(tmp, self.statistics_path)
+        except OSError:
+            pass
+
+    def evict(self) -> Tuple[int, int]:
+        """
+        Remove the least recently used entries until the cache fits in its
+        maximum size. Must be called with the lock held.
+
+        :returns: The number of evicted entries and the size of the rest.
+        """
+        entries = sorted(self.entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        evicted = 0
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+            evicted += 1
+        return evicted, size
+
+
+def print_statistics(cache: CompilationCache):
+    statistics = cache.load_statistics()
+    entries = cache.entries()
+    size = sum(entry_size for _, entry_size, _ in entries)
+    lookups = statistics["hits"] + statistics["misses"]
+    hit_rate = 100 * statistics["hits"] / lookups if lookups else 0
+    print(f"cache directory  {cache.directory}")
+    print(f"hits             {statistics['hits']}")
+    print(f"misses           {statistics['misses']}")
+    print(f"hit rate         {hit_rate:.1f}%")
+    print(f"evictions        {statistics['evictions']}")
+    print(f"entries          {len(entries)}")
+    print(f"size             {size / 2**20:.1f} MB of {cache.max_size / 2**20:.1f} MB")
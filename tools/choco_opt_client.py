@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+A client for `choco-opt --serve`, which takes the same arguments as choco-opt.
+
+The compilation runs in the server listening on the socket given by the
+CHOCO_OPT_SOCKET environment variable, or on the default socket. If no server
+listens there, the client compiles in its own process, so that scripts can use
+it whether a server runs or not. The client refuses to talk to a server that
+runs as another user.
+
+Only the standard library is imported, so that the client starts quickly.
+"""
+
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+# Messages are JSON objects, each prefixed by its length in bytes.
+HEADER = struct.Struct("!I")
+
+# The credentials of the peer of a Unix socket: its pid, uid and gid.
+PEERCRED = struct.Struct("3i")
+
+# The environment variables that choco-opt reads, which the server takes from
+# the client, such as the variables that locate the cache directories.
+FORWARDED_ENVIRONMENT = ["XDG_CACHE_HOME", "HOME"]
+
+
+def private_socket_directory() -> str:
+    """The directory of the default socket when XDG_RUNTIME_DIR is not set."""
+    return os.path.join(tempfile.gettempdir(), f"choco-opt-{os.getuid()}")
+
+
+def default_socket_path() -> str:
+    """
+    The socket in XDG_RUNTIME_DIR, or else in a directory of the temporary
+    directory that only the user can access, as created by the server.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    directory = runtime_dir or private_socket_directory()
+    return os.path.join(directory, "choco-opt.sock")
+
+
+def peer_uid(sock: socket.socket) -> Optional[int]:
+    """
+    The user id of the process at the other end of a Unix socket, or None if
+    the platform does not tell it.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEERCRED.size)
+    _, uid, _ = PEERCRED.unpack(credentials)
+    return uid
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]):
+    data = json.dumps(message).encode()
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def receive_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks: List[bytes] = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 16))
+        if not chunk:
+            raise ConnectionError("connection closed in the middle of a message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def receive_message(sock: socket.socket) -> Dict[str, Any]:
+    (size,) = HEADER.unpack(receive_exactly(sock, HEADER.size))
+    return json.loads(receive_exactly(sock, size))
+
+
+def compile_remotely(path: str, argv: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Run choco-opt with the given arguments in the server listening on `path`.
+
+    :returns: The reply of the server, or None if no server listens on `path`.
+    :raises PermissionError: If the server runs as another user.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with sock:
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        uid = peer_uid(sock)
+        if uid is not None and uid != os.getuid():
+            raise PermissionError(f"the server on {path} runs as another user")
+        env = {name: os.environ.get(name) for name in FORWARDED_ENVIRONMENT}
+        send_message(sock, {"argv": argv, "cwd": os.getcwd(), "env": env})
+        while True:
+            reply = receive_message(sock)
+            if not reply.get("read_stdin"):
+                return reply
+            # The input is read from the standard input of the client.
+            send_message(sock, {"stdin": sys.stdin.read()})
+
+
+def __main__():
+    argv = sys.argv[1:]
+    path = os.environ.get("CHOCO_OPT_SOCKET") or default_socket_path()
+    try:
+        reply = compile_remotely(path, argv)
+    except PermissionError as e:
+        sys.exit(f"choco-opt-client: {e}")
+    if reply is None:
+        from tools.choco_opt import __main__ as choco_opt_main
+
+        choco_opt_main(argv)
+        return
+    sys.stdout.write(reply["stdout"])
+    sys.stderr.write(reply["stderr"])
+    sys.exit(reply["exit_code"])
+
+
+if __name__ == "__main__":
+    __main__()
@@ -0,0 +1,222 @@
+"""
+The compile server of `choco-opt --serve`.
+
+The server imports the dialects, the passes, the frontend and the targets once,
+and then forks a pool of workers that accept connections on a Unix socket. Each
+connection is one compilation, run by a single worker, so that the workers
+compile concurrently without sharing any state.
+
+Messages are JSON objects, each prefixed by its length as a 4-byte big-endian
+integer. A request is
+
+    {"argv": [...], "cwd": "...", "env": {...}, "source": "..."}
+
+where `argv` are the arguments of choco-opt, such as the input file and the `-p`
+pipeline and `-t` target, and `cwd` is the directory that relative paths are
+resolved from. `env` maps the environment variables of the client that
+choco-opt reads, such as XDG_CACHE_HOME, to their values, or to null if they
+are not set. `source` is optional, and is the input when no input file is
+given. Without it, the server asks for the standard input of the client with
+`{"read_stdin": true}`, which the client answers with `{"stdin": "..."}`.
+
+The reply is `{"exit_code": ..., "stdout": "...", "stderr": "..."}`, with what
+choco-opt would have printed and returned.
+
+Each worker keeps an incremental parser for each input file it compiled, so
+that compiling an edited file again only parses the top-level definitions and
+statements that changed.
+
+Only the user that runs the server can connect to it: the socket is created
+with mode 0600, the default socket is in a directory only the user can access,
+and connections from processes of other users are closed.
+"""
+
+import os
+import signal
+import socket
+import stat
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from typing import Any, Dict, Set
+
+from choco.incremental_parser import IncrementalParser
+from tools.choco_opt import preload
+from tools.choco_opt import __main__ as choco_opt_main
+from tools.choco_opt_client import (
+    FORWARDED_ENVIRONMENT,
+    peer_uid,
+    private_socket_directory,
+    receive_message,
+    send_message,
+)
+
+
+class RemoteStdin(StringIO):
+    """The standard input of a client, fetched when it is first read."""
+
+    def __init__(self, conn: socket.socket):
+        super().__init__()
+        self.conn = conn
+        self.fetched = False
+
+    def fetch(self):
+        if not self.fetched:
+            self.fetched = True
+            send_message(self.conn, {"read_stdin": True})
+            self.write(receive_message(self.conn)["stdin"])
+            self.seek(0)
+
+    def read(self, size: "int | None" = -1) -> str:
+        self.fetch()
+        return super().read(size)
+
+    def readline(self, size: "int | None" = -1) -> str:
+        self.fetch()
+        return super().readline(size)
+
+    def __next__(self) -> str:
+        self.fetch()
+        return super().__next__()
+
+
+def exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def run_request(
+    conn: socket.socket,
+    request: Dict[str, Any],
+    incremental_parsers: Dict[str, IncrementalParser],
+) -> Dict[str, Any]:
+    """Run choco-opt for a request, and return the reply to send."""
+    source = request.get("source")
+    stdin = RemoteStdin(conn) if source is None else StringIO(source)
+    stdout = StringIO()
+    stderr = StringIO()
+    code = 0
+    os.chdir(request["cwd"])
+    # The worker runs one request at a time, so the environment of the client
+    # can replace its own.
+    for name, value in request.get("env", {}).items():
+        if name not in FORWARDED_ENVIRONMENT:
+            continue
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+    sys.stdin = stdin
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                choco_opt_main(request["argv"], incremental_parsers)
+            except SystemExit as e:
+                code = exit_code(e)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        sys.stdin = sys.__stdin__
+    return {"exit_code": code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+
+def worker(server: socket.socket):
+    incremental_parsers: Dict[str, IncrementalParser] = {}
+    while True:
+        conn, _ = server.accept()
+        with conn:
+            uid = peer_uid(conn)
+            if uid is not None and uid != os.getuid():
+                continue
+            try:
+                request = receive_message(conn)
+                reply = run_request(conn, request, incremental_parsers)
+                send_message(conn, reply)
+            except (ConnectionError, ValueError, KeyError):
+                # The client went away, or did not send a valid request.
+                pass
+
+
+def is_listening(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def make_private_directory(directory: str):
+    """Create a directory that only the user can access, or check that it is one."""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.lstat(directory)
+    if (
+        not stat.S_ISDIR(st.st_mode)
+        or st.st_uid != os.getuid()
+        or st.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+    ):
+        sys.exit(f"choco-opt: {directory} must be a directory only you can access")
+
+
+def serve(path: str, jobs: int):
+    """
+    Serve compilations on the Unix socket at `path` with `jobs` workers, until
+    interrupted or terminated. Workers that exit are replaced.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if directory == os.path.abspath(private_socket_directory()):
+        make_private_directory(directory)
+    if is_listening(path):
+        sys.exit(f"choco-opt: a server already listens on {path}")
+    if os.path.exists(path):
+        # Left over by a server that did not shut down cleanly.
+        os.unlink(path)
+
+    preload()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # The socket is never accessible to other users, even before the chmod.
+    umask = os.umask(0o177)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    os.chmod(path, 0o600)
+    server.listen()
+    print(f"choco-opt: serving on {path} with {jobs} workers", file=sys.stderr)
+
+    # Shut down cleanly on SIGTERM, as on SIGINT.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    workers: Set[int] = set()
+    try:
+        while True:
+            while len(workers) < jobs:
+                pid = os.fork()
+                if pid == 0:
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    status = 0
+                    try:
+                        worker(server)
+                    except KeyboardInterrupt:
+                        pass
+                    except BaseException:
+                        traceback.print_exc()
+                        status = 1
+                    os._exit(status)
+                workers.add(pid)
+            pid, _ = os.wait()
+            workers.discard(pid)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+        for pid in workers:
+            os.waitpid(pid, 0)
+        server.close()
+        os.unlink(path)
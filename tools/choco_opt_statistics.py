@@ -0,0 +1,141 @@
+"""
+The pass statistics of `choco-opt --pass-statistics`.
+
+For each pass of the pipeline, the wall time, the CPU time and the peak memory
+traced by tracemalloc while the pass runs are recorded, together with the
+number of operations of each dialect before and after the pass. Verification
+and printing between the passes are not part of the time of any pass.
+
+Tracing the memory allocations slows down the passes, so that their times are
+only comparable to each other, and not to compilations without statistics.
+"""
+
+import json
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, List
+
+from xdsl.context import MLContext
+from xdsl.dialects.builtin import ModuleOp
+from xdsl.passes import PipelinePass
+
+
+def count_ops(module: ModuleOp) -> Dict[str, int]:
+    """The number of operations of each dialect in the module."""
+    counts: Counter[str] = Counter()
+    for op in module.walk():
+        counts[op.name.split(".", 1)[0]] += 1
+    return dict(sorted(counts.items()))
+
+
+@dataclass
+class PassStatistics:
+    name: str
+    # In seconds.
+    wall_time: float
+    cpu_time: float
+    # In bytes, the most memory traced while the pass ran, and how much more
+    # that is than when the pass started.
+    peak_memory: int
+    peak_memory_increase: int
+    ops_before: Dict[str, int]
+    ops_after: Dict[str, int]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "wall_ms": self.wall_time * 1000,
+            "cpu_ms": self.cpu_time * 1000,
+            "peak_memory_bytes": self.peak_memory,
+            "peak_memory_increase_bytes": self.peak_memory_increase,
+            "ops_before": self.ops_before,
+            "ops_after": self.ops_after,
+        }
+
+
+@dataclass(frozen=True)
+class MeasuredPipelinePass(PipelinePass):
+    """A pipeline that records the statistics of each of its passes."""
+
+    statistics: List[PassStatistics] = field(default_factory=list)
+
+    def apply(self, ctx: MLContext, op: ModuleOp) -> None:
+        self.statistics.clear()
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            ops = count_ops(op)
+            for i, p in enumerate(self.passes):
+                tracemalloc.reset_peak()
+                memory, _ = tracemalloc.get_traced_memory()
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                p.apply(ctx, op)
+                cpu_time = time.process_time() - cpu_start
+                wall_time = time.perf_counter() - wall_start
+                _, peak = tracemalloc.get_traced_memory()
+
+                ops_after = count_ops(op)
+                self.statistics.append(
+                    PassStatistics(
+                        p.name,
+                        wall_time,
+                        cpu_time,
+                        peak,
+                        max(peak - memory, 0),
+                        ops,
+                        ops_after,
+                    )
+                )
+                ops = ops_after
+                if self.callback is not None and i + 1 < len(self.passes):
+                    self.callback(p, op, self.passes[i + 1])
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+
+def ops_change(before: Dict[str, int], after: Dict[str, int]) -> str:
+    """The change of the number of operations of each dialect, such as `riscv +3`."""
+    changes: List[str] = []
+    for dialect in sorted(before.keys() | after.keys()):
+        change = after.get(dialect, 0) - before.get(dialect, 0)
+        if change:
+            changes.append(f"{dialect} {change:+d}")
+    return ", ".join(changes)
+
+
+def print_table(statistics: List[PassStatistics], stream: IO[str]):
+    name_width = max([len("total")] + [len(s.name) for s in statistics])
+    print(
+        f"{'pass':<{name_width}}  {'wall ms':>9}  {'cpu ms':>9}  {'peak KB':>9}  "
+        f"{'+KB':>9}  {'ops':>7}  ops change by dialect",
+        file=stream,
+    )
+    for s in statistics:
+        line = (
+            f"{s.name:<{name_width}}  {s.wall_time * 1000:9.2f}  "
+            f"{s.cpu_time * 1000:9.2f}  {s.peak_memory / 1024:9.1f}  "
+            f"{s.peak_memory_increase / 1024:9.1f}  {sum(s.ops_after.values()):7d}  "
+            f"{ops_change(s.ops_before, s.ops_after)}"
+        )
+        print(line.rstrip(), file=stream)
+    wall_time = sum(s.wall_time for s in statistics)
+    cpu_time = sum(s.cpu_time for s in statistics)
+    peak = max((s.peak_memory for s in statistics), default=0)
+    print(
+        f"{'total':<{name_width}}  {wall_time * 1000:9.2f}  {cpu_time * 1000:9.2f}  "
+        f"{peak / 1024:9.1f}",
+        file=stream,
+    )
+
+
+def print_json(statistics: List[PassStatistics], stream: IO[str]):
+    json.dump({"passes": [s.to_json() for s in statistics]}, stream, indent=2)
+    stream.write("\n")
+
+
+formats = {"table": print_table, "json": print_json}
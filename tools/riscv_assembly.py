@@ -0,0 +1,111 @@
+"""
+The structure of the RISC-V assembly emitted by `choco-opt -t riscv`.
+
+The assembly is a flat list of labels and instructions, in which the functions
+of the program and of the runtime are not delimited. A label starts a function
+if it is `_main`, if it is called, if it has a return label `_<label>_return`,
+as every compiled function has, or if it is a label of the runtime, which
+starts with an underscore, and is not an inner label of the current function,
+such as `_print_str_loop_header` in `_print_str`. The instructions before the
+first function initialize the program, and belong to `ENTRY`.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# The function of the instructions that run before `_main`.
+ENTRY = "_start"
+
+LOADS = {"lb", "lbu", "lh", "lhu", "lw"}
+STORES = {"sb", "sh", "sw"}
+
+LABEL = re.compile(r"^([A-Za-z_.$][\w.$]*):(.*)$")
+
+
+def is_call(name: str, args: Sequence[str]) -> bool:
+    """Whether the instruction `name args` calls a function."""
+    if name == "call":
+        return True
+    if name in ("jal", "jalr"):
+        # `jal label` and `jalr rs` link to ra implicitly.
+        return len(args) == 1 or args[0] in ("ra", "x1")
+    return False
+
+
+def is_inner_label(label: str, function: str) -> bool:
+    return label.startswith(function + "_") or label == f"_{function}_return"
+
+
+def function_entries(labels: Sequence[str], called: Iterable[str]) -> Set[str]:
+    """
+    The labels that start a function, given all the labels of the program in
+    order, and the labels that are called.
+    """
+    label_set = set(labels)
+    entries = {"_main"} | (set(called) & label_set)
+    current: Optional[str] = None
+    for label in labels:
+        if (
+            label in entries
+            or f"_{label}_return" in label_set
+            or (
+                label.startswith("_")
+                and (current is None or not is_inner_label(label, current))
+            )
+        ):
+            entries.add(label)
+            current = label
+    return entries
+
+
+@dataclass
+class Assembly:
+    """The instructions of an assembly file, by function."""
+
+    # The number of instructions of each function, in the order of the file.
+    functions: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def instructions(self) -> int:
+        return sum(self.functions.values())
+
+
+def parse_assembly(text: str) -> Assembly:
+    # The labels and instructions of the text section, in order.
+    lines: List[Tuple[str, str]] = []
+    called: Set[str] = set()
+    in_text = True
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        match = LABEL.match(line)
+        if match is not None:
+            if in_text:
+                lines.append(("label", match.group(1)))
+            line = match.group(2).strip()
+        if not line:
+            continue
+        if line.startswith("."):
+            directive = line.split()[0]
+            if directive in (".text", ".data", ".bss"):
+                in_text = directive == ".text"
+            continue
+        if not in_text:
+            continue
+        name, _, operands = line.partition(" ")
+        args = [arg.strip() for arg in operands.split(",") if arg.strip()]
+        if is_call(name, args):
+            called.add(args[-1])
+        lines.append(("instruction", name))
+
+    entries = function_entries([v for kind, v in lines if kind == "label"], called)
+    assembly = Assembly()
+    function = ENTRY
+    for kind, value in lines:
+        if kind == "label":
+            if value in entries:
+                function = value
+                assembly.functions.setdefault(function, 0)
+        else:
+            assembly.functions[function] = assembly.functions.get(function, 0) + 1
+    return assembly
@@ -1,27 +1,166 @@
 #!/usr/bin/env python3
 """
-This script calls 'python3 -m riscemu' with the right options,
-and removes the additional prints created by riscemu.
-With this script, we only have the output generated by the program file, and
-additionally have one line for the return code.
+This script runs a RISC-V assembly file with riscemu, with the same options
+as 'python3 -m riscemu', in its own process.
+The output of the program is printed as the program writes it, followed by
+one line for the return code, and by the errors of the interpreter.
+
+With --profile, the executed instructions are counted for each label and
+function, together with the calls, and the profile is printed to the standard
+error after the output of the interpreter.
 """
 
 import argparse
 import subprocess
+import sys
+import traceback
+from contextlib import redirect_stderr
+from io import StringIO
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from riscemu.CPU import CPU
+    from riscemu.types import Instruction
+
+    from tools.riscv_profile import Profile
+
+# Called with the CPU and each instruction before it runs, with the program
+# counter already past the instruction.
+Trace = Callable[["CPU", "Instruction"], None]
+
+
+def exit_status(code: int) -> int:
+    """The status a process exiting with `code` reports, as riscemu does."""
+    return code % 256
+
+
+def run_riscemu(path: str, trace: Optional[Trace] = None) -> int:
+    """
+    Run the assembly file at `path` as `python3 -m riscemu` does, printing
+    what it prints, and calling `trace` before each instruction.
+
+    :returns: The exit code of the program.
+    """
+    from riscemu import RiscemuBaseException
+    from riscemu.CPU import UserModeCPU
+    from riscemu.config import RunConfig
+    from riscemu.instructions import InstructionSetDict
+    from riscemu.parser import AssemblyFileLoader
+
+    cfg = RunConfig(
+        debug_instruction=True,
+        include_scall_symbols=True,
+        debug_on_exception=True,
+        add_accept_imm=False,
+        scall_fs=False,
+        scall_input=True,
+        verbosity=0,
+    )
+    try:
+        cpu = UserModeCPU(list(InstructionSetDict.values()), cfg)
+        if trace is not None:
+            run_instruction = cpu.run_instruction
+
+            def run_traced_instruction(ins: "Instruction"):
+                trace(cpu, ins)
+                run_instruction(ins)
+
+            cpu.run_instruction = run_traced_instruction  # type: ignore
+        opts = AssemblyFileLoader.get_options(["riscemu", path])
+        loader = AssemblyFileLoader.instantiate(path, opts)
+        cpu.load_program(loader.parse())
+        cpu.setup_stack(cfg.stack_size)
+        cpu.launch(cpu.mmu.programs[-1], verbose=False)
+        return cpu.exit_code
+    except RiscemuBaseException as e:
+        print("Error: {}".format(e.message()))
+        e.print_stacktrace()
+        return -1
 
-from riscv.parser import *
+
+def run_in_process(path: str, trace: Optional[Trace] = None) -> "tuple[int, str]":
+    """
+    Run the assembly file at `path`, letting the program write to the
+    standard output directly.
+
+    :returns: The return code, and what was written to the standard error.
+    """
+    stderr = StringIO()
+    with redirect_stderr(stderr):
+        try:
+            code = exit_status(run_riscemu(path, trace))
+        except Exception:
+            # Reported as a crash of `python3 -m riscemu` would be.
+            traceback.print_exc()
+            code = 1
+    sys.stdout.flush()
+    return code, stderr.getvalue()
+
+
+def run_subprocess(path: str) -> "tuple[int, str]":
+    result = subprocess.run(["python3", "-m", "riscemu", path], capture_output=True)
+    sys.stdout.write(result.stdout.decode("ascii"))
+    return result.returncode, result.stderr.decode("utf8")
 
 
 def __main__():
     parser = argparse.ArgumentParser(description="A RISC-V interpreter")
     parser.add_argument("file", type=argparse.FileType("r"))
-    args = parser.parse_args()
-    result = subprocess.run(
-        ["python3", "-m", "riscemu", args.file.name], capture_output=True
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="run riscemu in a separate Python interpreter",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="count the executed instructions of each label and function, and "
+        "the calls, and print the profile",
+    )
+    parser.add_argument(
+        "--profile-file",
+        type=str,
+        help="write the profile to this file instead of the standard error",
     )
-    print(result.stdout.decode("ascii"))
-    print(f"Return code: {result.returncode}")
-    print(f"Interpreter Errors: {result.stderr.decode('utf8')}")
+    parser.add_argument(
+        "--profile-collapsed",
+        type=str,
+        metavar="FILE",
+        help="write the call stacks of the profile in the collapsed format of "
+        "flamegraph tools to this file",
+    )
+    args = parser.parse_args()
+    args.file.close()
+    profile = None
+    if args.profile or args.profile_file or args.profile_collapsed:
+        if args.subprocess:
+            parser.error("the profile is only recorded without --subprocess")
+        from tools.riscv_profile import Profile
+
+        profile = Profile()
+    if args.subprocess:
+        code, errors = run_subprocess(args.file.name)
+    else:
+        code, errors = run_in_process(args.file.name, profile)
+    print()
+    print(f"Return code: {code}")
+    print(f"Interpreter Errors: {errors}")
+    if profile is not None:
+        report_profile(profile, args)
+
+
+def report_profile(profile: "Profile", args: argparse.Namespace):
+    from tools.riscv_profile import print_collapsed_stacks, print_profile
+
+    if args.profile_file is not None:
+        with open(args.profile_file, "w") as f:
+            print_profile(profile, f)
+    elif args.profile:
+        sys.stdout.flush()
+        print_profile(profile, sys.stderr)
+    if args.profile_collapsed is not None:
+        with open(args.profile_collapsed, "w") as f:
+            print_collapsed_stacks(profile, f)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+"""
+The execution profile of `riscv-interpreter --profile`.
+
+Each executed instruction is counted for the label it follows and for the
+function it belongs to, as delimited by `tools.riscv_assembly`. The calls are
+followed with a shadow call stack: a call pushes the called function and its
+return address, and an indirect jump to the return address of the top of the
+stack returns from it. A function that is entered without being called,
+such as an error handler that is branched to, is shown on top of the function
+that branched to it.
+
+The profile is printed as a flat profile of the functions and of the labels,
+followed by the call graph, and can be written as collapsed stacks, one line
+`caller;...;callee instructions` per call stack, as read by flamegraph tools.
+"""
+
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import IO, TYPE_CHECKING, List, Optional, Tuple
+
+from tools.riscv_assembly import ENTRY, function_entries, is_call
+
+if TYPE_CHECKING:
+    from riscemu.CPU import CPU
+    from riscemu.types import Instruction
+
+# The instructions that return from a function when they do not call one.
+INDIRECT_JUMPS = {"jalr", "jr", "ret"}
+
+
+@dataclass
+class Frame:
+    function: str
+    # The address of the instruction after the call.
+    return_address: int
+
+
+@dataclass
+class Profile:
+    """The trace of riscv-interpreter profiling the program it runs."""
+
+    # The executed instructions after each label, and in each function.
+    label_instructions: Counter[str] = field(default_factory=Counter)
+    function_instructions: Counter[str] = field(default_factory=Counter)
+    # The executed instructions of each function and of the functions it
+    # called, counted once per instruction for recursive functions.
+    inclusive_instructions: Counter[str] = field(default_factory=Counter)
+    calls: Counter[str] = field(default_factory=Counter)
+    # The number of calls from a caller to a callee.
+    call_graph: Counter[Tuple[str, str]] = field(default_factory=Counter)
+    # The executed instructions of each call stack.
+    stacks: Counter[Tuple[str, ...]] = field(default_factory=Counter)
+
+    # The label and the function of each address, computed when the program is
+    # loaded.
+    label_addresses: List[int] = field(default_factory=list)
+    labels: List[Tuple[str, str]] = field(default_factory=list)
+    call_stack: List[Frame] = field(default_factory=list)
+    # The return address of the call that was just executed, if any.
+    call_return_address: Optional[int] = None
+    # Whether the instruction that was just executed is an indirect jump.
+    jumped_indirectly: bool = False
+
+    @property
+    def instructions(self) -> int:
+        return sum(self.function_instructions.values())
+
+    def load(self, cpu: "CPU"):
+        program = cpu.mmu.programs[-1]
+        text = [
+            section for section in program.sections if hasattr(section, "instructions")
+        ]
+        in_text = [
+            (address, label)
+            for label, address in program.context.labels.items()
+            if any(s.base <= address < s.base + s.size for s in text)
+        ]
+        # Sorting is stable, so that labels at the same address stay in the
+        # order of the file.
+        in_text.sort(key=lambda item: item[0])
+
+        called = {
+            ins.args[-1]
+            for section in text
+            for ins in section.instructions
+            if is_call(ins.name, ins.args)
+        }
+        entries = function_entries([label for _, label in in_text], called)
+        function = ENTRY
+        for address, label in in_text:
+            if label in entries:
+                function = label
+            self.label_addresses.append(address)
+            self.labels.append((label, function))
+        self.call_stack.append(Frame(ENTRY, -1))
+
+    def locate(self, address: int) -> Tuple[str, str]:
+        """The label and the function of the instruction at `address`."""
+        i = bisect_right(self.label_addresses, address)
+        if i == 0:
+            return ENTRY, ENTRY
+        return self.labels[i - 1]
+
+    def __call__(self, cpu: "CPU", ins: "Instruction"):
+        if not self.call_stack:
+            self.load(cpu)
+        address = cpu.pc - cpu.INS_XLEN
+        label, function = self.locate(address)
+
+        if self.call_return_address is not None:
+            caller = self.call_stack[-1].function
+            self.call_stack.append(Frame(function, self.call_return_address))
+            self.calls[function] += 1
+            self.call_graph[caller, function] += 1
+            self.call_return_address = None
+        elif (
+            self.jumped_indirectly
+            and len(self.call_stack) > 1
+            and address == self.call_stack[-1].return_address
+        ):
+            self.call_stack.pop()
+
+        stack = tuple(frame.function for frame in self.call_stack)
+        if stack[-1] != function:
+            stack += (function,)
+        self.label_instructions[label] += 1
+        self.function_instructions[function] += 1
+        for f in set(stack):
+            self.inclusive_instructions[f] += 1
+        self.stacks[stack] += 1
+
+        if is_call(ins.name, ins.args):
+            self.call_return_address = cpu.pc
+            self.jumped_indirectly = False
+        else:
+            self.jumped_indirectly = ins.name in INDIRECT_JUMPS
+
+
+def percent(count: int, total: int) -> str:
+    return f"{100 * count / total if total else 0:6.2f}"
+
+
+def print_profile(profile: Profile, stream: IO[str]):
+    total = profile.instructions
+    print(f"Flat profile, {total} instructions executed:", file=stream)
+    print(file=stream)
+    functions = sorted(
+        profile.inclusive_instructions,
+        key=lambda f: (-profile.function_instructions[f], f),
+    )
+    width = max([len("function")] + [len(f) for f in functions])
+    print(
+        f"{'function':<{width}}  {'self':>9}  {'%':>6}  {'total':>9}  {'%':>6}  "
+        f"{'calls':>7}",
+        file=stream,
+    )
+    for f in functions:
+        self_count = profile.function_instructions[f]
+        inclusive = profile.inclusive_instructions[f]
+        print(
+            f"{f:<{width}}  {self_count:9d}  {percent(self_count, total)}  "
+            f"{inclusive:9d}  {percent(inclusive, total)}  "
+            f"{profile.calls[f]:7d}",
+            file=stream,
+        )
+
+    print(file=stream)
+    function_of = dict(profile.labels)
+    labels = sorted(
+        profile.label_instructions,
+        key=lambda label: (-profile.label_instructions[label], label),
+    )
+    label_width = max([len("label")] + [len(label) for label in labels])
+    print(
+        f"{'label':<{label_width}}  {'function':<{width}}  {'self':>9}  {'%':>6}",
+        file=stream,
+    )
+    for label in labels:
+        count = profile.label_instructions[label]
+        print(
+            f"{label:<{label_width}}  {function_of.get(label, ENTRY):<{width}}  "
+            f"{count:9d}  {percent(count, total)}",
+            file=stream,
+        )
+
+    print(file=stream)
+    print("Call graph:", file=stream)
+    print(file=stream)
+    print(f"{'calls':>7}  caller -> callee", file=stream)
+    for (caller, callee), count in sorted(profile.call_graph.items()):
+        print(f"{count:7d}  {caller} -> {callee}", file=stream)
+
+
+def print_collapsed_stacks(profile: Profile, stream: IO[str]):
+    for stack, count in sorted(profile.stacks.items()):
+        print(f"{';'.join(stack)} {count}", file=stream)